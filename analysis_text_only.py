@@ -1,220 +1,413 @@
 """
 Uber Data Analysis - Text Output Only
 This script performs comprehensive analysis without plotting
+
+Usage:
+    python analysis_text_only.py                  # load the full CSV into memory
+    python analysis_text_only.py --stream         # chunked mode for files larger than RAM
+    python analysis_text_only.py --workers 8      # time-range shards aggregated in parallel
+    python analysis_text_only.py --grid           # reductions over the memory-mapped grid store
+    python analysis_text_only.py --sql            # GROUP BY queries over the SQLite copy of the data
+    python analysis_text_only.py --data drops/    # every CSV in a directory (or a glob), read in parallel
 """
 
+import argparse
 import pandas as pd
 import numpy as np
 import warnings
 warnings.filterwarnings('ignore')
 
-print("="*80)
-print("UBER DATA ANALYSIS - COMPREHENSIVE INSIGHTS")
-print("="*80)
-
-# Load data
-print("\n1. LOADING DATA...")
-df = pd.read_csv('Uber.csv')
-df['pickup_dt'] = pd.to_datetime(df['pickup_dt'])
-
-print(f"Dataset shape: {df.shape}")
-print(f"Date range: {df['pickup_dt'].min()} to {df['pickup_dt'].max()}")
-
-# Data preparation
-df['hour'] = df['pickup_dt'].dt.hour
-df['day_of_week'] = df['pickup_dt'].dt.day_name()
-df['month'] = df['pickup_dt'].dt.month
-df['month_name'] = df['pickup_dt'].dt.month_name()
-df['is_weekend'] = df['pickup_dt'].dt.dayofweek >= 5
-df['is_holiday'] = df['hday'] == 'Y'
-df['borough'] = df['borough'].fillna('Unknown')
-
-# UNIVARIATE ANALYSIS
-print("\n" + "="*80)
-print("2. UNIVARIATE ANALYSIS")
-print("="*80)
-
-print("\n--- Pickups Statistics ---")
-print(df['pickups'].describe())
-
-print("\n--- Weather Variables Statistics ---")
-weather_vars = ['spd', 'vsb', 'temp', 'dewp', 'slp', 'pcp01', 'pcp06', 'pcp24', 'sd']
-for var in weather_vars:
-    print(f"\n{var}:")
-    print(f"  Mean: {df[var].mean():.2f}")
-    print(f"  Min: {df[var].min():.2f}, Max: {df[var].max():.2f}")
-    if var in ['pcp01', 'pcp06', 'pcp24', 'sd']:
-        non_zero = (df[var] > 0).sum()
-        print(f"  Non-zero records: {non_zero} ({100*non_zero/len(df):.1f}%)")
-
-print("\n--- Borough Distribution ---")
-print(df['borough'].value_counts())
-
-print("\n--- Holiday Distribution ---")
-print(df['is_holiday'].value_counts())
-
-# BIVARIATE ANALYSIS - TEMPORAL
-print("\n" + "="*80)
-print("3. BIVARIATE ANALYSIS - TEMPORAL PATTERNS")
-print("="*80)
-
-hourly = df.groupby('hour')['pickups'].agg(['mean', 'sum', 'count'])
-print("\n--- Hourly Pattern ---")
-print(f"Peak hour: {hourly['mean'].idxmax()}:00 ({hourly['mean'].max():.0f} avg pickups)")
-print(f"Lowest hour: {hourly['mean'].idxmin()}:00 ({hourly['mean'].min():.0f} avg pickups)")
-print("\nTop 5 hours by average pickups:")
-print(hourly.nlargest(5, 'mean')[['mean']])
-
-day_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-daily = df.groupby('day_of_week')['pickups'].agg(['mean', 'sum']).reindex(day_order)
-print("\n--- Day of Week Pattern ---")
-print(f"Peak day: {daily['mean'].idxmax()} ({daily['mean'].max():.0f} avg pickups)")
-print(f"Lowest day: {daily['mean'].idxmin()} ({daily['mean'].min():.0f} avg pickups)")
-print("\nAverage pickups by day:")
-print(daily[['mean']])
-
-month_order = ['January', 'February', 'March', 'April', 'May', 'June', 
-               'July', 'August', 'September', 'October', 'November', 'December']
-monthly = df.groupby('month_name')['pickups'].agg(['mean', 'sum']).reindex(month_order)
-print("\n--- Monthly Pattern ---")
-print(f"Peak month: {monthly['mean'].idxmax()} ({monthly['mean'].max():.0f} avg pickups)")
-print("\nAverage pickups by month:")
-print(monthly[['mean']])
-
-weekend = df.groupby('is_weekend')['pickups'].agg(['mean', 'sum'])
-print("\n--- Weekend vs Weekday ---")
-print(f"Weekday: {weekend.loc[False, 'mean']:.0f} avg pickups")
-print(f"Weekend: {weekend.loc[True, 'mean']:.0f} avg pickups")
-print(f"Ratio: {weekend.loc[True, 'mean']/weekend.loc[False, 'mean']:.2f}")
-
-# BIVARIATE ANALYSIS - BOROUGH
-print("\n" + "="*80)
-print("4. BIVARIATE ANALYSIS - BOROUGH PATTERNS")
-print("="*80)
-
-borough_stats = df.groupby('borough')['pickups'].agg(['sum', 'mean', 'count']).sort_values('sum', ascending=False)
-print("\n--- Borough Statistics ---")
-print(borough_stats)
-
-# Top borough by hour
-print("\n--- Peak Hours by Borough (Top 3) ---")
-top_boroughs = borough_stats.head(3).index
-for borough in top_boroughs:
-    borough_hourly = df[df['borough'] == borough].groupby('hour')['pickups'].mean()
-    peak_hour = borough_hourly.idxmax()
-    print(f"{borough}: Peak at {peak_hour}:00 ({borough_hourly.max():.0f} avg pickups)")
-
-# BIVARIATE ANALYSIS - WEATHER
-print("\n" + "="*80)
-print("5. BIVARIATE ANALYSIS - WEATHER IMPACT")
-print("="*80)
-
-numeric_cols = ['pickups', 'spd', 'vsb', 'temp', 'dewp', 'slp', 'pcp01', 'pcp06', 'pcp24', 'sd']
-corr_matrix = df[numeric_cols].corr()
-pickup_corr = corr_matrix['pickups'].sort_values(ascending=False)
-
-print("\n--- Correlation with Pickups ---")
-for var, corr in pickup_corr.items():
-    if var != 'pickups':
-        direction = "positive" if corr > 0 else "negative"
-        print(f"{var:10s}: {corr:7.3f} ({direction})")
-
-# Temperature bins
-print("\n--- Temperature Impact ---")
-df['temp_bin'] = pd.cut(df['temp'], bins=5)
-temp_impact = df.groupby('temp_bin')['pickups'].agg(['mean', 'count'])
-print(temp_impact)
-
-# Precipitation impact
-print("\n--- Precipitation Impact ---")
-precip_impact = df.groupby(df['pcp01'] > 0)['pickups'].agg(['mean', 'count'])
-print(precip_impact)
-print(f"Difference: {precip_impact.loc[True, 'mean'] - precip_impact.loc[False, 'mean']:.0f} pickups")
-
-# Snow impact
-print("\n--- Snow Impact ---")
-snow_impact = df.groupby(df['sd'] > 0)['pickups'].agg(['mean', 'count'])
-print(snow_impact)
-if True in snow_impact.index:
-    print(f"Difference: {snow_impact.loc[True, 'mean'] - snow_impact.loc[False, 'mean']:.0f} pickups")
-
-# BIVARIATE ANALYSIS - HOLIDAY
-print("\n" + "="*80)
-print("6. BIVARIATE ANALYSIS - HOLIDAY IMPACT")
-print("="*80)
-
-holiday_stats = df.groupby('is_holiday')['pickups'].agg(['mean', 'sum', 'count'])
-print(holiday_stats)
-print(f"\nDifference: {holiday_stats.loc[True, 'mean'] - holiday_stats.loc[False, 'mean']:.0f} pickups")
-print(f"Percentage change: {100*(holiday_stats.loc[True, 'mean']/holiday_stats.loc[False, 'mean']-1):+.1f}%")
-
-# Holiday hourly pattern
-print("\n--- Holiday Hourly Pattern (Peak Hours) ---")
-holiday_hourly = df[df['is_holiday']].groupby('hour')['pickups'].mean()
-nonholiday_hourly = df[~df['is_holiday']].groupby('hour')['pickups'].mean()
-print(f"Holiday peak: {holiday_hourly.idxmax()}:00 ({holiday_hourly.max():.0f} avg)")
-print(f"Non-holiday peak: {nonholiday_hourly.idxmax()}:00 ({nonholiday_hourly.max():.0f} avg)")
-
-# SUMMARY AND RECOMMENDATIONS
-print("\n" + "="*80)
-print("7. KEY INSIGHTS & RECOMMENDATIONS")
-print("="*80)
-
-print("\n--- Variables Influencing Pickups ---")
-print("Based on correlation analysis, the following factors influence pickups:")
-feature_importance = abs(pickup_corr).sort_values(ascending=False)
-feature_importance = feature_importance[feature_importance.index != 'pickups']
-for i, (var, importance) in enumerate(feature_importance.head(5).items(), 1):
-    direction = "increases" if corr_matrix.loc[var, 'pickups'] > 0 else "decreases"
-    print(f"{i}. {var}: {importance:.3f} correlation ({direction} pickups)")
-
-print("\n--- Most Influential Factor ---")
-top_factor = feature_importance.index[0]
-top_corr = corr_matrix.loc[top_factor, 'pickups']
-print(f"Factor: {top_factor}")
-print(f"Correlation: {top_corr:.3f}")
-if top_corr > 0:
-    print("Impact: Higher values of this factor are associated with more pickups")
-else:
-    print("Impact: Higher values of this factor are associated with fewer pickups")
-
-print("\n--- Recommendations to Uber Management ---")
-print("\n1. TEMPORAL OPTIMIZATION:")
-print(f"   - Increase driver availability during peak hours ({hourly['mean'].idxmax()}:00)")
-print(f"   - Focus on {daily['mean'].idxmax()} for maximum demand")
-print(f"   - Weekend demand is {100*(weekend.loc[True, 'mean']/weekend.loc[False, 'mean']-1):+.1f}% {'higher' if weekend.loc[True, 'mean'] > weekend.loc[False, 'mean'] else 'lower'} than weekdays")
-
-print("\n2. GEOGRAPHIC OPTIMIZATION:")
-top_borough = borough_stats.index[0]
-print(f"   - {top_borough} accounts for {100*borough_stats.loc[top_borough, 'sum']/borough_stats['sum'].sum():.1f}% of total pickups")
-print(f"   - Allocate more drivers to high-demand boroughs during peak times")
-
-print("\n3. WEATHER-BASED STRATEGIES:")
-if abs(corr_matrix.loc['temp', 'pickups']) > 0.1:
-    print(f"   - Temperature shows {abs(corr_matrix.loc['temp', 'pickups']):.3f} correlation with pickups")
-    print("   - Adjust pricing/driver allocation based on temperature forecasts")
-if (df['pcp01'] > 0).sum() > 0:
-    precip_diff = precip_impact.loc[True, 'mean'] - precip_impact.loc[False, 'mean']
-    print(f"   - Precipitation affects demand: {precip_diff:+.0f} pickups difference")
-    print("   - Increase surge pricing and driver incentives during precipitation")
-
-print("\n4. HOLIDAY STRATEGIES:")
-holiday_diff = holiday_stats.loc[True, 'mean'] - holiday_stats.loc[False, 'mean']
-if holiday_diff > 0:
-    print(f"   - Holidays show {holiday_diff:.0f} more average pickups")
-    print("   - Increase driver capacity and adjust pricing for holidays")
-else:
-    print(f"   - Holidays show {abs(holiday_diff):.0f} fewer average pickups")
-    print("   - Consider special promotions to boost holiday demand")
-
-print("\n5. DATA-DRIVEN PRICING:")
-print("   - Implement dynamic pricing based on:")
-print("     * Time of day (peak vs off-peak)")
-print("     * Day of week (weekend vs weekday)")
-print("     * Weather conditions (precipitation, temperature)")
-print("     * Borough-specific demand patterns")
-
-print("\n" + "="*80)
-print("ANALYSIS COMPLETE!")
-print("="*80)
-
+from data_loader import (DATA_FILE, WEATHER_COLUMNS, NUMERIC_COLUMNS, data_files, load_uber_data,
+                         fill_missing_borough)
+from calendar_features import add_calendar_features, with_day_labels, with_month_labels
+from streaming_analysis import DEFAULT_CHUNKSIZE, stream_aggregates
+from partitioned_view import PartitionedFrame
+from covariance_engine import GroupedCovariance
+from quantile_sketch import exact_quantile_table
+from binning import Binner
+from profiler import Profiler, add_profile_arguments
+
+
+def compute_aggregates(df):
+    """Compute every aggregate the report prints from an in-memory DataFrame."""
+    shape = df.shape
+
+    # Data preparation: integer calendar codes, labelled only for presentation
+    df = add_calendar_features(df)
+    df = fill_missing_borough(df)
+
+    weather_summary = pd.DataFrame({
+        'mean': df[WEATHER_COLUMNS].mean(),
+        'min': df[WEATHER_COLUMNS].min(),
+        'max': df[WEATHER_COLUMNS].max(),
+        'non_zero': (df[WEATHER_COLUMNS] > 0).sum(),
+    })
+
+    hourly = df.groupby('hour')['pickups'].agg(['mean', 'sum', 'count'])
+    daily = with_day_labels(df.groupby('day_of_week')['pickups'].agg(['mean', 'sum']))
+    monthly = with_month_labels(df.groupby('month')['pickups'].agg(['mean', 'sum']))
+    weekend = df.groupby('is_weekend')['pickups'].agg(['mean', 'sum'])
+
+    borough_stats = df.groupby('borough')['pickups'].agg(['sum', 'mean', 'count']).sort_values('sum', ascending=False)
+    # Sort by borough / holiday once; every group's hourly profile comes from one pass
+    borough_hourly = PartitionedFrame(df, 'borough', columns=['hour', 'pickups']).profile('hour')
+    top_borough_hourly = {b: borough_hourly.loc[b] for b in borough_stats.head(3).index}
+    holiday_hourly = PartitionedFrame(df, 'is_holiday', columns=['hour', 'pickups']).profile('hour')
+
+    # One pass of mergeable moments gives the overall, per-borough and per-hour correlations
+    moments = GroupedCovariance(NUMERIC_COLUMNS, ['borough', 'hour'])
+    moments.update(df[NUMERIC_COLUMNS], [df['borough'].astype(str), df['hour']])
+
+    # Fixed-edge weather bins (bin_edges.json), the same in every mode and run
+    binner = Binner()
+    temp_impact = binner.aggregate(df['pickups'], {'temp': df['temp']})[['mean', 'count']]
+    temp_precip = binner.aggregate(df['pickups'], {'temp': df['temp'], 'pcp01': df['pcp01']})
+    precip_impact = df.groupby(df['pcp01'] > 0)['pickups'].agg(['mean', 'count'])
+    snow_impact = df.groupby(df['sd'] > 0)['pickups'].agg(['mean', 'count'])
+
+    holiday_stats = df.groupby('is_holiday')['pickups'].agg(['mean', 'sum', 'count'])
+
+    return {
+        'shape': shape,
+        'date_min': df['pickup_dt'].min(),
+        'date_max': df['pickup_dt'].max(),
+        'pickups_describe': df['pickups'].describe(),
+        'weather_summary': weather_summary,
+        'borough_counts': df['borough'].value_counts(),
+        'holiday_counts': df['is_holiday'].value_counts(),
+        'hourly': hourly,
+        'daily': daily,
+        'monthly': monthly,
+        'weekend': weekend,
+        'borough_stats': borough_stats,
+        'top_borough_hourly': top_borough_hourly,
+        'corr_matrix': moments.total().corr(),
+        'borough_corr': moments.corr_with('borough'),
+        'hour_corr': moments.corr_with('hour'),
+        'borough_quantiles': exact_quantile_table(df['pickups'], df['borough'].astype(str), 'borough'),
+        'hour_quantiles': exact_quantile_table(df['pickups'], df['hour'], 'hour'),
+        'quantile_method': 'exact',
+        'temp_impact': temp_impact,
+        'temp_precip': temp_precip,
+        'precip_impact': precip_impact,
+        'snow_impact': snow_impact,
+        'holiday_stats': holiday_stats,
+        'holiday_hourly': holiday_hourly.loc[True],
+        'nonholiday_hourly': holiday_hourly.loc[False],
+    }
+
+
+def print_overview(results):
+    """Dataset shape and date range."""
+    print(f"Dataset shape: {results['shape']}")
+    print(f"Date range: {results['date_min']} to {results['date_max']}")
+
+
+def print_univariate(results):
+    """Pickups and weather distributions, borough and holiday counts."""
+    print("\n" + "="*80)
+    print("2. UNIVARIATE ANALYSIS")
+    print("="*80)
+
+    print("\n--- Pickups Statistics ---")
+    print(results['pickups_describe'])
+
+    print("\n--- Weather Variables Statistics ---")
+    weather_summary = results['weather_summary']
+    rows = results['shape'][0]
+    for var in WEATHER_COLUMNS:
+        print(f"\n{var}:")
+        print(f"  Mean: {weather_summary.loc[var, 'mean']:.2f}")
+        print(f"  Min: {weather_summary.loc[var, 'min']:.2f}, Max: {weather_summary.loc[var, 'max']:.2f}")
+        if var in ['pcp01', 'pcp06', 'pcp24', 'sd']:
+            non_zero = weather_summary.loc[var, 'non_zero']
+            print(f"  Non-zero records: {non_zero} ({100*non_zero/rows:.1f}%)")
+
+    print("\n--- Borough Distribution ---")
+    print(results['borough_counts'])
+
+    print("\n--- Holiday Distribution ---")
+    print(results['holiday_counts'])
+
+
+def print_temporal(results):
+    """Hourly, daily, monthly and weekend demand patterns."""
+    print("\n" + "="*80)
+    print("3. BIVARIATE ANALYSIS - TEMPORAL PATTERNS")
+    print("="*80)
+
+    hourly = results['hourly']
+    print("\n--- Hourly Pattern ---")
+    print(f"Peak hour: {hourly['mean'].idxmax()}:00 ({hourly['mean'].max():.0f} avg pickups)")
+    print(f"Lowest hour: {hourly['mean'].idxmin()}:00 ({hourly['mean'].min():.0f} avg pickups)")
+    print("\nTop 5 hours by average pickups:")
+    print(hourly.nlargest(5, 'mean')[['mean']])
+    print(f"\nPickup quartiles of the top 5 hours ({results['quantile_method']}):")
+    print(results['hour_quantiles'].loc[hourly.nlargest(5, 'mean').index].round(1))
+
+    daily = results['daily']
+    print("\n--- Day of Week Pattern ---")
+    print(f"Peak day: {daily['mean'].idxmax()} ({daily['mean'].max():.0f} avg pickups)")
+    print(f"Lowest day: {daily['mean'].idxmin()} ({daily['mean'].min():.0f} avg pickups)")
+    print("\nAverage pickups by day:")
+    print(daily[['mean']])
+
+    monthly = results['monthly']
+    print("\n--- Monthly Pattern ---")
+    print(f"Peak month: {monthly['mean'].idxmax()} ({monthly['mean'].max():.0f} avg pickups)")
+    print("\nAverage pickups by month:")
+    print(monthly[['mean']])
+
+    weekend = results['weekend']
+    print("\n--- Weekend vs Weekday ---")
+    print(f"Weekday: {weekend.loc[False, 'mean']:.0f} avg pickups")
+    print(f"Weekend: {weekend.loc[True, 'mean']:.0f} avg pickups")
+    print(f"Ratio: {weekend.loc[True, 'mean']/weekend.loc[False, 'mean']:.2f}")
+
+
+def print_borough(results):
+    """Borough totals and peak hours."""
+    print("\n" + "="*80)
+    print("4. BIVARIATE ANALYSIS - BOROUGH PATTERNS")
+    print("="*80)
+
+    borough_stats = results['borough_stats']
+    print("\n--- Borough Statistics ---")
+    print(borough_stats)
+
+    print(f"\n--- Pickup Quartiles by Borough ({results['quantile_method']}) ---")
+    print(results['borough_quantiles'].loc[borough_stats.index].round(1))
+
+    # Top borough by hour
+    print("\n--- Peak Hours by Borough (Top 3) ---")
+    for borough, borough_hourly in results['top_borough_hourly'].items():
+        peak_hour = borough_hourly.idxmax()
+        print(f"{borough}: Peak at {peak_hour}:00 ({borough_hourly.max():.0f} avg pickups)")
+
+
+def print_weather(results):
+    """Weather correlations and temperature, precipitation and snow impact."""
+    print("\n" + "="*80)
+    print("5. BIVARIATE ANALYSIS - WEATHER IMPACT")
+    print("="*80)
+
+    corr_matrix = results['corr_matrix']
+    pickup_corr = corr_matrix['pickups'].sort_values(ascending=False)
+
+    print("\n--- Correlation with Pickups ---")
+    for var, corr in pickup_corr.items():
+        if var != 'pickups':
+            direction = "positive" if corr > 0 else "negative"
+            print(f"{var:10s}: {corr:7.3f} ({direction})")
+
+    print("\n--- Correlation with Pickups by Borough ---")
+    print(results['borough_corr'].round(3).to_string())
+
+    print("\n--- Correlation with Pickups by Hour (weakest to strongest hour) ---")
+    hour_corr = results['hour_corr']
+    for var in hour_corr.columns:
+        by_hour = hour_corr[var].dropna()
+        if len(by_hour):
+            print(f"{var:10s}: {by_hour.min():7.3f} at {by_hour.idxmin()}:00 to "
+                  f"{by_hour.max():7.3f} at {by_hour.idxmax()}:00")
+
+    # Temperature bins
+    print("\n--- Temperature Impact ---")
+    print(results['temp_impact'])
+
+    print("\n--- Average Pickups by Temperature x 1-hour Precipitation ---")
+    print(results['temp_precip']['mean'].unstack().round(1))
+
+    # Precipitation impact
+    print("\n--- Precipitation Impact ---")
+    precip_impact = results['precip_impact']
+    print(precip_impact)
+    print(f"Difference: {precip_impact.loc[True, 'mean'] - precip_impact.loc[False, 'mean']:.0f} pickups")
+
+    # Snow impact
+    print("\n--- Snow Impact ---")
+    snow_impact = results['snow_impact']
+    print(snow_impact)
+    if True in snow_impact.index:
+        print(f"Difference: {snow_impact.loc[True, 'mean'] - snow_impact.loc[False, 'mean']:.0f} pickups")
+
+
+def print_holiday(results):
+    """Holiday vs non-holiday demand."""
+    print("\n" + "="*80)
+    print("6. BIVARIATE ANALYSIS - HOLIDAY IMPACT")
+    print("="*80)
+
+    holiday_stats = results['holiday_stats']
+    print(holiday_stats)
+    print(f"\nDifference: {holiday_stats.loc[True, 'mean'] - holiday_stats.loc[False, 'mean']:.0f} pickups")
+    print(f"Percentage change: {100*(holiday_stats.loc[True, 'mean']/holiday_stats.loc[False, 'mean']-1):+.1f}%")
+
+    # Holiday hourly pattern
+    print("\n--- Holiday Hourly Pattern (Peak Hours) ---")
+    holiday_hourly = results['holiday_hourly']
+    nonholiday_hourly = results['nonholiday_hourly']
+    print(f"Holiday peak: {holiday_hourly.idxmax()}:00 ({holiday_hourly.max():.0f} avg)")
+    print(f"Non-holiday peak: {nonholiday_hourly.idxmax()}:00 ({nonholiday_hourly.max():.0f} avg)")
+
+
+def print_insights(results):
+    """Most influential factors and recommendations."""
+    corr_matrix = results['corr_matrix']
+    pickup_corr = corr_matrix['pickups'].sort_values(ascending=False)
+    hourly, daily, weekend = results['hourly'], results['daily'], results['weekend']
+    borough_stats = results['borough_stats']
+    weather_summary = results['weather_summary']
+    precip_impact = results['precip_impact']
+    holiday_stats = results['holiday_stats']
+
+    print("\n" + "="*80)
+    print("7. KEY INSIGHTS & RECOMMENDATIONS")
+    print("="*80)
+
+    print("\n--- Variables Influencing Pickups ---")
+    print("Based on correlation analysis, the following factors influence pickups:")
+    feature_importance = abs(pickup_corr).sort_values(ascending=False)
+    feature_importance = feature_importance[feature_importance.index != 'pickups']
+    for i, (var, importance) in enumerate(feature_importance.head(5).items(), 1):
+        direction = "increases" if corr_matrix.loc[var, 'pickups'] > 0 else "decreases"
+        print(f"{i}. {var}: {importance:.3f} correlation ({direction} pickups)")
+
+    print("\n--- Most Influential Factor ---")
+    top_factor = feature_importance.index[0]
+    top_corr = corr_matrix.loc[top_factor, 'pickups']
+    print(f"Factor: {top_factor}")
+    print(f"Correlation: {top_corr:.3f}")
+    if top_corr > 0:
+        print("Impact: Higher values of this factor are associated with more pickups")
+    else:
+        print("Impact: Higher values of this factor are associated with fewer pickups")
+
+    print("\n--- Recommendations to Uber Management ---")
+    print("\n1. TEMPORAL OPTIMIZATION:")
+    print(f"   - Increase driver availability during peak hours ({hourly['mean'].idxmax()}:00)")
+    print(f"   - Focus on {daily['mean'].idxmax()} for maximum demand")
+    print(f"   - Weekend demand is {100*(weekend.loc[True, 'mean']/weekend.loc[False, 'mean']-1):+.1f}% {'higher' if weekend.loc[True, 'mean'] > weekend.loc[False, 'mean'] else 'lower'} than weekdays")
+
+    print("\n2. GEOGRAPHIC OPTIMIZATION:")
+    top_borough = borough_stats.index[0]
+    print(f"   - {top_borough} accounts for {100*borough_stats.loc[top_borough, 'sum']/borough_stats['sum'].sum():.1f}% of total pickups")
+    print(f"   - Allocate more drivers to high-demand boroughs during peak times")
+
+    print("\n3. WEATHER-BASED STRATEGIES:")
+    if abs(corr_matrix.loc['temp', 'pickups']) > 0.1:
+        print(f"   - Temperature shows {abs(corr_matrix.loc['temp', 'pickups']):.3f} correlation with pickups")
+        print("   - Adjust pricing/driver allocation based on temperature forecasts")
+    if weather_summary.loc['pcp01', 'non_zero'] > 0:
+        precip_diff = precip_impact.loc[True, 'mean'] - precip_impact.loc[False, 'mean']
+        print(f"   - Precipitation affects demand: {precip_diff:+.0f} pickups difference")
+        print("   - Increase surge pricing and driver incentives during precipitation")
+
+    print("\n4. HOLIDAY STRATEGIES:")
+    holiday_diff = holiday_stats.loc[True, 'mean'] - holiday_stats.loc[False, 'mean']
+    if holiday_diff > 0:
+        print(f"   - Holidays show {holiday_diff:.0f} more average pickups")
+        print("   - Increase driver capacity and adjust pricing for holidays")
+    else:
+        print(f"   - Holidays show {abs(holiday_diff):.0f} fewer average pickups")
+        print("   - Consider special promotions to boost holiday demand")
+
+    print("\n5. DATA-DRIVEN PRICING:")
+    print("   - Implement dynamic pricing based on:")
+    print("     * Time of day (peak vs off-peak)")
+    print("     * Day of week (weekend vs weekday)")
+    print("     * Weather conditions (precipitation, temperature)")
+    print("     * Borough-specific demand patterns")
+
+
+# Report sections in print order; each can also be printed on its own
+REPORT_SECTIONS = {
+    'overview': print_overview,
+    'univariate': print_univariate,
+    'temporal': print_temporal,
+    'borough': print_borough,
+    'weather': print_weather,
+    'holiday': print_holiday,
+    'insights': print_insights,
+}
+
+
+def print_report(results, sections=None):
+    """Print the text report (or only the named sections) from precomputed aggregates."""
+    for name in sections or REPORT_SECTIONS:
+        REPORT_SECTIONS[name](results)
+
+    print("\n" + "="*80)
+    print("ANALYSIS COMPLETE!")
+    print("="*80)
+
+
+def load_results(path=DATA_FILE, stream=False, workers=0, chunksize=DEFAULT_CHUNKSIZE, profiler=None,
+                 grid=False, sql=False):
+    """
+    Report aggregates in-memory, chunk-streamed, shard-parallel, from the grid store or as SQL.
+    `path` may also be a directory or glob of CSV files with the same schema.
+    Each backend is imported only when selected, so the default report does
+    not load sqlite3 or pyarrow.
+    """
+    files = data_files(path)
+    if len(files) > 1:
+        if grid or sql:
+            raise ValueError("--grid and --sql need a single CSV file")
+        if workers or stream:
+            # One mergeable partial per file, files in parallel
+            from multi_file import aggregate_files
+            return aggregate_files(files, workers=workers or 1, chunksize=chunksize)
+    else:
+        # A directory or glob may resolve to a single file
+        path = files[0]
+    if grid:
+        from grid_store import load_grid_store
+        return load_grid_store(path).results()
+    if sql:
+        from sql_backend import load_sql_backend
+        return load_sql_backend(path).results()
+    if workers:
+        from parallel_analysis import parallel_aggregates
+        return parallel_aggregates(path, workers=workers, chunksize=chunksize)
+    if stream:
+        return stream_aggregates(path, chunksize=chunksize)
+    df = load_uber_data(path)
+    if profiler is not None:
+        profiler.section('AGGREGATION')
+    return compute_aggregates(df)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Text-only Uber demand analysis')
+    parser.add_argument('--data', default=DATA_FILE,
+                        help='CSV file, directory of CSV files or glob (e.g. "drops/*.csv") to analyse')
+    parser.add_argument('--stream', action='store_true',
+                        help='aggregate the CSV in fixed-size chunks instead of loading it whole')
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE,
+                        help='rows per chunk in --stream and --workers modes')
+    parser.add_argument('--workers', type=int, default=0,
+                        help='aggregate time-range shards of the CSV in this many processes')
+    parser.add_argument('--grid', action='store_true',
+                        help='compute the report from the memory-mapped borough x hour grid store')
+    parser.add_argument('--sql', action='store_true',
+                        help='compute the report as GROUP BY queries over a SQLite copy of the data')
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    with Profiler.from_args(args, 'analysis_text_only') as profiler:
+        print("="*80)
+        print("UBER DATA ANALYSIS - COMPREHENSIVE INSIGHTS")
+        print("="*80)
+
+        # Load data
+        print("\n1. LOADING DATA...")
+        profiler.section('1. LOADING DATA')
+        results = load_results(args.data, args.stream, args.workers, args.chunksize, profiler, args.grid,
+                               args.sql)
+
+        profiler.section('REPORT')
+        print_report(results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,246 @@
+"""
+Uber Data Analysis - Demand Anomaly Detector
+Scores pickups against a seasonal baseline per borough x weekday x hour (the
+borough_hour / weekend_hour profiles of the figures, split by weekday). The
+state is three numbers per cell -- observations, robust center and robust
+scale -- so scoring and updating one incoming row is O(1):
+
+    z = (pickups - center) / max(scale, sqrt(max(center, 1)))
+
+with a Poisson floor on the scale so near-empty cells (EWR, Staten Island)
+do not flag single pickups. Online updates are exponentially weighted with
+residuals winsorized at CLIP scales, so a surge barely moves the baseline it
+is scored against. Batch mode fits the baseline as the per-cell median and
+MAD (scaled to a standard deviation) and scores the whole history vectorized.
+
+Usage:
+    python anomaly_detector.py                       # batch scoring, top anomalous rows and days
+    python anomaly_detector.py --mode stream         # replay the history row by row (online state)
+    python anomaly_detector.py --benchmark           # rows/second of both modes
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from data_loader import DATA_FILE, fill_missing_borough
+from calendar_features import DAY_ORDER, calendar_codes
+
+# |z| at or above which a row is flagged
+THRESHOLD = 4.0
+
+# Residuals are clipped at this many scales before they update the state
+CLIP = 3.0
+
+# Online updates: running mean for the first observations of a cell, then an
+# exponential weight of at least ALPHA; cells are scored once WARMUP rows are in
+# (a weekday x hour cell sees its 4th row in the 4th week of the data)
+ALPHA = 0.1
+WARMUP = 3
+
+# MAD of a normal distribution is 0.6745 standard deviations
+MAD_TO_STD = 1.4826
+
+
+class AnomalyDetector:
+    """Robust center/scale per borough x weekday x hour cell; O(1) scoring and updates."""
+
+    def __init__(self, boroughs=(), threshold=THRESHOLD):
+        self.threshold = threshold
+        self.boroughs = {}
+        self.count = np.zeros((0, 7, 24), dtype=np.int64)
+        self.center = np.zeros((0, 7, 24))
+        self.scale = np.zeros((0, 7, 24))
+        for borough in boroughs:
+            self._borough_code(borough)
+
+    def _borough_code(self, borough):
+        code = self.boroughs.get(borough)
+        if code is None:
+            code = self.boroughs[borough] = len(self.boroughs)
+            self.count = np.concatenate([self.count, np.zeros((1, 7, 24), dtype=np.int64)])
+            self.center = np.concatenate([self.center, np.zeros((1, 7, 24))])
+            self.scale = np.concatenate([self.scale, np.zeros((1, 7, 24))])
+        return code
+
+    @property
+    def nbytes(self):
+        return self.count.nbytes + self.center.nbytes + self.scale.nbytes
+
+    def _cells(self, df):
+        df = fill_missing_borough(df)
+        calendar = calendar_codes(df['pickup_dt'])
+        boroughs = df['borough'].astype(str).to_numpy()
+        codes = np.array([self._borough_code(b) for b in pd.unique(boroughs)])
+        lookup = dict(zip(pd.unique(boroughs), codes))
+        b_idx = pd.Series(boroughs).map(lookup).to_numpy()
+        return b_idx, calendar['day_of_week'], calendar['hour'], df
+
+    # ------------------------------------------------------------------
+    # batch
+    # ------------------------------------------------------------------
+    def fit(self, df):
+        """Baseline of every cell as the median and scaled MAD of its rows."""
+        b_idx, dow, hour, df = self._cells(df)
+        flat = np.ravel_multi_index((b_idx, dow, hour), self.center.shape)
+        pickups = df['pickups'].to_numpy(dtype=np.float64)
+        groups = pd.Series(pickups).groupby(flat)
+        center = groups.median()
+        mad = (pd.Series(pickups) - center.reindex(flat).to_numpy()).abs().groupby(flat).median()
+        self.count.flat[center.index] = groups.size().to_numpy()
+        self.center.flat[center.index] = center.to_numpy()
+        self.scale.flat[mad.index] = MAD_TO_STD * mad.to_numpy()
+        return self
+
+    def score(self, df):
+        """Vectorized scores of every row of `df` against the current state (no updates)."""
+        b_idx, dow, hour, df = self._cells(df)
+        center = self.center[b_idx, dow, hour]
+        scale = np.maximum(self.scale[b_idx, dow, hour], np.sqrt(np.maximum(center, 1)))
+        pickups = df['pickups'].to_numpy(dtype=np.float64)
+        z = np.where(self.count[b_idx, dow, hour] >= WARMUP, (pickups - center) / scale, np.nan)
+        return pd.DataFrame({
+            'pickup_dt': df['pickup_dt'].to_numpy(),
+            'borough': df['borough'].astype(str).to_numpy(),
+            'pickups': df['pickups'].to_numpy(),
+            'expected': center,
+            'z': z,
+            'anomaly': np.abs(z) >= self.threshold,
+        }, index=df.index)
+
+    # ------------------------------------------------------------------
+    # online
+    # ------------------------------------------------------------------
+    def score_row(self, pickup_dt, borough, pickups):
+        """Score one incoming row against the state, then fold it in; returns z (NaN while warming up)."""
+        b = self._borough_code(borough)
+        d, h = pickup_dt.dayofweek, pickup_dt.hour
+        n = self.count[b, d, h]
+        center = self.center[b, d, h]
+        scale = self.scale[b, d, h]
+
+        if n == 0:
+            # Nothing to measure a spread against yet: the first row sets the
+            # center and seeds the scale with its Poisson floor
+            self.center[b, d, h] = pickups
+            self.scale[b, d, h] = np.sqrt(max(pickups, 1.0))
+            self.count[b, d, h] = 1
+            return np.nan
+
+        z = np.nan
+        residual = pickups - center
+        if n >= WARMUP:
+            floored = max(scale, np.sqrt(max(center, 1.0)))
+            z = residual / floored
+            # Winsorize so a surge barely moves its own baseline
+            limit = CLIP * floored
+            residual = min(max(residual, -limit), limit)
+
+        alpha = max(1.0 / (n + 1), ALPHA)
+        self.center[b, d, h] = center + alpha * residual
+        self.scale[b, d, h] = np.sqrt((1 - alpha) * scale * scale + alpha * residual * residual)
+        self.count[b, d, h] = n + 1
+        return z
+
+    def stream(self, df):
+        """Replay rows in order through score_row(); returns the same frame as score()."""
+        df = fill_missing_borough(df)
+        timestamps = df['pickup_dt']
+        boroughs = df['borough'].astype(str).to_numpy()
+        pickups = df['pickups'].to_numpy(dtype=np.float64)
+        expected = np.empty(len(df))
+        z = np.empty(len(df))
+        for i, (ts, borough, value) in enumerate(zip(timestamps, boroughs, pickups)):
+            code = self._borough_code(borough)
+            expected[i] = self.center[code, ts.dayofweek, ts.hour]
+            z[i] = self.score_row(ts, borough, value)
+        return pd.DataFrame({
+            'pickup_dt': timestamps.to_numpy(),
+            'borough': boroughs,
+            'pickups': df['pickups'].to_numpy(),
+            'expected': expected,
+            'z': z,
+            'anomaly': np.abs(z) >= self.threshold,
+        }, index=df.index)
+
+
+def print_anomalies(scored, df, top=10, threshold=THRESHOLD):
+    """Most anomalous rows and the days with the most flagged rows."""
+    flagged = scored[scored['anomaly']]
+    print(f"Flagged {len(flagged):,} of {scored['z'].notna().sum():,} scored rows "
+          f"(|z| >= {threshold:g}): {(flagged['z'] > 0).sum():,} surges, {(flagged['z'] < 0).sum():,} drops")
+
+    columns = ['pickup_dt', 'borough', 'pickups', 'expected', 'z']
+    rounded = flagged[columns].round({'expected': 1, 'z': 1})
+    print(f"\n--- Top {top} Surges ---")
+    print(rounded[rounded['z'] > 0].nlargest(top, 'z').to_string(index=False))
+    print(f"\n--- Top {top} Drops ---")
+    print(rounded[rounded['z'] < 0].nsmallest(top, 'z').to_string(index=False))
+
+    # Days with the most flagged rows, with their holiday flag and weather
+    days = pd.Series(flagged['pickup_dt']).dt.normalize()
+    context = df.assign(day=df['pickup_dt'].dt.normalize()).groupby('day').agg(
+        holiday=('hday', lambda h: (h == 'Y').any()), pcp24=('pcp24', 'max'), sd=('sd', 'max'),
+        min_temp=('temp', 'min'))
+    by_day = pd.DataFrame({
+        'flagged': days.value_counts(),
+        'surges': days[flagged['z'].to_numpy() > 0].value_counts(),
+        'drops': days[flagged['z'].to_numpy() < 0].value_counts(),
+    }).fillna(0).astype(int).join(context)
+    by_day.index.name = 'day'
+    by_day.insert(0, 'weekday', [DAY_ORDER[d.dayofweek] for d in by_day.index])
+    print(f"\n--- Days with the Most Anomalous Hours (top {top}) ---")
+    print(by_day.sort_values('flagged', ascending=False).head(top).to_string())
+
+
+def benchmark(df, repeat=3):
+    """Rows per second of batch scoring and of online per-row scoring."""
+    fitted = AnomalyDetector().fit(df)
+    best = min(_timed(lambda: fitted.score(df)) for _ in range(repeat))
+    print(f"batch  fit + score: {len(df) / _timed(lambda: AnomalyDetector().fit(df).score(df)):12,.0f} rows/s")
+    print(f"batch  score only:  {len(df) / best:12,.0f} rows/s")
+    online = min(_timed(lambda: AnomalyDetector().stream(df)) for _ in range(repeat))
+    print(f"online score_row:   {len(df) / online:12,.0f} rows/s "
+          f"({1e6 * online / len(df):.1f} us per row, state {fitted.nbytes / 1024:.1f} KiB)")
+
+
+def _timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main():
+    from data_loader import read_uber_csv
+
+    parser = argparse.ArgumentParser(description='Demand anomalies vs a borough x weekday x hour baseline')
+    parser.add_argument('--data', default=DATA_FILE)
+    parser.add_argument('--mode', choices=['batch', 'stream'], default='batch',
+                        help='batch: fit the robust baseline and score all rows; stream: online replay')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD)
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--benchmark', action='store_true', help='measure scoring throughput')
+    args = parser.parse_args()
+
+    df = fill_missing_borough(read_uber_csv(args.data))
+    if args.benchmark:
+        benchmark(df)
+        return
+
+    start = time.perf_counter()
+    detector = AnomalyDetector(threshold=args.threshold)
+    if args.mode == 'batch':
+        scored = detector.fit(df).score(df)
+    else:
+        scored = detector.stream(df)
+    elapsed = time.perf_counter() - start
+    print(f"Scored {len(df):,} rows in {args.mode} mode in {elapsed:.3f}s "
+          f"({len(df) / elapsed:,.0f} rows/s; {detector.count.size:,} cells, "
+          f"{detector.nbytes / 1024:.1f} KiB of state)\n")
+    print_anomalies(scored, df, args.top, args.threshold)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,288 @@
+"""
+Uber Data Analysis - Benchmark Suite
+Times each stage of the pipeline (CSV load, datetime parsing, feature
+derivation, group-by families, correlation, binning, figure rendering) on
+Uber.csv and on synthetic datasets with the same schema at larger scales,
+records wall time and peak memory per stage to a JSON results file and
+compares them against a stored baseline
+
+Usage:
+    python benchmark.py                              # 1x, 10x, 100x and 1000x
+    python benchmark.py --scales 1 10                # only some scales
+    python benchmark.py --save-baseline              # store this run as the baseline
+    python benchmark.py --baseline other.json        # compare against another baseline
+"""
+
+import argparse
+import json
+import os
+import platform
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from data_loader import (DATA_FILE, DATETIME_FORMAT, COLUMNS, COLUMN_DTYPES, NUMERIC_COLUMNS,
+                         fill_missing_borough)
+from data_cache import CACHE_DIR
+from calendar_features import add_calendar_features, with_day_labels
+from groupby_engine import GroupByEngine
+from covariance_engine import CovarianceAccumulator
+from binning import Binner
+
+BENCH_DIR = os.path.join(CACHE_DIR, 'bench')
+RESULTS_FILE = 'benchmark_results.json'
+BASELINE_FILE = 'benchmark_baseline.json'
+
+DEFAULT_SCALES = [1, 10, 100, 1000]
+
+# A stage this much slower than the baseline is reported as a regression
+REGRESSION_THRESHOLD = 1.25
+
+
+def synthetic_dataset(scale, source=DATA_FILE, bench_dir=BENCH_DIR, seed=0):
+    """
+    Path of a CSV with `scale` copies of the source rows (same schema and date
+    range, Poisson-resampled pickups), generated on first use.
+    """
+    if scale == 1:
+        return source
+    path = os.path.join(bench_dir, f"uber_x{scale}.csv")
+    if os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(source):
+        return path
+
+    os.makedirs(bench_dir, exist_ok=True)
+    base = pd.read_csv(source, usecols=COLUMNS)[COLUMNS]
+    rng = np.random.default_rng(seed)
+    tmp_path = path + '.tmp'
+    start = time.perf_counter()
+    with open(tmp_path, 'w', newline='') as f:
+        for copy in range(scale):
+            block = base.copy()
+            block['pickups'] = rng.poisson(base['pickups'].to_numpy())
+            block.to_csv(f, index=False, header=(copy == 0))
+    os.replace(tmp_path, path)
+    print(f"Generated {path} ({scale * len(base):,} rows) in {time.perf_counter() - start:.1f}s")
+    return path
+
+
+# ============================================================================
+# STAGES
+# Each stage takes and returns the shared context dict so later stages reuse
+# the earlier stages' output; stages must be safe to run more than once.
+# ============================================================================
+
+def stage_csv_load(ctx):
+    # pickup_dt stays text here; parsing is timed as its own stage
+    ctx['raw'] = pd.read_csv(ctx['path'], usecols=COLUMNS, dtype=COLUMN_DTYPES)
+    return ctx
+
+
+def stage_datetime_parse(ctx):
+    ctx['pickup_dt'] = pd.to_datetime(ctx['raw']['pickup_dt'], format=DATETIME_FORMAT)
+    return ctx
+
+
+def stage_feature_derivation(ctx):
+    df = ctx['raw'].copy()
+    df['pickup_dt'] = ctx['pickup_dt']
+    df = add_calendar_features(df)
+    ctx['df'] = fill_missing_borough(df)
+    return ctx
+
+
+def stage_groupby_temporal(ctx):
+    df = ctx['df']
+    df.groupby('hour')['pickups'].agg(['mean', 'sum', 'count'])
+    with_day_labels(df.groupby('day_of_week')['pickups'].mean())
+    df.groupby('month')['pickups'].mean()
+    df.groupby(['is_weekend', 'hour'])['pickups'].mean().unstack()
+    return ctx
+
+
+def stage_groupby_borough(ctx):
+    df = ctx['df']
+    df.groupby('borough', observed=True)['pickups'].agg(['sum', 'mean', 'count'])
+    df.groupby(['borough', 'hour'], observed=True)['pickups'].mean().unstack()
+    df.groupby(['borough', 'day_of_week'], observed=True)['pickups'].mean().unstack()
+    return ctx
+
+
+def stage_groupby_holiday_weather(ctx):
+    df = ctx['df']
+    df.groupby('is_holiday')['pickups'].agg(['mean', 'sum', 'count'])
+    df.groupby(['is_holiday', 'hour'])['pickups'].mean().unstack()
+    df.groupby(df['pcp01'] > 0)['pickups'].agg(['mean', 'count'])
+    df.groupby(df['sd'] > 0)['pickups'].agg(['mean', 'count'])
+    return ctx
+
+
+def stage_groupby_cube(ctx):
+    df = ctx['df']
+    ctx['engine'] = GroupByEngine(df['pickups'], {
+        'hour': df['hour'],
+        'day_of_week': df['day_of_week'],
+        'month': df['month'],
+        'borough': df['borough'],
+        'is_holiday': df['is_holiday'],
+    })
+    for by in ['hour', 'day_of_week', 'month', 'borough', ['borough', 'hour'], ['is_holiday', 'hour']]:
+        ctx['engine'].mean(by)
+    return ctx
+
+
+def stage_correlation(ctx):
+    df = ctx['df']
+    ctx['corr'] = CovarianceAccumulator(NUMERIC_COLUMNS).update(df[NUMERIC_COLUMNS]).corr()
+    return ctx
+
+
+def stage_binning(ctx):
+    df = ctx['df']
+    binner = Binner()
+    for col in ['temp', 'spd', 'vsb']:
+        binner.aggregate(df['pickups'], {col: df[col]})
+    binner.aggregate(df['pickups'], {'temp': df['temp'], 'pcp01': df['pcp01']})
+    return ctx
+
+
+def stage_figure_rendering(ctx):
+    # Imported here so the other stages never pay for matplotlib
+    from figure_pipeline import render_figure
+
+    engine = ctx['engine']
+    hourly = engine.mean('hour')
+    borough_hour = engine.mean(['borough', 'hour']).unstack()
+    with tempfile.TemporaryDirectory() as tmp:
+        render_figure({
+            'filename': os.path.join(tmp, 'bench.png'),
+            'figsize': (16, 6),
+            'grid': (1, 2),
+            'dpi': 150,
+            'panels': [
+                {'kind': 'plot', 'series': [{'x': hourly.index, 'y': hourly.values, 'marker': 'o'}],
+                 'title': 'Average Pickups by Hour'},
+                {'kind': 'heatmap', 'data': borough_hour, 'style': {'cmap': 'YlOrRd'},
+                 'title': 'Borough x Hour'},
+            ],
+        })
+    return ctx
+
+
+STAGES = [
+    ('csv_load', stage_csv_load),
+    ('datetime_parse', stage_datetime_parse),
+    ('feature_derivation', stage_feature_derivation),
+    ('groupby_temporal', stage_groupby_temporal),
+    ('groupby_borough', stage_groupby_borough),
+    ('groupby_holiday_weather', stage_groupby_holiday_weather),
+    ('groupby_cube', stage_groupby_cube),
+    ('correlation', stage_correlation),
+    ('binning', stage_binning),
+    ('figure_rendering', stage_figure_rendering),
+]
+
+
+def run_stages(path, repeat=3, stages=STAGES):
+    """
+    Run every stage on one dataset. Peak memory comes from a first, traced run
+    (tracemalloc sees numpy/pandas buffers); wall time is the best of `repeat`
+    untraced runs.
+    """
+    ctx = {'path': path}
+    results = {}
+    for name, stage in stages:
+        tracemalloc.start()
+        ctx = stage(ctx)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            ctx = stage(ctx)
+            times.append(time.perf_counter() - start)
+        results[name] = {'seconds': min(times), 'peak_mb': peak / 1024 ** 2}
+        print(f"  {name:24s} {min(times):9.4f}s  {peak / 1024 ** 2:10.1f} MB peak")
+    return len(ctx['raw']), results
+
+
+def run_benchmarks(scales=DEFAULT_SCALES, repeat=3, source=DATA_FILE):
+    """Benchmark every scale; returns the machine-readable results."""
+    report = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'repeat': repeat,
+        'scales': {},
+    }
+    for scale in scales:
+        path = synthetic_dataset(scale, source)
+        print(f"\n--- {scale}x: {path} ---")
+        rows, stages = run_stages(path, repeat)
+        report['scales'][str(scale)] = {'rows': rows, 'stages': stages}
+    return report
+
+
+def compare(report, baseline, threshold=REGRESSION_THRESHOLD):
+    """Print per-stage time/memory ratios against a baseline; returns the regressions."""
+    regressions = []
+    print("\n--- Comparison with baseline (ratio = current / baseline) ---")
+    for scale, current in report['scales'].items():
+        base = baseline.get('scales', {}).get(scale)
+        if base is None:
+            print(f"{scale}x: not in baseline")
+            continue
+        for name, stats in current['stages'].items():
+            base_stats = base['stages'].get(name)
+            if base_stats is None:
+                continue
+            time_ratio = stats['seconds'] / max(base_stats['seconds'], 1e-9)
+            mem_ratio = stats['peak_mb'] / max(base_stats['peak_mb'], 1e-9)
+            flag = ''
+            if time_ratio > threshold or mem_ratio > threshold:
+                flag = '  REGRESSION'
+                regressions.append((scale, name, time_ratio, mem_ratio))
+            print(f"{scale:>5s}x {name:24s} time {time_ratio:5.2f}x  memory {mem_ratio:5.2f}x{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the Uber analysis pipeline stages')
+    parser.add_argument('--data', default=DATA_FILE, help='source CSV (the 1x dataset)')
+    parser.add_argument('--scales', type=int, nargs='+', default=DEFAULT_SCALES,
+                        help='dataset sizes as multiples of the source')
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per stage (best is kept)')
+    parser.add_argument('--output', default=RESULTS_FILE, help='results file')
+    parser.add_argument('--baseline', default=BASELINE_FILE, help='baseline file to compare against')
+    parser.add_argument('--save-baseline', action='store_true', help='store this run as the baseline')
+    args = parser.parse_args()
+
+    print("="*80)
+    print("UBER DATA ANALYSIS - BENCHMARKS")
+    print("="*80)
+    report = run_benchmarks(args.scales, args.repeat, args.data)
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f))
+        print(f"\n{len(regressions)} regression(s) above {REGRESSION_THRESHOLD:.2f}x")
+    else:
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""
+Uber Data Analysis - Fixed-Edge Binning Engine
+Weather columns are binned against persisted, configurable cut points
+(bin_edges.json) instead of data-dependent pd.cut edges, so bins are the same
+in every run, chunk, shard and day and their partials can be merged. Bins are
+right-closed like pd.cut, with open outer bins, and values map to compact
+integer codes via searchsorted; joint bins (e.g. temp x pcp01) are a
+mixed-radix code of the per-column codes
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+BIN_EDGES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bin_edges.json')
+
+# Used when bin_edges.json is missing or has no entry for a column
+DEFAULT_BIN_EDGES = {
+    'temp': [10, 20, 30, 40, 50, 60, 70, 80],
+    'spd': [2, 4, 6, 8, 10, 12, 15],
+    'vsb': [1, 2, 4, 6, 8, 9.9],
+    'pcp01': [0, 0.02, 0.05],
+}
+
+
+def load_bin_edges(path=BIN_EDGES_FILE):
+    """Cut points per column from `path`, falling back to DEFAULT_BIN_EDGES."""
+    edges = dict(DEFAULT_BIN_EDGES)
+    try:
+        with open(path) as f:
+            edges.update(json.load(f))
+    except FileNotFoundError:
+        pass
+    return edges
+
+
+def _format_edge(edge):
+    return f"{edge:g}"
+
+
+class Binner:
+    """Integer bin codes, labels and per-bin aggregates for the configured columns."""
+
+    def __init__(self, edges=None):
+        edges = load_bin_edges() if edges is None else edges
+        self.edges = {col: np.asarray(cuts, dtype=np.float64) for col, cuts in edges.items()}
+        for col, cuts in self.edges.items():
+            if np.any(np.diff(cuts) <= 0):
+                raise ValueError(f"Bin edges of {col!r} must be strictly increasing")
+
+    def n_bins(self, col):
+        return len(self.edges[col]) + 1
+
+    def codes(self, col, values):
+        """Bin code of each value: 0 for values <= the first cut, n_bins-1 above the last."""
+        codes = np.searchsorted(self.edges[col], np.asarray(values, dtype=np.float64), side='left')
+        return codes.astype(np.int8 if self.n_bins(col) <= 127 else np.int16)
+
+    def intervals(self, col):
+        """The bins as a right-closed IntervalIndex (outer bins open to +-inf)."""
+        breaks = np.concatenate([[-np.inf], self.edges[col], [np.inf]])
+        return pd.IntervalIndex.from_breaks(breaks, closed='right', name=f"{col}_bin")
+
+    def labels(self, col):
+        """Short labels for plots: '<=10', '10-20', ..., '>80'."""
+        cuts = [_format_edge(edge) for edge in self.edges[col]]
+        return ([f"<={cuts[0]}"] + [f"{lo}-{hi}" for lo, hi in zip(cuts[:-1], cuts[1:])]
+                + [f">{cuts[-1]}"])
+
+    def categorical(self, col, values):
+        """Bins of `values` as a Categorical over intervals() (compact codes, pd.cut-like labels)."""
+        return pd.Categorical.from_codes(self.codes(col, values), categories=self.intervals(col),
+                                         ordered=True)
+
+    def combine(self, cols, codes):
+        """Mixed-radix joint code from per-column bin codes."""
+        combined = np.zeros(len(codes[0]), dtype=np.int64)
+        for col, col_codes in zip(cols, codes):
+            combined = combined * self.n_bins(col) + np.asarray(col_codes, dtype=np.int64)
+        return combined
+
+    def joint_codes(self, columns):
+        """Joint bin code of several columns; `columns` maps a column to its values."""
+        return self.combine(list(columns), [self.codes(col, values) for col, values in columns.items()])
+
+    def joint_index(self, cols):
+        """MultiIndex of every joint bin, in joint_codes() order."""
+        return pd.MultiIndex.from_product([self.intervals(col) for col in cols])
+
+    def aggregate(self, measure, columns, observed=True):
+        """
+        Mean, sum and count of `measure` per (joint) bin of `columns` (a dict of
+        column -> values), in one bincount pass. Empty bins are dropped unless
+        `observed` is False.
+        """
+        measure = np.asarray(measure, dtype=np.float64)
+        codes = [self.codes(col, values) for col, values in columns.items()]
+        return self.aggregate_codes(list(columns), codes, measure, np.ones(len(measure)), observed)
+
+    def aggregate_codes(self, cols, codes, sums, counts, observed=True):
+        """
+        Same as aggregate() from per-column bin codes with a partial sum and
+        count per entry (rows, cube cells or timestamps).
+        """
+        combined = self.combine(cols, codes)
+        size = int(np.prod([self.n_bins(col) for col in cols]))
+        sums = np.bincount(combined, weights=np.asarray(sums, dtype=np.float64), minlength=size)
+        counts = np.bincount(combined, weights=np.asarray(counts, dtype=np.float64), minlength=size)
+        index = self.intervals(cols[0]) if len(cols) == 1 else self.joint_index(cols)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            table = pd.DataFrame({'mean': sums / counts, 'sum': sums, 'count': counts.astype(np.int64)},
+                                 index=index)
+        return table[table['count'] > 0] if observed else table
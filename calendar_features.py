@@ -0,0 +1,64 @@
+"""
+Uber Data Analysis - Calendar Feature Layer
+Derives integer calendar codes (hour, weekday 0-6, month 1-12, day of month,
+days since epoch) from the datetime64 timestamps in one vectorized pass.
+Codes are computed once per distinct timestamp (the data has only a few
+thousand distinct hours) and broadcast back to the rows; day and month names
+are attached only when results are presented.
+"""
+
+import numpy as np
+import pandas as pd
+
+DAY_ORDER = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+MONTH_ORDER = ['January', 'February', 'March', 'April', 'May', 'June',
+               'July', 'August', 'September', 'October', 'November', 'December']
+
+CALENDAR_COLUMNS = ['hour', 'day_of_week', 'month', 'day_of_month', 'days_since_epoch', 'is_weekend']
+
+
+def _codes_for(unique_ts):
+    """Calendar codes for an array of distinct datetime64 values."""
+    days = unique_ts.astype('datetime64[D]')
+    months = unique_ts.astype('datetime64[M]')
+    days_since_epoch = days.astype(np.int64)
+    # 1970-01-01 was a Thursday; Monday = 0
+    day_of_week = (days_since_epoch + 3) % 7
+    return {
+        'hour': (unique_ts.astype('datetime64[h]').astype(np.int64) % 24).astype(np.int8),
+        'day_of_week': day_of_week.astype(np.int8),
+        'month': (months.astype(np.int64) % 12 + 1).astype(np.int8),
+        'day_of_month': (days_since_epoch - months.astype('datetime64[D]').astype(np.int64) + 1).astype(np.int8),
+        'days_since_epoch': days_since_epoch.astype(np.int32),
+        'is_weekend': day_of_week >= 5,
+    }
+
+
+def calendar_codes(timestamps):
+    """Dict of integer calendar code arrays, one entry per row of `timestamps`."""
+    values = np.asarray(timestamps)
+    inverse, unique_ts = pd.factorize(values)
+    unique_codes = _codes_for(np.asarray(unique_ts, dtype=values.dtype))
+    return {name: codes.take(inverse) for name, codes in unique_codes.items()}
+
+
+def add_calendar_features(df):
+    """Add CALENDAR_COLUMNS and the is_holiday flag to a frame (in place)."""
+    for name, codes in calendar_codes(df['pickup_dt']).items():
+        df[name] = codes
+    df['is_holiday'] = df['hday'] == 'Y'
+    return df
+
+
+def with_day_labels(obj):
+    """Reindex a result keyed by weekday code 0-6 to Monday..Sunday labels."""
+    obj = obj.reindex(range(7))
+    obj.index = pd.Index(DAY_ORDER, name='day_of_week')
+    return obj
+
+
+def with_month_labels(obj):
+    """Reindex a result keyed by month 1-12 to January..December labels."""
+    obj = obj.reindex(range(1, 13))
+    obj.index = pd.Index(MONTH_ORDER, name='month_name')
+    return obj
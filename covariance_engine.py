@@ -0,0 +1,150 @@
+"""
+Uber Data Analysis - Online Covariance Engine
+Numerically stable running means and co-moments (Welford updates, Chan et al.
+pairwise merges) over the pickups/weather columns. Accumulators can be fed in
+chunks or per partition and merged across workers, and produce the same Pearson
+matrix as DataFrame.corr() without materializing the rows.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+class CovarianceAccumulator:
+    """Count, mean vector and co-moment matrix of a fixed set of columns."""
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        width = len(self.columns)
+        self.count = 0
+        self.mean = np.zeros(width)
+        # Sum of outer products of deviations from the running mean
+        self.comoment = np.zeros((width, width))
+
+    @classmethod
+    def from_moments(cls, columns, count, mean, comoment):
+        """Accumulator with the given count, mean vector and co-moment matrix."""
+        acc = cls(columns)
+        return acc._combine(count, np.asarray(mean, dtype=np.float64), np.asarray(comoment, dtype=np.float64))
+
+    def _combine(self, count, mean, comoment):
+        if count == 0:
+            return self
+        total = self.count + count
+        delta = mean - self.mean
+        self.comoment += comoment + np.outer(delta, delta) * (self.count * count / total)
+        self.mean += delta * (count / total)
+        self.count = total
+        return self
+
+    def update(self, values):
+        """Fold a block of rows (DataFrame or 2-D array in column order) into the moments."""
+        if isinstance(values, pd.DataFrame):
+            values = values[self.columns]
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) == 0:
+            return self
+        mean = values.mean(axis=0)
+        centered = values - mean
+        return self._combine(len(values), mean, centered.T @ centered)
+
+    def merge(self, other):
+        """Combine the moments of another accumulator over the same columns."""
+        return self._combine(other.count, other.mean, other.comoment)
+
+    def cov(self, ddof=1):
+        if self.count > ddof:
+            cov = self.comoment / (self.count - ddof)
+        else:
+            cov = np.full_like(self.comoment, np.nan)
+        return pd.DataFrame(cov, index=self.columns, columns=self.columns)
+
+    def std(self, ddof=1):
+        return pd.Series(np.sqrt(np.diag(self.cov(ddof).to_numpy())), index=self.columns)
+
+    def corr(self):
+        """Pearson correlation matrix; NaN where a column is constant."""
+        cov = self.cov().to_numpy()
+        std = np.sqrt(np.diag(cov))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            corr = np.clip(cov / np.outer(std, std), -1.0, 1.0)
+        np.fill_diagonal(corr, np.where(std > 0, 1.0, np.nan))
+        return pd.DataFrame(corr, index=self.columns, columns=self.columns)
+
+
+class GroupedCovariance:
+    """One CovarianceAccumulator per combination of key values (e.g. borough x hour).
+
+    Rollups to any subset of the keys (per borough, per hour, overall) are
+    merges of the cell accumulators, so a single pass serves all of them.
+    """
+
+    def __init__(self, columns, keys):
+        self.columns = list(columns)
+        self.keys = list(keys)
+        self.cells = {}
+
+    def update(self, values, keys):
+        """Fold a block of rows into the cell of each row's key values.
+
+        `keys` holds one array/Series per key name, aligned with `values`.
+        """
+        if isinstance(values, pd.DataFrame):
+            values = values[self.columns]
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) == 0:
+            return self
+        codes = np.zeros(len(values), dtype=np.int64)
+        labels = []
+        for key in keys:
+            key_codes, uniques = pd.factorize(np.asarray(key), sort=True)
+            codes = codes * len(uniques) + key_codes
+            labels.append(uniques)
+        order = np.argsort(codes, kind='stable')
+        sorted_codes = codes[order]
+        starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+        ends = np.r_[starts[1:], len(order)]
+        for start, end in zip(starts, ends):
+            cell, label = int(sorted_codes[start]), []
+            for uniques in reversed(labels):
+                cell, code = divmod(cell, len(uniques))
+                label.append(uniques[code].item() if hasattr(uniques[code], 'item') else uniques[code])
+            label = tuple(reversed(label))
+            if label not in self.cells:
+                self.cells[label] = CovarianceAccumulator(self.columns)
+            self.cells[label].update(values[order[start:end]])
+        return self
+
+    def merge(self, other):
+        """Combine the cells of another grouped accumulator with the same keys."""
+        for label, acc in other.cells.items():
+            if label not in self.cells:
+                self.cells[label] = CovarianceAccumulator(self.columns)
+            self.cells[label].merge(acc)
+        return self
+
+    def rollup(self, key):
+        """Dict of accumulators per value of one key, merged over the other keys."""
+        level = self.keys.index(key)
+        merged = {}
+        for label in sorted(self.cells, key=lambda l: l[level]):
+            value = label[level]
+            if value not in merged:
+                merged[value] = CovarianceAccumulator(self.columns)
+            merged[value].merge(self.cells[label])
+        return merged
+
+    def total(self):
+        """Accumulator over every row seen."""
+        total = CovarianceAccumulator(self.columns)
+        for label in sorted(self.cells):
+            total.merge(self.cells[label])
+        return total
+
+    def corr_with(self, key, column='pickups'):
+        """Correlation of `column` with every other column, per value of `key`."""
+        others = [c for c in self.columns if c != column]
+        rows = {value: acc.corr().loc[column, others] for value, acc in self.rollup(key).items()}
+        table = pd.DataFrame(rows).T
+        table.index.name = key
+        return table
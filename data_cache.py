@@ -0,0 +1,117 @@
+"""
+Uber Data Cache
+Columnar binary cache of Uber.csv with the temporal features already derived
+"""
+
+import hashlib
+import json
+import os
+import time
+
+import pandas as pd
+
+from data_loader import DATA_FILE, load_uber_data
+from calendar_features import add_calendar_features
+
+CACHE_DIR = '.uber_cache'
+
+# Bump whenever the schema or the derived features change so stale caches are rebuilt
+CACHE_VERSION = 2
+
+
+def cache_format():
+    """
+    'parquet' when pyarrow is installed, else 'pickle' (still binary and
+    dtype-preserving). Probed on first use, not at import, so commands that
+    never touch the cache do not load pyarrow.
+    """
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return 'pickle'
+    return 'parquet'
+
+
+def file_fingerprint(path, block_size=1 << 20):
+    """Size, mtime and content hash identifying one version of a source file."""
+    stat = os.stat(path)
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return {
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'sha256': digest.hexdigest(),
+    }
+
+
+def cache_paths(path, cache_dir=CACHE_DIR):
+    """Data and metadata file locations for the cache of one source file."""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    # Different directories may hold files with the same name
+    source_id = hashlib.sha1(os.path.abspath(path).encode()).hexdigest()[:8]
+    base = os.path.join(cache_dir, f"{stem}-{source_id}")
+    return f"{base}.{cache_format()}", f"{base}.json"
+
+
+def _read_metadata(meta_file):
+    try:
+        with open(meta_file) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_frame(df, data_file):
+    tmp_file = data_file + '.tmp'
+    if cache_format() == 'parquet':
+        df.to_parquet(tmp_file, index=False)
+    else:
+        df.to_pickle(tmp_file)
+    os.replace(tmp_file, data_file)
+
+
+def _read_frame(data_file):
+    if cache_format() == 'parquet':
+        return pd.read_parquet(data_file)
+    return pd.read_pickle(data_file)
+
+
+def load_cached_data(path=DATA_FILE, cache_dir=CACHE_DIR, verbose=True):
+    """
+    Load the dataset with temporal features, reusing the binary cache when the
+    source file's size, mtime and hash still match.
+
+    Returns (df, cache_hit).
+    """
+    data_file, meta_file = cache_paths(path, cache_dir)
+    fingerprint = file_fingerprint(path)
+    fingerprint.update(version=CACHE_VERSION, format=cache_format())
+
+    meta = _read_metadata(meta_file)
+    if meta is not None and meta.get('source') == fingerprint and os.path.exists(data_file):
+        start = time.perf_counter()
+        df = _read_frame(data_file)
+        warm = time.perf_counter() - start
+        if verbose:
+            cold = meta['cold_seconds']
+            print(f"Cache hit: loaded {data_file} in {warm:.3f}s "
+                  f"(cold: {cold:.3f}s, warm: {warm:.3f}s, {cold / max(warm, 1e-9):.1f}x faster)")
+        return df, True
+
+    start = time.perf_counter()
+    df = add_calendar_features(load_uber_data(path, verbose=verbose))
+    cold = time.perf_counter() - start
+
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        _write_frame(df, data_file)
+        with open(meta_file, 'w') as f:
+            json.dump({'source': fingerprint, 'cold_seconds': cold}, f, indent=2)
+        if verbose:
+            print(f"Cache miss: parsed CSV and derived features in {cold:.3f}s, "
+                  f"cached as {data_file}")
+    except OSError as e:
+        print(f"Warning: could not write cache ({e})")
+    return df, False
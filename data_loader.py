@@ -0,0 +1,103 @@
+"""
+Uber Data Loader
+Shared, typed loader for Uber.csv used by all analysis scripts
+"""
+
+import csv
+import glob
+import os
+import time
+import pandas as pd
+
+DATA_FILE = 'Uber.csv'
+
+# pickup_dt is always written as e.g. "2015-01-01 01:00:00"
+DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+WEATHER_COLUMNS = ['spd', 'vsb', 'temp', 'dewp', 'slp', 'pcp01', 'pcp06', 'pcp24', 'sd']
+
+# Explicit schema: categoricals for the low-cardinality labels, a compact
+# unsigned int for the counts and float32 for the weather readings
+COLUMN_DTYPES = {
+    'borough': 'category',
+    'pickups': 'uint32',
+    'hday': 'category',
+}
+COLUMN_DTYPES.update({col: 'float32' for col in WEATHER_COLUMNS})
+
+COLUMNS = ['pickup_dt', 'borough', 'pickups'] + WEATHER_COLUMNS + ['hday']
+
+# Columns entering the pickups/weather correlation matrix
+NUMERIC_COLUMNS = ['pickups'] + WEATHER_COLUMNS
+
+
+def memory_usage_mb(df):
+    """Deep memory footprint of a DataFrame in megabytes."""
+    return df.memory_usage(deep=True).sum() / 1024 ** 2
+
+
+def data_files(spec=DATA_FILE):
+    """CSV files named by a path, a directory (all *.csv in it) or a glob pattern, sorted."""
+    if os.path.isdir(spec):
+        files = sorted(glob.glob(os.path.join(spec, '*.csv')))
+    elif glob.has_magic(spec):
+        files = sorted(glob.glob(spec))
+    else:
+        files = [spec] if os.path.exists(spec) else []
+    if not files:
+        raise FileNotFoundError(f"No CSV files match {spec!r} (no such file, no *.csv in the directory "
+                                f"or no glob matches)")
+    return files
+
+
+def check_schema(path):
+    """Raise ValueError unless the CSV header has every column of the Uber schema."""
+    with open(path, newline='') as f:
+        # csv.reader strips the quotes Uber.csv puts around its column names
+        header = [name.strip() for name in next(csv.reader(f), [])]
+    missing = [col for col in COLUMNS if col not in header]
+    if missing:
+        raise ValueError(f"{path}: schema mismatch, missing columns {missing} (header: {header})")
+    return header
+
+
+def read_uber_csv(path=DATA_FILE, **kwargs):
+    """Read an Uber CSV with the explicit schema (extra kwargs go to read_csv)."""
+    return pd.read_csv(
+        path,
+        usecols=COLUMNS,
+        dtype=COLUMN_DTYPES,
+        parse_dates=['pickup_dt'],
+        date_format=DATETIME_FORMAT,
+        **kwargs
+    )
+
+
+def fill_missing_borough(df):
+    """Label records without a borough as 'Unknown' (in place)."""
+    if df['borough'].isnull().any():
+        if 'Unknown' not in df['borough'].cat.categories:
+            df['borough'] = df['borough'].cat.add_categories('Unknown')
+        df['borough'] = df['borough'].fillna('Unknown')
+    return df
+
+
+def load_uber_data(path=DATA_FILE, verbose=True):
+    """
+    Load Uber.csv with typed columns and report load time and memory.
+    A directory or glob of several files is read in parallel (see multi_file.py).
+    """
+    files = data_files(path)
+    if len(files) > 1:
+        from multi_file import load_files
+        return load_files(files, verbose=verbose)
+    # A directory or glob may resolve to a single file
+    path = files[0]
+    start = time.perf_counter()
+    df = read_uber_csv(path)
+    elapsed = time.perf_counter() - start
+
+    if verbose:
+        print(f"Loaded {len(df):,} rows from {path} in {elapsed:.3f}s "
+              f"({memory_usage_mb(df):.2f} MB in memory)")
+    return df
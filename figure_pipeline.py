@@ -0,0 +1,203 @@
+"""
+Uber Data Analysis - Figure Rendering Pipeline
+Each figure is a declarative spec over precomputed aggregates. Specs are
+rendered lazily in a process pool, every figure is closed right after saving,
+and figures whose spec and data did not change since the last run are skipped
+"""
+
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from data_cache import CACHE_DIR
+
+MANIFEST_FILE = os.path.join(CACHE_DIR, 'figures.json')
+
+# Bump when the drawing code changes so every figure is re-rendered
+RENDERER_VERSION = 1
+
+# Significant digits of the numbers hashed into a spec's digest, so summation
+# order (pandas vs SQL aggregates) does not change it
+DIGEST_DIGITS = 10
+
+STYLE = 'whitegrid'
+
+# A figure spec is a dict:
+#   filename, description, figsize, grid=(nrows, ncols), suptitle, dpi,
+#   panels=[{kind: 'plot'|'bar'|'histogram'|'heatmap', ...data and styling...}]
+# Panels only hold precomputed arrays/frames, never the raw dataset; 'histogram'
+# panels draw precomputed bin counts (edges, counts) as bars.
+
+
+def _canonical_numbers(values):
+    """float64 values rounded to DIGEST_DIGITS significant digits."""
+    values = np.asarray(values, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        magnitude = np.floor(np.log10(np.abs(values)))
+    scale = 10.0 ** (DIGEST_DIGITS - 1 - np.where(np.isfinite(magnitude), magnitude, 0))
+    return np.where(np.isfinite(values), np.round(values * scale) / scale, values)
+
+
+def _update_digest(h, obj):
+    """
+    Feed a spec into a hash in a canonical way: numbers as rounded float64
+    whatever their dtype, indexes as their names and plain label values
+    (categorical or not), so backends that build the same data hash alike.
+    """
+    if isinstance(obj, dict):
+        h.update(b'{')
+        for key in sorted(obj):
+            _update_digest(h, key)
+            _update_digest(h, obj[key])
+        h.update(b'}')
+    elif isinstance(obj, (list, tuple, range)):
+        h.update(b'[')
+        for item in obj:
+            _update_digest(h, item)
+        h.update(b']')
+    elif isinstance(obj, pd.DataFrame):
+        _update_digest(h, [obj.index, obj.columns, obj.to_numpy()])
+    elif isinstance(obj, pd.Series):
+        _update_digest(h, [obj.index, obj.to_numpy()])
+    elif isinstance(obj, pd.Index):
+        _update_digest(h, [list(obj.names), np.asarray(obj.to_numpy())])
+    elif isinstance(obj, np.ndarray):
+        if obj.dtype.kind in 'biuf':
+            h.update(f"numbers{obj.shape}".encode())
+            h.update(np.ascontiguousarray(_canonical_numbers(obj)).tobytes())
+        elif obj.dtype.kind == 'M':
+            h.update(f"datetimes{obj.shape}".encode())
+            h.update(np.ascontiguousarray(obj.astype('datetime64[ns]')).tobytes())
+        else:
+            _update_digest(h, obj.tolist())
+    elif isinstance(obj, (int, float, np.number)) and not isinstance(obj, (bool, np.bool_)):
+        h.update(repr(float(_canonical_numbers(obj))).encode())
+    else:
+        h.update(repr(obj).encode())
+
+
+def spec_digest(spec):
+    """Content hash of a figure spec, including its data."""
+    h = hashlib.sha256()
+    _update_digest(h, [RENDERER_VERSION, spec])
+    return h.hexdigest()
+
+
+def _draw_panel(ax, panel, sns):
+    kind = panel['kind']
+    style = panel.get('style', {})
+    if kind == 'plot':
+        for series in panel['series']:
+            series = dict(series)
+            ax.plot(series.pop('x'), series.pop('y'), **series)
+    elif kind == 'bar':
+        ax.bar(panel['x'], panel['height'], **style)
+    elif kind == 'histogram':
+        edges = np.asarray(panel['edges'])
+        ax.bar(edges[:-1], panel['counts'], width=np.diff(edges), align='edge', **style)
+    elif kind == 'heatmap':
+        sns.heatmap(panel['data'], ax=ax, **style)
+    else:
+        raise ValueError(f"Unknown panel kind: {kind}")
+
+    if 'title' in panel:
+        ax.set_title(panel['title'], **panel.get('title_style', {}))
+    if 'xlabel' in panel:
+        ax.set_xlabel(panel['xlabel'])
+    if 'ylabel' in panel:
+        ax.set_ylabel(panel['ylabel'])
+    for line in panel.get('axvlines', []):
+        ax.axvline(**line)
+    if 'xticks' in panel:
+        ax.set_xticks(panel['xticks'])
+    if 'xticklabels' in panel:
+        ax.set_xticklabels(panel['xticklabels'], rotation=45, ha='right')
+    if 'tick_params' in panel:
+        ax.tick_params(**panel['tick_params'])
+    if panel.get('legend'):
+        ax.legend()
+    if 'grid' in panel:
+        ax.grid(True, **panel['grid'])
+
+
+def render_figure(spec):
+    """Render one spec to its PNG file and close the figure."""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    sns.set_style(STYLE)
+    nrows, ncols = spec.get('grid', (1, 1))
+    fig, axes = plt.subplots(nrows, ncols, figsize=spec['figsize'])
+    try:
+        if 'suptitle' in spec:
+            fig.suptitle(spec['suptitle'], fontsize=16, y=1.02)
+        for ax, panel in zip(np.atleast_1d(axes).ravel(), spec['panels']):
+            _draw_panel(ax, panel, sns)
+        fig.tight_layout()
+        fig.savefig(spec['filename'], dpi=spec.get('dpi', 300), bbox_inches='tight')
+    finally:
+        plt.close(fig)
+    return spec['filename']
+
+
+def _render_timed(spec):
+    start = time.perf_counter()
+    return render_figure(spec), time.perf_counter() - start
+
+
+def _load_manifest(manifest_file):
+    try:
+        with open(manifest_file) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def render_figures(specs, workers=None, manifest_file=MANIFEST_FILE, force=False, profiler=None):
+    """
+    Render the specs whose content changed, in parallel; returns rendered filenames.
+    Per-figure render times (measured in the workers) go to `profiler` if given.
+    """
+    start = time.perf_counter()
+    manifest = _load_manifest(manifest_file)
+
+    pending = []
+    for spec in specs:
+        digest = spec_digest(spec)
+        if not force and manifest.get(spec['filename']) == digest and os.path.exists(spec['filename']):
+            print(f"✓ {spec['description']} unchanged, kept '{spec['filename']}'")
+        else:
+            pending.append((spec, digest))
+
+    workers = min(workers or os.cpu_count() or 1, max(len(pending), 1))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            timed = list(pool.map(_render_timed, [spec for spec, _ in pending]))
+    else:
+        timed = [_render_timed(spec) for spec, _ in pending]
+    rendered = [filename for filename, _ in timed]
+    if profiler is not None:
+        for filename, seconds in timed:
+            profiler.record(f"render + savefig({filename})", seconds)
+
+    for spec, digest in pending:
+        manifest[spec['filename']] = digest
+        print(f"✓ {spec['description']} saved as '{spec['filename']}'")
+
+    try:
+        os.makedirs(os.path.dirname(manifest_file) or '.', exist_ok=True)
+        with open(manifest_file, 'w') as f:
+            json.dump(manifest, f, indent=2)
+    except OSError as e:
+        print(f"Warning: could not write figure manifest ({e})")
+
+    print(f"\nRendered {len(rendered)} figure(s), skipped {len(specs) - len(rendered)} unchanged "
+          f"in {time.perf_counter() - start:.2f}s ({workers} worker(s))")
+    return rendered
@@ -0,0 +1,281 @@
+"""
+Uber Data Analysis - Dense Grid Store
+Uber.csv is a regular grid: each hourly pickup_dt appears once per borough and
+the weather/holiday columns repeat across a timestamp's borough rows. The
+store keeps pickups as a [timestamp x borough] array (with a mask for missing
+cells) and weather/holiday once per timestamp, as memory-mapped .npy files.
+Report aggregates are axis reductions over the grid; the long-format
+DataFrame is rebuilt on demand with frame()
+"""
+
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from data_loader import DATA_FILE, COLUMNS, WEATHER_COLUMNS, NUMERIC_COLUMNS, read_uber_csv, fill_missing_borough
+from data_cache import CACHE_DIR, file_fingerprint
+from calendar_features import calendar_codes, with_day_labels, with_month_labels
+from covariance_engine import GroupedCovariance
+from quantile_sketch import exact_quantile_table
+from binning import Binner
+
+GRID_DIR = os.path.join(CACHE_DIR, 'grid')
+
+# Bump when the on-disk layout changes
+GRID_VERSION = 1
+
+ARRAYS = ['timestamps', 'pickups', 'present', 'weather', 'holiday']
+
+
+def build_grid(df):
+    """Grid arrays and borough labels from a long-format frame."""
+    df = fill_missing_borough(df)
+    t_codes, timestamps = pd.factorize(df['pickup_dt'], sort=True)
+    b_codes, boroughs = pd.factorize(df['borough'].astype(str), sort=True)
+    shape = (len(timestamps), len(boroughs))
+
+    present = np.zeros(shape, dtype=bool)
+    present[t_codes, b_codes] = True
+    if present.sum() != len(df):
+        raise ValueError("Duplicate (pickup_dt, borough) rows; the data is not a grid")
+    pickups = np.zeros(shape, dtype=np.uint32)
+    pickups[t_codes, b_codes] = df['pickups'].to_numpy()
+
+    # One weather/holiday row per timestamp; they must agree across boroughs
+    first = np.full(len(timestamps), -1)
+    first[t_codes[::-1]] = np.arange(len(df))[::-1]
+    weather = df[WEATHER_COLUMNS].to_numpy(dtype=np.float32)
+    holiday = (df['hday'] == 'Y').to_numpy()
+    if not (np.array_equal(weather, weather[first][t_codes], equal_nan=True)
+            and np.array_equal(holiday, holiday[first][t_codes])):
+        raise ValueError("Weather or holiday values differ between boroughs of one timestamp")
+
+    arrays = {
+        'timestamps': np.asarray(timestamps, dtype='datetime64[us]'),
+        'pickups': pickups,
+        'present': present,
+        'weather': weather[first],
+        'holiday': holiday[first],
+    }
+    return arrays, [str(b) for b in boroughs]
+
+
+class GridStore:
+    """Memory-mapped grid arrays with report aggregates as axis reductions."""
+
+    def __init__(self, arrays, boroughs):
+        for name in ARRAYS:
+            setattr(self, name, arrays[name])
+        self.boroughs = pd.Index(boroughs, name='borough')
+        self.calendar = calendar_codes(self.timestamps)
+        # Rows (present cells) and pickups per timestamp
+        self.rows_per_ts = self.present.sum(axis=1)
+        self.pickups_per_ts = self.pickups.sum(axis=1, dtype=np.int64)
+
+    @classmethod
+    def open(cls, grid_dir=GRID_DIR, mmap_mode='r'):
+        with open(os.path.join(grid_dir, 'meta.json')) as f:
+            meta = json.load(f)
+        arrays = {name: np.load(os.path.join(grid_dir, f"{name}.npy"), mmap_mode=mmap_mode)
+                  for name in ARRAYS}
+        return cls(arrays, meta['boroughs'])
+
+    def __len__(self):
+        return int(self.rows_per_ts.sum())
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in ARRAYS)
+
+    # ------------------------------------------------------------------
+    # long-format view
+    # ------------------------------------------------------------------
+    def cells(self):
+        """(timestamp index, borough index) of every present cell, in file order."""
+        return np.nonzero(self.present)
+
+    def frame(self, columns=COLUMNS):
+        """The long-format DataFrame (one row per present cell), built on demand."""
+        t_idx, b_idx = self.cells()
+        data = {
+            'pickup_dt': self.timestamps[t_idx],
+            'borough': pd.Categorical.from_codes(b_idx, categories=self.boroughs),
+            'pickups': self.pickups[t_idx, b_idx],
+            'hday': pd.Categorical(np.where(self.holiday[t_idx], 'Y', 'N')),
+        }
+        weather = self.weather[t_idx]
+        for i, col in enumerate(WEATHER_COLUMNS):
+            data[col] = weather[:, i]
+        return pd.DataFrame({col: data[col] for col in columns})
+
+    # ------------------------------------------------------------------
+    # reductions
+    # ------------------------------------------------------------------
+    def by_time(self, codes, size, mask=None):
+        """Sum/count of pickups per value of a per-timestamp code (e.g. hour)."""
+        weights = self.pickups_per_ts if mask is None else self.pickups_per_ts[mask]
+        counts = self.rows_per_ts if mask is None else self.rows_per_ts[mask]
+        codes = codes if mask is None else codes[mask]
+        sums = np.bincount(codes, weights=weights, minlength=size)
+        counts = np.bincount(codes, weights=counts, minlength=size)
+        return sums.astype(np.int64), counts.astype(np.int64)
+
+    def by_time_and_borough(self, codes, size):
+        """[code x borough] sums and counts of pickups."""
+        n_boroughs = len(self.boroughs)
+        cells = (np.asarray(codes, dtype=np.int64)[:, None] * n_boroughs + np.arange(n_boroughs)).ravel()
+        sums = np.bincount(cells, weights=self.pickups.ravel(), minlength=size * n_boroughs)
+        counts = np.bincount(cells, weights=self.present.ravel(), minlength=size * n_boroughs)
+        return (sums.reshape(size, n_boroughs).astype(np.int64),
+                counts.reshape(size, n_boroughs).astype(np.int64))
+
+    def _table(self, codes, size, index, mask=None):
+        sums, counts = self.by_time(codes, size, mask)
+        observed = counts > 0
+        table = pd.DataFrame({'sum': sums[observed], 'count': counts[observed]},
+                             index=index[observed])
+        table.insert(0, 'mean', table['sum'] / table['count'])
+        return table
+
+    def _pickups_describe(self):
+        values = np.asarray(self.pickups)[np.asarray(self.present)].astype(np.float64)
+        q25, q50, q75 = np.quantile(values, [0.25, 0.5, 0.75])
+        return pd.Series(
+            [len(values), values.mean(), values.std(ddof=1), values.min(), q25, q50, q75, values.max()],
+            index=['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max'],
+            name='pickups', dtype='float64'
+        )
+
+    def results(self, binner=None):
+        """Text report aggregates, in the same shape as the in-memory path."""
+        n = len(self)
+        hour = self.calendar['hour'].astype(np.int64)
+        dow = self.calendar['day_of_week'].astype(np.int64)
+        month = self.calendar['month'].astype(np.int64)
+        rows = self.rows_per_ts
+
+        # Weather statistics over rows = per-timestamp values weighted by row counts
+        weather = np.asarray(self.weather, dtype=np.float64)
+        has_rows = rows > 0
+        weather_summary = pd.DataFrame({
+            'mean': (weather * rows[:, None]).sum(axis=0) / n,
+            'min': weather[has_rows].min(axis=0),
+            'max': weather[has_rows].max(axis=0),
+            'non_zero': ((weather > 0) * rows[:, None]).sum(axis=0),
+        }, index=WEATHER_COLUMNS)
+
+        borough_sums = self.pickups.sum(axis=0, dtype=np.int64)
+        borough_counts_arr = self.present.sum(axis=0)
+        borough_table = pd.DataFrame({'sum': borough_sums, 'mean': borough_sums / borough_counts_arr,
+                                      'count': borough_counts_arr}, index=self.boroughs)
+        borough_counts = borough_table['count'].sort_values(ascending=False, kind='stable')
+        borough_stats = borough_table.sort_values('sum', ascending=False)
+
+        holiday = np.asarray(self.holiday).astype(np.int64)
+        bool_index = pd.Index([False, True])
+        holiday_stats = self._table(holiday, 2, bool_index.rename('is_holiday'))
+        holiday_counts = holiday_stats['count'].sort_values(ascending=False, kind='stable')
+
+        hours = pd.Index(np.arange(24), name='hour')
+        hourly = self._table(hour, 24, hours)[['mean', 'sum', 'count']]
+        daily = with_day_labels(self._table(dow, 7, pd.Index(np.arange(7)))[['mean', 'sum']])
+        monthly = with_month_labels(self._table(month, 13, pd.Index(np.arange(13)))[['mean', 'sum']])
+        weekend = self._table((dow >= 5).astype(np.int64), 2, bool_index.rename('is_weekend'))[['mean', 'sum']]
+
+        # Borough x hour means for the top boroughs, one strided reduction
+        sums, counts = self.by_time_and_borough(hour, 24)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            borough_hour = pd.DataFrame(sums / counts, index=hours, columns=self.boroughs)
+        top_borough_hourly = {b: borough_hour[b].dropna() for b in borough_stats.head(3).index}
+
+        holiday_hourly = {}
+        for flag in (True, False):
+            table = self._table(hour, 24, hours, mask=np.asarray(self.holiday) == flag)
+            holiday_hourly[flag] = table['mean']
+
+        # Fixed-edge weather bins of each timestamp, weighted by its rows
+        binner = binner or Binner()
+        temp_codes = binner.codes('temp', weather[:, WEATHER_COLUMNS.index('temp')])
+        pcp01_codes = binner.codes('pcp01', weather[:, WEATHER_COLUMNS.index('pcp01')])
+        temp_impact = binner.aggregate_codes(['temp'], [temp_codes], self.pickups_per_ts, rows)[['mean', 'count']]
+        temp_precip = binner.aggregate_codes(['temp', 'pcp01'], [temp_codes, pcp01_codes],
+                                             self.pickups_per_ts, rows)
+
+        rain = (weather[:, WEATHER_COLUMNS.index('pcp01')] > 0).astype(np.int64)
+        snow = (weather[:, WEATHER_COLUMNS.index('sd')] > 0).astype(np.int64)
+        precip_impact = self._table(rain, 2, bool_index.rename('pcp01'))[['mean', 'count']]
+        snow_impact = self._table(snow, 2, bool_index.rename('sd'))[['mean', 'count']]
+
+        # Row-level moments for the correlations; rows are gathered per cell
+        t_idx, b_idx = self.cells()
+        values = np.column_stack([np.asarray(self.pickups)[t_idx, b_idx], weather[t_idx]])
+        moments = GroupedCovariance(NUMERIC_COLUMNS, ['borough', 'hour'])
+        moments.update(values, [np.asarray(self.boroughs)[b_idx], hour[t_idx]])
+        total = moments.total()
+
+        return {
+            'shape': (n, len(COLUMNS)),
+            'date_min': pd.Timestamp(self.timestamps[has_rows][0]),
+            'date_max': pd.Timestamp(self.timestamps[has_rows][-1]),
+            'pickups_describe': self._pickups_describe(),
+            'weather_summary': weather_summary,
+            'borough_counts': borough_counts,
+            'holiday_counts': holiday_counts,
+            'hourly': hourly,
+            'daily': daily,
+            'monthly': monthly,
+            'weekend': weekend,
+            'borough_stats': borough_stats,
+            'top_borough_hourly': top_borough_hourly,
+            'corr_matrix': total.corr(),
+            'borough_corr': moments.corr_with('borough'),
+            'hour_corr': moments.corr_with('hour'),
+            'borough_quantiles': exact_quantile_table(values[:, 0], np.asarray(self.boroughs)[b_idx], 'borough'),
+            'hour_quantiles': exact_quantile_table(values[:, 0], hour[t_idx], 'hour'),
+            'quantile_method': 'exact',
+            'temp_impact': temp_impact,
+            'temp_precip': temp_precip,
+            'precip_impact': precip_impact,
+            'snow_impact': snow_impact,
+            'holiday_stats': holiday_stats,
+            'holiday_hourly': holiday_hourly[True],
+            'nonholiday_hourly': holiday_hourly[False],
+        }
+
+
+def save_grid(arrays, boroughs, grid_dir, source):
+    os.makedirs(grid_dir, exist_ok=True)
+    for name, array in arrays.items():
+        np.save(os.path.join(grid_dir, f"{name}.npy"), array)
+    with open(os.path.join(grid_dir, 'meta.json'), 'w') as f:
+        json.dump({'source': source, 'boroughs': boroughs}, f, indent=2)
+
+
+def load_grid_store(path=DATA_FILE, grid_dir=GRID_DIR, verbose=True):
+    """Open the memory-mapped grid store of `path`, (re)building it when the source changed."""
+    source = file_fingerprint(path)
+    source.update(version=GRID_VERSION, path=os.path.abspath(path))
+    try:
+        with open(os.path.join(grid_dir, 'meta.json')) as f:
+            fresh = json.load(f).get('source') == source
+    except (OSError, ValueError):
+        fresh = False
+
+    start = time.perf_counter()
+    if not fresh:
+        df = read_uber_csv(path)
+        arrays, boroughs = build_grid(df)
+        save_grid(arrays, boroughs, grid_dir, source)
+        if verbose:
+            long_mb = df.memory_usage(deep=True).sum() / 1024 ** 2
+            grid_mb = sum(a.nbytes for a in arrays.values()) / 1024 ** 2
+            print(f"Built grid store in {grid_dir}: {arrays['pickups'].shape[0]:,} timestamps x "
+                  f"{len(boroughs)} boroughs, {grid_mb:.2f} MB vs {long_mb:.2f} MB long format")
+    store = GridStore.open(grid_dir)
+    if verbose:
+        print(f"Opened grid store of {len(store):,} rows in {time.perf_counter() - start:.3f}s "
+              f"({store.nbytes / 1024 ** 2:.2f} MB memory-mapped)")
+    return store
@@ -0,0 +1,156 @@
+"""
+Uber Data Analysis - Single-Pass Group-By Engine
+Factorizes every key column once and builds the sum/count cube of all key
+combinations in one vectorized pass; every grouping is then a rollup of the
+cube's cells instead of a fresh scan and hash of the full frame. Keys that are
+never grouped together belong in separate cubes (CubeFamilies): a cube of all
+of them has about as many cells as the frame has rows and saves nothing
+"""
+
+import numpy as np
+import pandas as pd
+
+
+class GroupByEngine:
+    """Sum, count and mean of one measure for any combination of the keys."""
+
+    def __init__(self, values, keys):
+        """
+        values: Series with the measure to aggregate (e.g. df['pickups'])
+        keys:   dict mapping a key name to a Series/array aligned with values
+        """
+        self.name = values.name
+        self.keys = list(keys)
+        self.levels = {}
+        self._cache = {}
+
+        # Factorize each key once; sorted uniques give groupby's ordering
+        codes = []
+        valid = np.ones(len(values), dtype=bool)
+        for name, key in keys.items():
+            key_codes, uniques = pd.factorize(key, sort=True)
+            self.levels[name] = pd.Index(uniques, name=name)
+            codes.append(key_codes)
+            valid &= key_codes >= 0  # groupby drops missing keys
+        self.sizes = [len(self.levels[name]) for name in self.keys]
+
+        # Mixed-radix code of every key combination, then one bincount per statistic
+        combined = np.zeros(len(values), dtype=np.int64)
+        for key_codes, size in zip(codes, self.sizes):
+            combined = combined * size + key_codes
+        combined = combined[valid]
+        cell_codes, cells = pd.factorize(combined)
+        weights = np.asarray(values, dtype=np.float64)[valid]
+        self.cell_sum = np.bincount(cell_codes, weights=weights, minlength=len(cells))
+        self.cell_count = np.bincount(cell_codes, minlength=len(cells))
+        self.integer_values = np.asarray(values).dtype.kind in 'iub'
+
+        # Decode each observed cell back to its per-key codes
+        self.cell_keys = {}
+        remainder = cells
+        for name, size in reversed(list(zip(self.keys, self.sizes))):
+            self.cell_keys[name] = remainder % size
+            remainder = remainder // size
+
+    @property
+    def n_cells(self):
+        return len(self.cell_count)
+
+    def cell_mask(self, where):
+        """Boolean mask of the cells matching `where` (key name -> value or list of values)."""
+        mask = np.ones(self.n_cells, dtype=bool)
+        for name, values in where.items():
+            if not isinstance(values, (list, tuple, set)):
+                values = [values]
+            codes = self.levels[name].get_indexer(list(values))
+            mask &= np.isin(self.cell_keys[name], codes[codes >= 0])
+        return mask
+
+    def aggregate(self, by, where=None):
+        """
+        DataFrame with mean, sum and count per observed group of `by`, over the
+        cells matching `where` (a slice of the cube). An empty `by` gives the
+        grand total. Unfiltered rollups are cached.
+        """
+        by = (by,) if isinstance(by, str) else tuple(by)
+        if not where and by in self._cache:
+            return self._cache[by]
+
+        cell_sum, cell_count, cell_keys = self.cell_sum, self.cell_count, self.cell_keys
+        if where:
+            mask = self.cell_mask(where)
+            cell_sum, cell_count = cell_sum[mask], cell_count[mask]
+            cell_keys = {name: self.cell_keys[name][mask] for name in by}
+
+        sizes = [len(self.levels[name]) for name in by]
+        group = np.zeros(len(cell_count), dtype=np.int64)
+        for name, size in zip(by, sizes):
+            group = group * size + cell_keys[name]
+        total = int(np.prod(sizes))
+        sums = np.bincount(group, weights=cell_sum, minlength=total)
+        counts = np.bincount(group, weights=cell_count, minlength=total).astype(np.int64)
+        if self.integer_values:
+            sums = np.rint(sums).astype(np.int64)
+
+        if len(by) == 0:
+            index = pd.Index(['all'])
+        elif len(by) == 1:
+            index = self.levels[by[0]]
+        else:
+            index = pd.MultiIndex.from_product([self.levels[name] for name in by], names=list(by))
+        frame = pd.DataFrame({'sum': sums, 'count': counts}, index=index)
+        frame = frame[frame['count'] > 0]
+        frame.insert(0, 'mean', frame['sum'] / frame['count'])
+        if not where:
+            self._cache[by] = frame
+        return frame
+
+    def sum(self, by):
+        return self.aggregate(by)['sum'].rename(self.name)
+
+    def count(self, by):
+        return self.aggregate(by)['count'].rename(self.name)
+
+    def mean(self, by):
+        return self.aggregate(by)['mean'].rename(self.name)
+
+
+class CubeFamilies:
+    """
+    Several small cubes, one per family of keys grouped together; each
+    grouping is answered by the smallest cube holding all its keys.
+    """
+
+    def __init__(self, engines):
+        """engines: dict mapping a family name to a GroupByEngine (or anything with its interface)"""
+        self.engines = dict(engines)
+        self.name = next(iter(self.engines.values())).name
+        self.levels = {}
+        for engine in self.engines.values():
+            self.levels.update(engine.levels)
+
+    @property
+    def n_cells(self):
+        return sum(engine.n_cells for engine in self.engines.values())
+
+    def engine_for(self, keys):
+        """Smallest cube with every key of `keys`."""
+        keys = set(keys)
+        fits = [engine for engine in self.engines.values() if keys <= set(engine.keys)]
+        if not fits:
+            raise KeyError(f"No cube holds all of {sorted(keys)}; families: "
+                           f"{ {family: engine.keys for family, engine in self.engines.items()} }")
+        return min(fits, key=lambda engine: engine.n_cells)
+
+    def aggregate(self, by, where=None):
+        by = (by,) if isinstance(by, str) else tuple(by)
+        return self.engine_for(set(by) | set(where or ())).aggregate(by, where)
+
+    def sum(self, by):
+        return self.aggregate(by)['sum'].rename(self.name)
+
+    def count(self, by):
+        return self.aggregate(by)['count'].rename(self.name)
+
+    def mean(self, by):
+        return self.aggregate(by)['mean'].rename(self.name)
@@ -0,0 +1,162 @@
+"""
+Uber Data Analysis - Histogram Accumulators
+Fixed-edge histograms of the univariate columns: the edges are set up front
+(HISTOGRAM_RANGES), not from the data, so counts come from one
+searchsorted/bincount pass per chunk, chunks and workers merge exactly, and
+values outside the edges go to underflow/overflow counts. They are cached next
+to the data cache so the univariate figure is drawn from bin counts instead of
+the raw rows
+"""
+
+import json
+import os
+
+import numpy as np
+
+from data_loader import DATA_FILE
+from data_cache import CACHE_DIR, cache_paths
+
+# (first edge, last edge, bins) per plotted column, wide enough for hourly
+# borough pickups and New York weather; pcp01 and sd are histogrammed over
+# their non-zero values
+HISTOGRAM_RANGES = {
+    'pickups': (0, 8000, 50),
+    'spd': (0, 30, 30),
+    'vsb': (0, 10, 20),
+    'temp': (-20, 100, 30),
+    'dewp': (-30, 90, 30),
+    'slp': (970, 1060, 30),
+    'pcp01': (0, 0.5, 25),
+    'sd': (0, 30, 30),
+}
+NONZERO_COLUMNS = ['pcp01', 'sd']
+
+# Bump when the binning changes so cached histograms are rebuilt
+HISTOGRAM_VERSION = 3
+
+
+class Histogram:
+    """
+    Counts of values per bin for fixed bin edges (last bin closed, like
+    np.histogram), plus underflow and overflow counts of the values below the
+    first and above the last edge.
+    """
+
+    def __init__(self, edges, nonzero=False, counts=None, underflow=0, overflow=0):
+        self.edges = np.asarray(edges, dtype=np.float64)
+        self.nonzero = nonzero
+        self.counts = np.zeros(len(self.edges) - 1, dtype=np.int64) if counts is None else counts
+        self.underflow = int(underflow)
+        self.overflow = int(overflow)
+
+    @classmethod
+    def uniform(cls, lo, hi, bins, nonzero=False):
+        """Equal-width bins from lo to hi."""
+        if lo == hi:
+            lo, hi = lo - 0.5, hi + 0.5
+        return cls(np.linspace(lo, hi, bins + 1), nonzero)
+
+    def update(self, values):
+        """Add a block of values; NaNs (and non-positive values of a nonzero histogram) are skipped."""
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if self.nonzero:
+            values = values[values > 0]
+        codes = np.searchsorted(self.edges, values, side='right') - 1
+        # The last edge belongs to the last bin
+        codes[values == self.edges[-1]] = len(self.counts) - 1
+        below, above = codes < 0, codes >= len(self.counts)
+        self.underflow += int(below.sum())
+        self.overflow += int(above.sum())
+        self.counts += np.bincount(codes[~(below | above)], minlength=len(self.counts))
+        return self
+
+    def merge(self, other):
+        if not np.array_equal(self.edges, other.edges):
+            raise ValueError("Cannot merge histograms with different bin edges")
+        self.counts += other.counts
+        self.underflow += other.underflow
+        self.overflow += other.overflow
+        return self
+
+    @property
+    def total(self):
+        """Values added, including those outside the edges."""
+        return int(self.counts.sum()) + self.underflow + self.overflow
+
+
+def empty_histograms(ranges=HISTOGRAM_RANGES):
+    """Empty histograms of the univariate columns over their fixed edges."""
+    return {col: Histogram.uniform(lo, hi, bins, col in NONZERO_COLUMNS) for col, (lo, hi, bins) in ranges.items()}
+
+
+def update_histograms(histograms, df):
+    """Add the rows of `df` (one chunk or the whole frame) to each column's histogram."""
+    for col, histogram in histograms.items():
+        histogram.update(df[col].to_numpy())
+    return histograms
+
+
+def merge_histograms(histograms, other):
+    for col, histogram in histograms.items():
+        histogram.merge(other[col])
+    return histograms
+
+
+def univariate_histograms(df, ranges=HISTOGRAM_RANGES):
+    """Histograms of the univariate columns of a whole frame."""
+    return update_histograms(empty_histograms(ranges), df)
+
+
+def print_outside(histograms):
+    """Note the columns with values outside their histogram's edges."""
+    for col, histogram in histograms.items():
+        if histogram.underflow or histogram.overflow:
+            print(f"Note: {col} has {histogram.underflow:,} values below {histogram.edges[0]:g} and "
+                  f"{histogram.overflow:,} above {histogram.edges[-1]:g} (outside its histogram)")
+
+
+def _histogram_file(path, cache_dir):
+    data_file, meta_file = cache_paths(path, cache_dir)
+    return os.path.splitext(data_file)[0] + '.hist.npz', meta_file
+
+
+def load_histograms(df, path=DATA_FILE, cache_dir=CACHE_DIR, ranges=HISTOGRAM_RANGES):
+    """
+    Univariate histograms of `df` (loaded from `path`), reused from the cache
+    while the data cache's source fingerprint is unchanged.
+
+    Returns (histograms, cache_hit).
+    """
+    hist_file, meta_file = _histogram_file(path, cache_dir)
+    try:
+        with open(meta_file) as f:
+            source = json.load(f)['source']
+    except (OSError, ValueError, KeyError):
+        source = None
+    key = json.dumps({'source': source, 'ranges': ranges, 'version': HISTOGRAM_VERSION}, sort_keys=True)
+
+    if source is not None:
+        try:
+            with np.load(hist_file) as cached:
+                if str(cached['key']) == key:
+                    return {col: Histogram(cached[f"{col}_edges"], col in NONZERO_COLUMNS,
+                                           cached[f"{col}_counts"], *cached[f"{col}_outside"])
+                            for col in ranges}, True
+        except (OSError, KeyError, ValueError):
+            pass
+
+    histograms = univariate_histograms(df, ranges)
+    if source is not None:
+        arrays = {'key': np.array(key)}
+        for col, histogram in histograms.items():
+            arrays[f"{col}_edges"] = histogram.edges
+            arrays[f"{col}_counts"] = histogram.counts
+            arrays[f"{col}_outside"] = np.array([histogram.underflow, histogram.overflow])
+        try:
+            tmp_file = hist_file + '.tmp.npz'
+            np.savez(tmp_file, **arrays)
+            os.replace(tmp_file, hist_file)
+        except OSError as e:
+            print(f"Warning: could not write histogram cache ({e})")
+    return histograms, False
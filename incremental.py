@@ -0,0 +1,208 @@
+"""
+Uber Data Analysis - Incremental Append Mode
+Persists the report's aggregate state (hourly, daily, monthly, borough,
+holiday, weather-bin partials and correlation moments), the rolling-window
+state and the hour/day/week/month rollups, and folds in only the rows newer
+than the last-seen pickup_dt instead of recomputing the history. Only
+complete (newline-terminated) rows are read; a partial last row is picked up
+by the next append once it is complete
+
+Usage:
+    python incremental.py build                      # full build from Uber.csv
+    python incremental.py append                     # fold in rows appended to Uber.csv
+    python incremental.py append --data new.csv      # fold in a separate drop of new rows
+    python incremental.py summary                    # print the report from the saved state
+"""
+
+import argparse
+import hashlib
+import os
+import pickle
+import time
+
+from data_cache import CACHE_DIR
+from data_loader import DATA_FILE, COLUMNS, read_uber_csv
+from streaming_analysis import DEFAULT_CHUNKSIZE, StreamingAggregator
+from analysis_text_only import print_report
+from rolling_windows import RollingState, print_rolling
+from rollups import RollupHierarchy, print_level_sizes
+
+STATE_FILE = os.path.join(CACHE_DIR, 'aggregate_state.pkl')
+
+# Bytes hashed at the start and at the end of the consumed prefix of a source,
+# so a rewritten file is detected even when it did not shrink
+FINGERPRINT_BYTES = 1 << 16
+
+
+def complete_rows_offset(path, block_size=1 << 16):
+    """Byte offset just past the last newline, i.e. the end of the last complete row."""
+    with open(path, 'rb') as f:
+        pos = f.seek(0, os.SEEK_END)
+        while pos > 0:
+            step = min(block_size, pos)
+            pos -= step
+            f.seek(pos)
+            idx = f.read(step).rfind(b'\n')
+            if idx >= 0:
+                return pos + idx + 1
+    return 0
+
+
+class _BoundedReader:
+    """Binary file view that ends at byte `end`, so a partial last row is never parsed."""
+
+    def __init__(self, f, end):
+        self.f = f
+        self.end = end
+
+    def read(self, size=-1):
+        remaining = self.end - self.f.tell()
+        if remaining <= 0:
+            return b''
+        if size is None or size < 0 or size > remaining:
+            size = remaining
+        return self.f.read(size)
+
+    def __iter__(self):
+        return iter(self.read().splitlines(keepends=True))
+
+
+def prefix_fingerprint(path, end, nbytes=FINGERPRINT_BYTES):
+    """Offset and hashes of the head and tail of the first `end` bytes of `path`."""
+    with open(path, 'rb') as f:
+        head = f.read(min(end, nbytes))
+        f.seek(max(end - nbytes, 0))
+        tail = f.read(min(end, nbytes))
+    return {'offset': end, 'head': hashlib.sha256(head).hexdigest(),
+            'tail': hashlib.sha256(tail).hexdigest()}
+
+
+def resume_offset(seen, path):
+    """Offset to continue `path` from, or 0 when it is unknown or the consumed prefix changed."""
+    if not isinstance(seen, dict) or seen['offset'] > os.path.getsize(path):
+        return 0
+    return seen['offset'] if prefix_fingerprint(path, seen['offset']) == seen else 0
+
+
+def read_rows(path, offset=0, end=None, chunksize=DEFAULT_CHUNKSIZE):
+    """Chunks of the complete rows of `path` in bytes [offset, end); offset 0 includes the header."""
+    end = complete_rows_offset(path) if end is None else end
+    if offset >= end:
+        return
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        reader = _BoundedReader(f, end)
+        if offset == 0:
+            yield from read_uber_csv(reader, chunksize=chunksize)
+        else:
+            yield from read_uber_csv(reader, chunksize=chunksize, header=None, names=COLUMNS)
+
+
+def _report_partial_row(path, end):
+    if end < os.path.getsize(path):
+        print(f"Left a partial last row of {path} ({os.path.getsize(path) - end} bytes, no newline yet) "
+              f"for the next append")
+
+
+def load_state(state_file=STATE_FILE):
+    with open(state_file, 'rb') as f:
+        return pickle.load(f)
+
+
+def save_state(state, state_file=STATE_FILE):
+    os.makedirs(os.path.dirname(state_file) or '.', exist_ok=True)
+    tmp_file = state_file + '.tmp'
+    with open(tmp_file, 'wb') as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_file, state_file)
+
+
+def build_state(path=DATA_FILE, chunksize=DEFAULT_CHUNKSIZE, state_file=STATE_FILE):
+    """Aggregate the full history of `path` and persist the state."""
+    start = time.perf_counter()
+    aggregator = StreamingAggregator()
+    rolling = RollingState()
+    rollups = RollupHierarchy()
+    end = complete_rows_offset(path)
+    for chunk in read_rows(path, 0, end, chunksize):
+        aggregator.update(chunk)
+        rolling.update(chunk)
+        rollups.update(chunk)
+    state = {
+        'aggregator': aggregator,
+        'rolling': rolling,
+        'rollups': rollups,
+        'last_seen': aggregator.date_max,
+        # Byte offset up to which each source file has been folded in, with
+        # hashes of that prefix to detect rewrites
+        'offsets': {os.path.abspath(path): prefix_fingerprint(path, end)},
+    }
+    save_state(state, state_file)
+    _report_partial_row(path, end)
+    print(f"Built aggregate state from {aggregator.rows:,} rows in {time.perf_counter() - start:.3f}s "
+          f"(last pickup_dt: {aggregator.date_max})")
+    return state
+
+
+def append_rows(path=DATA_FILE, chunksize=DEFAULT_CHUNKSIZE, state_file=STATE_FILE):
+    """Fold rows of `path` newer than the state's last-seen pickup_dt into the state."""
+    start = time.perf_counter()
+    state = load_state(state_file)
+    aggregator = state['aggregator']
+    last_seen = state['last_seen']
+    source = os.path.abspath(path)
+
+    # Only read past the bytes already folded in, unless the file was rewritten.
+    # Rows past a known offset are new by construction (even when they share
+    # the last-seen hour); other sources are filtered on pickup_dt.
+    offset = resume_offset(state['offsets'].get(source), path)
+    end = complete_rows_offset(path)
+
+    new_rows = skipped = 0
+    for chunk in read_rows(path, offset, end, chunksize):
+        fresh = chunk if offset else chunk[chunk['pickup_dt'] > last_seen]
+        skipped += len(chunk) - len(fresh)
+        new_rows += len(fresh)
+        aggregator.update(fresh)
+        if 'rolling' in state:
+            state['rolling'].update(fresh)
+        if 'rollups' in state:
+            state['rollups'].update(fresh)
+
+    state['last_seen'] = aggregator.date_max
+    state['offsets'][source] = prefix_fingerprint(path, end)
+    save_state(state, state_file)
+    _report_partial_row(path, end)
+    print(f"Appended {new_rows:,} new rows ({skipped:,} already seen skipped) in "
+          f"{time.perf_counter() - start:.3f}s; state covers {aggregator.rows:,} rows "
+          f"up to {aggregator.date_max}")
+    return state
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Incremental Uber demand aggregates')
+    parser.add_argument('command', choices=['build', 'append', 'summary'])
+    parser.add_argument('--data', default=DATA_FILE, help='CSV file to build from or append')
+    parser.add_argument('--state', default=STATE_FILE, help='aggregate state file')
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE, help='rows per chunk')
+    args = parser.parse_args()
+
+    print("="*80)
+    print("UBER DATA ANALYSIS - COMPREHENSIVE INSIGHTS")
+    print("="*80)
+    print("\n1. LOADING DATA...")
+    if args.command == 'build':
+        state = build_state(args.data, args.chunksize, args.state)
+    elif args.command == 'append':
+        state = append_rows(args.data, args.chunksize, args.state)
+    else:
+        state = load_state(args.state)
+    if 'rolling' in state:
+        print_rolling(state['rolling'].current(), state['rolling'].last_hour)
+    if 'rollups' in state:
+        print_level_sizes(state['rollups'])
+    print_report(state['aggregator'].results())
+
+
+if __name__ == '__main__':
+    main()
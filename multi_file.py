@@ -0,0 +1,110 @@
+"""
+Uber Data Analysis - Multi-File Ingestion
+Reads a directory or glob of CSV drops with the Uber schema (e.g. monthly or
+per-borough extracts) in parallel. Headers are validated before any file is
+parsed. load_files() parses in a thread pool and concatenates once, with the
+categorical columns unified so they stay categorical; aggregate_files() feeds
+each file straight into the mergeable StreamingAggregator partials in a
+process pool, so the rows are never concatenated. Both report ingest
+throughput (MB/s and rows/s) per file and overall
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import reduce
+
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from data_loader import COLUMN_DTYPES, check_schema, memory_usage_mb, read_uber_csv
+
+MB = 1024 ** 2
+
+
+def _file_stats(path, rows, seconds):
+    return {'path': path, 'bytes': os.path.getsize(path), 'rows': rows, 'seconds': seconds}
+
+
+def _read_file(path):
+    start = time.perf_counter()
+    df = read_uber_csv(path)
+    return df, _file_stats(path, len(df), time.perf_counter() - start)
+
+
+def _aggregate_file(args):
+    from streaming_analysis import StreamingAggregator
+
+    path, chunksize = args
+    start = time.perf_counter()
+    aggregator = StreamingAggregator()
+    for chunk in read_uber_csv(path, chunksize=chunksize):
+        aggregator.update(chunk)
+    return aggregator, _file_stats(path, aggregator.rows, time.perf_counter() - start)
+
+
+def print_ingest_stats(stats, wall_seconds, workers):
+    """Per-file and overall ingest throughput."""
+    print(f"{'file':40s} {'MB':>8s} {'rows':>11s} {'seconds':>8s} {'MB/s':>8s} {'rows/s':>12s}")
+    for s in stats:
+        print(f"{os.path.basename(s['path'])[:40]:40s} {s['bytes'] / MB:8.2f} {s['rows']:11,d} "
+              f"{s['seconds']:8.3f} {s['bytes'] / MB / s['seconds']:8.1f} {s['rows'] / s['seconds']:12,.0f}")
+    total_bytes = sum(s['bytes'] for s in stats)
+    total_rows = sum(s['rows'] for s in stats)
+    print(f"{'TOTAL (' + str(len(stats)) + ' files, ' + str(workers) + ' worker(s), wall time)':40s} "
+          f"{total_bytes / MB:8.2f} {total_rows:11,d} {wall_seconds:8.3f} "
+          f"{total_bytes / MB / wall_seconds:8.1f} {total_rows / wall_seconds:12,.0f}")
+
+
+def _unify_categories(frames):
+    """Give every frame the same categories so concat keeps the categorical dtype."""
+    for col, dtype in COLUMN_DTYPES.items():
+        if dtype != 'category':
+            continue
+        categories = union_categoricals([df[col] for df in frames], sort_categories=True).categories
+        for df in frames:
+            df[col] = df[col].cat.set_categories(categories)
+    return frames
+
+
+def load_files(paths, workers=None, verbose=True):
+    """Parse several CSV files in a thread pool and concatenate them (in `paths` order)."""
+    for path in paths:
+        check_schema(path)
+    start = time.perf_counter()
+    workers = min(workers or os.cpu_count() or 1, len(paths))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(_read_file, paths))
+    frames = _unify_categories([df for df, _ in results])
+    df = pd.concat(frames, ignore_index=True)
+    elapsed = time.perf_counter() - start
+    if verbose:
+        print_ingest_stats([stats for _, stats in results], elapsed, workers)
+        print(f"Loaded {len(df):,} rows from {len(paths)} files in {elapsed:.3f}s "
+              f"({memory_usage_mb(df):.2f} MB in memory)")
+    return df
+
+
+def aggregate_files(paths, workers=None, chunksize=100_000, verbose=True):
+    """Report aggregates of several CSV files: one partial per file in a process pool, merged."""
+    from streaming_analysis import StreamingAggregator
+
+    for path in paths:
+        check_schema(path)
+    start = time.perf_counter()
+    workers = min(workers or os.cpu_count() or 1, len(paths))
+    tasks = [(path, chunksize) for path in paths]
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            partials = list(pool.map(_aggregate_file, tasks))
+    else:
+        partials = [_aggregate_file(task) for task in tasks]
+    aggregator = reduce(StreamingAggregator.merge, [partial for partial, _ in partials],
+                        StreamingAggregator())
+    results = aggregator.results()
+    elapsed = time.perf_counter() - start
+    if verbose:
+        print_ingest_stats([stats for _, stats in partials], elapsed, workers)
+        print(f"Aggregated {aggregator.rows:,} rows from {len(paths)} files "
+              f"across {workers} worker(s) ({elapsed:.3f}s)")
+    return results
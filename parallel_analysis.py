@@ -0,0 +1,91 @@
+"""
+Uber Data Analysis - Partition-Parallel Map/Reduce
+Splits the CSV into row-aligned byte ranges (time-range shards, since the file
+is ordered by pickup_dt), builds the mergeable StreamingAggregator partials of
+each shard in a process pool and merges them into the report aggregates
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import reduce
+
+from data_loader import DATA_FILE, COLUMNS, read_uber_csv
+from streaming_analysis import DEFAULT_CHUNKSIZE, StreamingAggregator
+
+
+class _RangeReader:
+    """Read-only file view limited to the bytes [start, end)."""
+
+    def __init__(self, f, start, end):
+        self.f = f
+        self.remaining = end - start
+        f.seek(start)
+
+    def read(self, size=-1):
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.f.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def __iter__(self):
+        return iter(self.read().splitlines(keepends=True))
+
+
+def shard_ranges(path, shards):
+    """Up to `shards` byte ranges covering the data rows, each ending on a row boundary."""
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        f.readline()  # header
+        start = f.tell()
+        ranges = []
+        for i in range(1, shards + 1):
+            if start >= size:
+                break
+            end = size
+            if i < shards:
+                f.seek(max(start, size * i // shards))
+                f.readline()  # move to the start of the next row
+                end = min(f.tell(), size)
+            if end > start:
+                ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def aggregate_range(path, start, end, chunksize=DEFAULT_CHUNKSIZE):
+    """Map step: the partial aggregates of the rows in one byte range."""
+    aggregator = StreamingAggregator()
+    with open(path, 'rb') as f:
+        reader = _RangeReader(f, start, end)
+        for chunk in read_uber_csv(reader, chunksize=chunksize, header=None, names=COLUMNS):
+            aggregator.update(chunk)
+    return aggregator
+
+
+def _aggregate_shard(args):
+    return aggregate_range(*args)
+
+
+def parallel_aggregates(path=DATA_FILE, workers=None, shards=None, chunksize=DEFAULT_CHUNKSIZE,
+                        verbose=True):
+    """Aggregate the CSV shard by shard in a process pool and merge the partials."""
+    start = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    ranges = shard_ranges(path, shards or workers)
+    tasks = [(path, lo, hi, chunksize) for lo, hi in ranges]
+
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            partials = list(pool.map(_aggregate_shard, tasks))
+    else:
+        partials = [_aggregate_shard(task) for task in tasks]
+
+    # Reduce step: shards are merged in file order
+    aggregator = reduce(StreamingAggregator.merge, partials, StreamingAggregator())
+    results = aggregator.results()
+    if verbose:
+        print(f"Aggregated {aggregator.rows:,} rows from {path} in {len(tasks)} shards "
+              f"across {min(workers, max(len(tasks), 1))} worker(s) ({time.perf_counter() - start:.3f}s)")
+    return results
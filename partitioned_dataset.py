@@ -0,0 +1,178 @@
+"""
+Uber Data Analysis - Hive-Partitioned Dataset
+Writes the data as Parquet files partitioned year=/month=/borough= (rows
+without a borough go to borough=Unknown), each sorted by pickup_dt and split
+into row groups of ROW_GROUP_ROWS rows. The loader turns --start/--end/
+--borough into a filter that prunes partitions by directory name and row
+groups by their pickup_dt statistics, so a borough-month is read without
+touching the rest of the data. Needs pyarrow
+
+Usage:
+    python partitioned_dataset.py convert                        # Uber.csv -> .uber_cache/dataset/
+    python partitioned_dataset.py query --borough Manhattan --start 2015-03-01 --end 2015-04-01
+    python partitioned_dataset.py benchmark --borough Bronx --start 2015-06-01 --end 2015-07-01
+"""
+
+import argparse
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+from data_loader import DATA_FILE, COLUMNS, COLUMN_DTYPES, read_uber_csv, fill_missing_borough
+from data_cache import CACHE_DIR
+
+DATASET_DIR = os.path.join(CACHE_DIR, 'dataset')
+
+PARTITION_KEYS = ['year', 'month', 'borough']
+
+# Rows per Parquet row group; one week of hourly rows of one borough
+ROW_GROUP_ROWS = 24 * 7
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow.dataset as ds
+    except ImportError:
+        raise ImportError("The partitioned dataset needs pyarrow (pip install pyarrow)") from None
+    return ds
+
+
+def convert(path=DATA_FILE, dataset_dir=DATASET_DIR, row_group_rows=ROW_GROUP_ROWS, verbose=True):
+    """Write `path` (file, directory or glob of CSVs) as a hive-partitioned Parquet dataset."""
+    import pyarrow as pa
+    from data_loader import load_uber_data
+
+    ds = _require_pyarrow()
+    start = time.perf_counter()
+    df = fill_missing_borough(load_uber_data(path, verbose=False))
+    df['borough'] = df['borough'].astype(str)
+    df['year'] = df['pickup_dt'].dt.year.astype(np.int16)
+    df['month'] = df['pickup_dt'].dt.month.astype(np.int8)
+    # Time-ordered within each partition so row groups cover contiguous ranges
+    df = df.sort_values(['borough', 'pickup_dt'], kind='stable')
+    table = pa.Table.from_pandas(df[COLUMNS + ['year', 'month']], preserve_index=False)
+
+    if os.path.exists(dataset_dir):
+        shutil.rmtree(dataset_dir)
+    ds.write_dataset(table, dataset_dir, format='parquet', partitioning=PARTITION_KEYS,
+                     partitioning_flavor='hive', max_rows_per_group=row_group_rows,
+                     min_rows_per_group=row_group_rows, basename_template='part-{i}.parquet')
+    if verbose:
+        files = sum(len(names) for _, _, names in os.walk(dataset_dir))
+        size = sum(os.path.getsize(os.path.join(root, name))
+                   for root, _, names in os.walk(dataset_dir) for name in names)
+        print(f"Wrote {len(df):,} rows to {dataset_dir} as {files} partition files "
+              f"({size / 1024 ** 2:.2f} MB) in {time.perf_counter() - start:.3f}s")
+
+
+def _and(a, b):
+    return b if a is None else a & b
+
+
+def partition_filter(start=None, end=None, boroughs=None, keys_only=False):
+    """
+    pyarrow filter for [start, end) and the boroughs. The year/month/borough
+    terms prune whole partitions by directory name and the pickup_dt terms
+    prune row groups by their statistics; `keys_only` drops the partition terms.
+    """
+    ds = _require_pyarrow()
+    expr = None
+    if start is not None:
+        start = pd.Timestamp(start)
+        if not keys_only:
+            expr = _and(expr, (ds.field('year') > start.year)
+                        | ((ds.field('year') == start.year) & (ds.field('month') >= start.month)))
+        expr = _and(expr, ds.field('pickup_dt') >= start.to_datetime64())
+    if end is not None:
+        end = pd.Timestamp(end)
+        last = end - pd.Timedelta(microseconds=1)
+        if not keys_only:
+            expr = _and(expr, (ds.field('year') < last.year)
+                        | ((ds.field('year') == last.year) & (ds.field('month') <= last.month)))
+        expr = _and(expr, ds.field('pickup_dt') < end.to_datetime64())
+    if boroughs and not keys_only:
+        expr = _and(expr, ds.field('borough').isin(list(boroughs)))
+    return expr
+
+
+def open_dataset(dataset_dir=DATASET_DIR):
+    ds = _require_pyarrow()
+    if not os.path.isdir(dataset_dir):
+        raise FileNotFoundError(f"No dataset in {dataset_dir}; run 'python partitioned_dataset.py convert'")
+    return ds.dataset(dataset_dir, format='parquet', partitioning='hive')
+
+
+def scan_plan(dataset, start=None, end=None, boroughs=None):
+    """Partition files and row groups a query leaves to read, out of the totals."""
+    fragments = list(dataset.get_fragments())
+    kept = list(dataset.get_fragments(filter=partition_filter(start, end, boroughs)))
+    # Row-group statistics only know the file's columns, not the partition keys
+    row_expr = partition_filter(start, end, keys_only=True)
+    groups = sum(f.num_row_groups if row_expr is None else len(f.split_by_row_group(row_expr))
+                 for f in kept)
+    return {'files': len(kept), 'total_files': len(fragments),
+            'row_groups': groups, 'total_row_groups': sum(f.num_row_groups for f in fragments)}
+
+
+def load_partitioned(start=None, end=None, boroughs=None, dataset_dir=DATASET_DIR):
+    """Rows in [start, end) of the boroughs, reading only the matching partitions and row groups."""
+    dataset = open_dataset(dataset_dir)
+    table = dataset.to_table(columns=COLUMNS, filter=partition_filter(start, end, boroughs))
+    df = table.to_pandas()
+    for col, dtype in COLUMN_DTYPES.items():
+        df[col] = df[col].astype(dtype)
+    return df.sort_values(['pickup_dt', 'borough'], kind='stable', ignore_index=True)
+
+
+def _timed(func, repeat=3):
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Hive-partitioned Parquet dataset with partition pruning')
+    parser.add_argument('command', choices=['convert', 'query', 'benchmark'])
+    parser.add_argument('--data', default=DATA_FILE, help='CSV file, directory or glob to convert')
+    parser.add_argument('--dataset', default=DATASET_DIR, help='dataset directory')
+    parser.add_argument('--start', default=None, help='first pickup_dt to include (e.g. 2015-03-01)')
+    parser.add_argument('--end', default=None, help='pickup_dt to stop before (exclusive)')
+    parser.add_argument('--borough', action='append', default=None,
+                        help='borough to include (repeat for several)')
+    args = parser.parse_args()
+
+    if args.command == 'convert':
+        convert(args.data, args.dataset)
+        return
+    if not os.path.isdir(args.dataset):
+        convert(args.data, args.dataset)
+
+    plan = scan_plan(open_dataset(args.dataset), args.start, args.end, args.borough)
+    df, seconds = _timed(lambda: load_partitioned(args.start, args.end, args.borough, args.dataset))
+    print(f"Read {len(df):,} rows in {seconds:.4f}s from {plan['files']} of {plan['total_files']} "
+          f"partition files, {plan['row_groups']} of {plan['total_row_groups']} row groups")
+
+    if args.command == 'query':
+        if len(df):
+            print(f"Date range: {df['pickup_dt'].min()} to {df['pickup_dt'].max()}")
+            summary = df.groupby('borough', observed=True)['pickups'].agg(['sum', 'mean', 'count'])
+            print(summary.sort_values('sum', ascending=False))
+        return
+
+    full, full_seconds = _timed(lambda: load_partitioned(dataset_dir=args.dataset))
+    csv, csv_seconds = _timed(lambda: read_uber_csv(args.data))
+    print(f"Full dataset scan: {len(full):,} rows in {full_seconds:.4f}s; "
+          f"full CSV read: {len(csv):,} rows in {csv_seconds:.4f}s")
+    print(f"Pruned read costs {100 * seconds / full_seconds:.1f}% of the full dataset scan "
+          f"and {100 * seconds / csv_seconds:.1f}% of the CSV read")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,307 @@
+"""
+Uber Data Analysis - Profiling and Instrumentation
+Opt-in (--profile) timing of each report section and of its sub-steps: every
+groupby aggregation, cube rollup and savefig is recorded automatically while
+profiling is on. Peak memory comes from tracemalloc (and the process's
+max RSS), cProfile can be run per section, and the results are written as a
+JSON trace plus a table printed at the end of the run
+"""
+
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+MB = 1024 ** 2
+
+GROUPBY_METHODS = ['agg', 'aggregate', 'mean', 'sum', 'count', 'size', 'median', 'std',
+                   'min', 'max', 'describe']
+
+
+def add_profile_arguments(parser):
+    """Add the --profile options to a script's argument parser."""
+    parser.add_argument('--profile', action='store_true',
+                        help='time each section and sub-step and report peak memory')
+    parser.add_argument('--profile-cprofile', action='store_true',
+                        help='also run cProfile per section (implies --profile)')
+    parser.add_argument('--profile-output', default=None,
+                        help='JSON trace file (default: profile_<script>.json)')
+    return parser
+
+
+def _max_rss_mb():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return rss / MB if sys.platform == 'darwin' else rss / 1024
+
+
+def _describe(obj):
+    """Short label for a groupby key or an aggregation's input."""
+    if isinstance(obj, (list, tuple)):
+        return ', '.join(_describe(o) for o in obj)
+    name = getattr(obj, 'name', None)
+    if name is not None:
+        return str(name)
+    if isinstance(obj, str):
+        return obj
+    return type(obj).__name__
+
+
+def _groupby_keys(groupby):
+    if groupby.keys is None:
+        return f"level={groupby.level}"
+    return _describe(groupby.keys)
+
+
+class Profiler:
+    """
+    Section/step timer; every method is a cheap no-op unless enabled. As a
+    context manager it finishes on exit, and always removes its hooks.
+    """
+
+    def __init__(self, enabled=False, cprofile=False, output=None, script=None, top=15):
+        self.enabled = enabled or cprofile
+        self.cprofile = cprofile
+        self.script = script or os.path.splitext(os.path.basename(sys.argv[0]))[0]
+        self.output = output or f"profile_{self.script}.json"
+        self.top = top
+        self.sections = []
+        self._stack = []
+        self._section = None
+        self._profile = None
+        self._patches = []
+        self._hook_depth = 0
+        self._start = None
+
+    @classmethod
+    def from_args(cls, args, script=None):
+        profiler = cls(args.profile, args.profile_cprofile, args.profile_output, script)
+        profiler.start()
+        return profiler
+
+    def __enter__(self):
+        return self if self._start is not None else self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.finish()
+        else:
+            self.stop()
+        return False
+
+    # ------------------------------------------------------------------
+    # spans
+    # ------------------------------------------------------------------
+    def _enter(self):
+        current = 0
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            if self._stack:
+                self._stack[-1]['peak'] = max(self._stack[-1]['peak'], peak)
+            tracemalloc.reset_peak()
+        span = {'start': time.perf_counter(), 'base': current, 'peak': current}
+        self._stack.append(span)
+        return span
+
+    def _exit(self, span):
+        seconds = time.perf_counter() - span['start']
+        self._stack.pop()
+        peak = span['peak']
+        if tracemalloc.is_tracing():
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            if self._stack:
+                self._stack[-1]['peak'] = max(self._stack[-1]['peak'], peak)
+        # Memory the span needed on top of what was allocated when it started
+        return {'seconds': seconds, 'peak_mb': (peak - span['base']) / MB, 'rss_max_mb': _max_rss_mb()}
+
+    def start(self):
+        if not self.enabled:
+            return self
+        self._start = time.perf_counter()
+        tracemalloc.start()
+        self._install_hooks()
+        return self
+
+    def section(self, name):
+        """Close the current section (if any) and start timing the next one."""
+        if not self.enabled:
+            return
+        self._close_section()
+        self._section = {'name': name, 'steps': [], 'span': self._enter()}
+        if self.cprofile:
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+
+    def _close_section(self):
+        if self._section is None:
+            return
+        if self._profile is not None:
+            self._profile.disable()
+        # Steps left open by an exception belong to this section
+        while self._stack and self._stack[-1] is not self._section['span']:
+            self._stack.pop()
+        stats = self._exit(self._section.pop('span'))
+        self._section.update(stats)
+        if self._profile is not None:
+            self._section['cprofile'] = self._top_functions(self._profile)
+            self._profile = None
+        self.sections.append(self._section)
+        self._section = None
+
+    def _top_functions(self, profile):
+        stats = pstats.Stats(profile, stream=io.StringIO()).sort_stats('cumulative')
+        top = []
+        for (filename, line, func), (cc, nc, tt, ct, _) in stats.stats.items():
+            top.append({'function': f"{os.path.basename(filename)}:{line}({func})",
+                        'calls': nc, 'tottime': tt, 'cumtime': ct})
+        top.sort(key=lambda f: f['cumtime'], reverse=True)
+        return top[:self.top]
+
+    @contextmanager
+    def step(self, name):
+        """Time one sub-step of the current section."""
+        if not self.enabled:
+            yield
+            return
+        if self._section is None:
+            self.section('(startup)')
+        span = self._enter()
+        try:
+            yield
+        finally:
+            self._section['steps'].append(dict(name=name, **self._exit(span)))
+
+    def record(self, name, seconds, peak_mb=None):
+        """Add a step timed elsewhere (e.g. in a worker process)."""
+        if not self.enabled:
+            return
+        if self._section is None:
+            self.section('(startup)')
+        self._section['steps'].append({'name': name, 'seconds': seconds, 'peak_mb': peak_mb,
+                                       'rss_max_mb': None})
+
+    # ------------------------------------------------------------------
+    # automatic sub-steps
+    # ------------------------------------------------------------------
+    def _hook(self, owner, attr, label):
+        original = getattr(owner, attr)
+        profiler = self
+
+        @functools.wraps(original)
+        def wrapper(*args, **kwargs):
+            # Only the outermost instrumented call is a step (agg calls mean, ...)
+            if profiler._hook_depth:
+                return original(*args, **kwargs)
+            profiler._hook_depth += 1
+            try:
+                with profiler.step(label(args, kwargs)):
+                    return original(*args, **kwargs)
+            finally:
+                profiler._hook_depth -= 1
+
+        setattr(owner, attr, wrapper)
+        self._patches.append((owner, attr, original))
+
+    def _install_hooks(self):
+        from pandas.api.typing import SeriesGroupBy, DataFrameGroupBy
+
+        for cls in (SeriesGroupBy, DataFrameGroupBy):
+            for method in GROUPBY_METHODS:
+                self._hook(cls, method, lambda args, kw, m=method:
+                           f"groupby({_groupby_keys(args[0])}).{m}")
+
+        # The repo's own aggregation building blocks, if the script uses them
+        def arg(args, kw, name):
+            return _describe(args[1] if len(args) > 1 else kw.get(name))
+
+        modules = sys.modules
+        if 'groupby_engine' in modules:
+            self._hook(modules['groupby_engine'].GroupByEngine, 'aggregate',
+                       lambda args, kw: f"cube.aggregate({arg(args, kw, 'by')})")
+        if 'partitioned_view' in modules:
+            self._hook(modules['partitioned_view'].PartitionedFrame, 'profile',
+                       lambda args, kw: f"partitions({args[0].key}).profile({arg(args, kw, 'by')})")
+        if 'covariance_engine' in modules:
+            self._hook(modules['covariance_engine'].GroupedCovariance, 'update',
+                       lambda args, kw: f"covariance({_describe(args[0].keys)}).update")
+            self._hook(modules['covariance_engine'].CovarianceAccumulator, 'update',
+                       lambda args, kw: "covariance.update")
+        if 'quantile_sketch' in modules:
+            self._hook(modules['quantile_sketch'].GroupedSketch, 'update',
+                       lambda args, kw: f"sketch({_describe(args[0].keys)}).update")
+        if 'streaming_analysis' in modules:
+            self._hook(modules['streaming_analysis'].StreamingAggregator, 'update',
+                       lambda args, kw: "stream.update(chunk)")
+        if 'matplotlib.figure' in modules:
+            self._hook(modules['matplotlib.figure'].Figure, 'savefig',
+                       lambda args, kw: f"savefig({os.path.basename(str(args[1])) if len(args) > 1 else ''})")
+
+    def _remove_hooks(self):
+        for owner, attr, original in reversed(self._patches):
+            setattr(owner, attr, original)
+        self._patches = []
+
+    def stop(self):
+        """Restore the hooked methods and stop tracing without writing a trace (e.g. after an error)."""
+        if self._profile is not None:
+            self._profile.disable()
+            self._profile = None
+        self._remove_hooks()
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    # ------------------------------------------------------------------
+    # output
+    # ------------------------------------------------------------------
+    def finish(self):
+        """Close the last section, write the JSON trace and print the table."""
+        if not self.enabled:
+            return None
+        try:
+            self._close_section()
+        finally:
+            self.stop()
+        trace = {
+            'script': self.script,
+            'argv': sys.argv[1:],
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'total_seconds': time.perf_counter() - self._start,
+            'rss_max_mb': _max_rss_mb(),
+            'sections': self.sections,
+        }
+        with open(self.output, 'w') as f:
+            json.dump(trace, f, indent=2)
+        self.print_table(trace)
+        print(f"\nProfile trace written to {self.output}")
+        return trace
+
+    def print_table(self, trace):
+        print("\n" + "="*80)
+        print("PROFILE")
+        print("="*80)
+        print(f"{'section / step':54s} {'seconds':>9s} {'share':>6s} {'peak MB':>9s}")
+        total = trace['total_seconds']
+        for section in trace['sections']:
+            print(f"{section['name'][:54]:54s} {section['seconds']:9.4f} "
+                  f"{100 * section['seconds'] / total:5.1f}% {section['peak_mb']:9.1f}")
+            for step in section['steps']:
+                peak = '' if step['peak_mb'] is None else f"{step['peak_mb']:9.1f}"
+                print(f"  {step['name'][:52]:52s} {step['seconds']:9.4f} "
+                      f"{100 * step['seconds'] / total:5.1f}% {peak:>9s}")
+            for func in section.get('cprofile', [])[:5]:
+                print(f"    cProfile {func['function'][:43]:43s} {func['cumtime']:9.4f}")
+        rss = '' if trace['rss_max_mb'] is None else f", max RSS {trace['rss_max_mb']:.1f} MB"
+        print(f"{'TOTAL':54s} {total:9.4f}{rss}")
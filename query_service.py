@@ -0,0 +1,285 @@
+"""
+Uber Data Analysis - Local Query Service
+Loads the data once, builds a pickups cube over borough x hour x day_of_week x
+month x holiday x weather bins and answers slice/dice/rollup queries over HTTP
+from the cube, with an LRU result cache and latency statistics
+
+Usage:
+    python query_service.py                          # serve on 127.0.0.1:8765
+    python query_service.py --port 9000 --data other.csv
+
+Endpoints (all GET, JSON responses):
+    /query?borough=Brooklyn&hour=18&is_weekend=true&rain=true
+    /query?by=borough,hour&month=June                # rollup per borough and hour
+    /dimensions                                      # dimensions and their values
+    /stats                                           # cache hit rate and query latencies
+
+Filters take one value or a comma-separated list; day_of_week and month
+accept names or numbers, temp_bin takes the bin position listed by /dimensions.
+"""
+
+import argparse
+import json
+import threading
+import time
+from collections import OrderedDict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import numpy as np
+
+from data_loader import DATA_FILE, fill_missing_borough
+from data_cache import load_cached_data
+from calendar_features import DAY_ORDER, MONTH_ORDER
+from groupby_engine import GroupByEngine
+from binning import Binner
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+# Query results kept in the LRU cache and latencies kept for the statistics
+CACHE_SIZE = 1024
+LATENCY_WINDOW = 10_000
+
+DIMENSIONS = ['borough', 'hour', 'day_of_week', 'month', 'is_weekend', 'is_holiday',
+              'rain', 'snow', 'temp_bin']
+
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 't'}
+FALSE_VALUES = {'0', 'false', 'no', 'n', 'f'}
+
+
+class QueryError(ValueError):
+    """A malformed query (unknown dimension or value)."""
+
+
+def build_cube(df, binner=None):
+    """Pickups cube over DIMENSIONS from a frame with the calendar features."""
+    df = fill_missing_borough(df)
+    binner = binner or Binner()
+    return GroupByEngine(df['pickups'], {
+        'borough': df['borough'],
+        'hour': df['hour'],
+        'day_of_week': df['day_of_week'],
+        'month': df['month'],
+        'is_weekend': df['is_weekend'],
+        'is_holiday': df['is_holiday'],
+        'rain': df['pcp01'] > 0,
+        'snow': df['sd'] > 0,
+        'temp_bin': binner.categorical('temp', df['temp']),
+    })
+
+
+def _parse_bool(text):
+    text = text.lower()
+    if text in TRUE_VALUES:
+        return True
+    if text in FALSE_VALUES:
+        return False
+    raise QueryError(f"Expected a boolean, got {text!r}")
+
+
+def _parse_name_or_number(text, names, first):
+    """Position in `names` (offset by `first`) of a name, or the number itself."""
+    lowered = [name.lower() for name in names]
+    if text.lower() in lowered:
+        return lowered.index(text.lower()) + first
+    if text.lower()[:3] in [name[:3] for name in lowered]:
+        return [name[:3] for name in lowered].index(text.lower()[:3]) + first
+    try:
+        return int(text)
+    except ValueError:
+        raise QueryError(f"Unknown value {text!r}") from None
+
+
+class DemandCubeService:
+    """Slice/dice/rollup queries over a GroupByEngine cube, with an LRU cache."""
+
+    def __init__(self, engine, cache_size=CACHE_SIZE):
+        self.engine = engine
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+        self.queries = 0
+        self.hits = 0
+        self.errors = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+    def _parse_value(self, dim, text):
+        text = text.strip()
+        if dim == 'borough':
+            return text
+        if dim == 'hour':
+            try:
+                return int(text)
+            except ValueError:
+                raise QueryError(f"Unknown hour {text!r}") from None
+        if dim == 'day_of_week':
+            return _parse_name_or_number(text, DAY_ORDER, 0)
+        if dim == 'month':
+            return _parse_name_or_number(text, MONTH_ORDER, 1)
+        if dim == 'temp_bin':
+            levels = self.engine.levels['temp_bin']
+            try:
+                position = int(text)
+            except ValueError:
+                position = -1
+            # Negative positions would index from the end
+            if not 0 <= position < len(levels):
+                raise QueryError(f"temp_bin must be a bin position 0-{len(levels) - 1}, got {text!r}")
+            return levels[position]
+        return _parse_bool(text)
+
+    def parse(self, params):
+        """(by, where) from query-string parameters (name -> list of strings)."""
+        by = []
+        where = {}
+        for name, values in params.items():
+            if name == 'by':
+                by = [b.strip() for value in values for b in value.split(',') if b.strip()]
+                continue
+            if name not in DIMENSIONS:
+                raise QueryError(f"Unknown dimension {name!r}")
+            where[name] = [self._parse_value(name, v) for value in values for v in value.split(',')]
+        for name in by:
+            if name not in DIMENSIONS:
+                raise QueryError(f"Unknown dimension {name!r}")
+        return tuple(by), where
+
+    def _label(self, dim, value):
+        """JSON-friendly label of a cube level value."""
+        if dim == 'day_of_week':
+            return DAY_ORDER[int(value)]
+        if dim == 'month':
+            return MONTH_ORDER[int(value) - 1]
+        if dim == 'temp_bin':
+            return str(value)
+        if isinstance(value, np.generic):
+            return value.item()
+        return value
+
+    def _rows(self, by, frame):
+        rows = []
+        for key, stats in frame.iterrows():
+            key = key if isinstance(key, tuple) else (key,)
+            row = {dim: self._label(dim, value) for dim, value in zip(by, key)}
+            row.update(mean=float(stats['mean']), sum=int(stats['sum']), count=int(stats['count']))
+            rows.append(row)
+        return rows
+
+    def query(self, params):
+        """Answer one query; returns a JSON-serializable dict."""
+        start = time.perf_counter()
+        by, where = self.parse(params)
+        cache_key = (by, tuple(sorted((name, tuple(map(str, values))) for name, values in where.items())))
+
+        with self.lock:
+            rows = self.cache.get(cache_key)
+            if rows is not None:
+                self.cache.move_to_end(cache_key)
+        cached = rows is not None
+        if not cached:
+            rows = self._rows(by, self.engine.aggregate(by, where))
+            with self.lock:
+                self.cache[cache_key] = rows
+                if len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+
+        elapsed = time.perf_counter() - start
+        with self.lock:
+            self.queries += 1
+            self.hits += cached
+            self.latencies.append(elapsed)
+        return {
+            'by': list(by),
+            'filters': {name: [self._label(name, v) for v in values] for name, values in where.items()},
+            'rows': rows,
+            'cached': cached,
+            'elapsed_ms': round(elapsed * 1000, 3),
+        }
+
+    def dimensions(self):
+        return {dim: [self._label(dim, v) for v in self.engine.levels[dim]] for dim in DIMENSIONS}
+
+    def stats(self):
+        with self.lock:
+            latencies_ms = np.array(self.latencies) * 1000
+            queries, hits, errors = self.queries, self.hits, self.errors
+            cache_entries = len(self.cache)
+        latency = {}
+        if len(latencies_ms):
+            latency = {
+                'mean': float(latencies_ms.mean()),
+                'p50': float(np.percentile(latencies_ms, 50)),
+                'p95': float(np.percentile(latencies_ms, 95)),
+                'p99': float(np.percentile(latencies_ms, 99)),
+                'max': float(latencies_ms.max()),
+            }
+        return {
+            'cube_cells': self.engine.n_cells,
+            'queries': queries,
+            'errors': errors,
+            'cache_hits': hits,
+            'cache_misses': queries - hits,
+            'cache_hit_rate': hits / queries if queries else 0.0,
+            'cache_entries': cache_entries,
+            'latency_ms': latency,
+        }
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    service = None
+
+    def _send(self, status, payload):
+        body = json.dumps(payload, indent=2).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        try:
+            if url.path == '/query':
+                self._send(200, self.service.query(parse_qs(url.query)))
+            elif url.path == '/dimensions':
+                self._send(200, self.service.dimensions())
+            elif url.path == '/stats':
+                self._send(200, self.service.stats())
+            else:
+                self._send(404, {'error': f"Unknown endpoint {url.path}"})
+        except QueryError as e:
+            with self.service.lock:
+                self.service.errors += 1
+            self._send(400, {'error': str(e)})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local query service over the Uber demand cube')
+    parser.add_argument('--data', default=DATA_FILE, help='CSV file to load')
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    df, _ = load_cached_data(args.data)
+    engine = build_cube(df)
+    print(f"Built cube of {engine.n_cells:,} cells from {len(df):,} rows "
+          f"in {time.perf_counter() - start:.3f}s")
+
+    QueryHandler.service = DemandCubeService(engine)
+    server = ThreadingHTTPServer((args.host, args.port), QueryHandler)
+    print(f"Serving on http://{args.host}:{args.port}/ (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
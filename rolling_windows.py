@@ -0,0 +1,230 @@
+"""
+Uber Data Analysis - Rolling-Window Demand Metrics
+Trailing 3h, 24h and 7-day pickup averages and growth rates per borough over
+the hourly timeline. Missing hours (no row for a borough) are NaN, not zero:
+a window's mean is over the hours it actually has, and is only reported when
+enough of the window is covered. Batch metrics for every hour, window and
+borough come from one cumulative-sum pass; RollingState keeps a ring buffer
+of cumulative sums so each new hour updates every window in O(1)
+
+Usage:
+    python rolling_windows.py                        # latest metrics and 24h peaks per borough
+    python rolling_windows.py --at "2015-06-30 18:00"
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from data_loader import DATA_FILE, fill_missing_borough
+
+# Trailing windows in hours
+WINDOWS = {'3h': 3, '24h': 24, '7d': 168}
+
+# Share of a window's hours that must have data for its mean to be reported
+MIN_COVERAGE = 0.5
+
+HOUR = np.timedelta64(1, 'h')
+
+
+def hourly_timeline(df):
+    """
+    Pickups per borough on the complete hourly timeline of `df`.
+    Returns (hours, boroughs, values) with values[hour, borough] NaN where no row exists;
+    several rows for one hour and borough are summed.
+    """
+    df = fill_missing_borough(df)
+    ts = df['pickup_dt'].to_numpy().astype('datetime64[h]')
+    start = ts.min()
+    offsets = ((ts - start) // HOUR).astype(np.int64)
+    b_codes, boroughs = pd.factorize(df['borough'].astype(str), sort=True)
+    shape = (int(offsets.max()) + 1, len(boroughs))
+
+    sums = np.zeros(shape)
+    counts = np.zeros(shape, dtype=np.int64)
+    np.add.at(sums, (offsets, b_codes), df['pickups'].to_numpy(dtype=np.float64))
+    np.add.at(counts, (offsets, b_codes), 1)
+    values = np.where(counts > 0, sums, np.nan)
+    hours = pd.date_range(pd.Timestamp(start), periods=shape[0], freq='h', name='pickup_dt')
+    return hours, pd.Index(boroughs, name='borough'), values
+
+
+def _window_stats(cum_sum, cum_count, end, w, min_coverage):
+    """Mean and coverage of the windows ending before cumulative positions `end`."""
+    end = np.maximum(end, 0)
+    start = np.maximum(end - w, 0)
+    sums = cum_sum[end] - cum_sum[start]
+    counts = cum_count[end] - cum_count[start]
+    # Windows reaching before the first hour are incomplete, not short
+    valid = (end[:, None] >= w) & (counts >= np.ceil(min_coverage * w))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.where(valid, sums / counts, np.nan)
+    return mean, counts / w
+
+
+def rolling_metrics(values, hours, boroughs, windows=WINDOWS, min_coverage=MIN_COVERAGE):
+    """
+    Trailing mean, growth (vs the preceding window of the same length) and
+    coverage for every hour, window and borough in one vectorized pass.
+    Columns are a (metric, window, borough) MultiIndex.
+    """
+    present = ~np.isnan(values)
+    zero = np.zeros((1, values.shape[1]))
+    cum_sum = np.vstack([zero, np.cumsum(np.where(present, values, 0.0), axis=0)])
+    cum_count = np.vstack([zero, np.cumsum(present, axis=0)])
+    end = np.arange(1, len(values) + 1)
+
+    frames = {}
+    for name, w in windows.items():
+        mean, coverage = _window_stats(cum_sum, cum_count, end, w, min_coverage)
+        previous, _ = _window_stats(cum_sum, cum_count, end - w, w, min_coverage)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            growth = mean / previous - 1
+        for metric, data in (('mean', mean), ('growth', growth), ('coverage', coverage)):
+            frames[(metric, name)] = pd.DataFrame(data, index=hours, columns=boroughs)
+    return pd.concat(frames, axis=1, names=['metric', 'window'])
+
+
+class RollingState:
+    """
+    Live trailing-window state: a ring buffer of per-borough cumulative sums
+    and counts covering two of the longest windows, so appending an hour and
+    reading every window's mean and growth are O(1) per borough.
+    """
+
+    def __init__(self, windows=WINDOWS, min_coverage=MIN_COVERAGE):
+        self.windows = dict(windows)
+        self.min_coverage = min_coverage
+        self.size = 2 * max(self.windows.values()) + 1
+        self.boroughs = pd.Index([], name='borough')
+        self.cum_sum = np.zeros((self.size, 0))
+        self.cum_count = np.zeros((self.size, 0))
+        self.steps = 0
+        self.last_hour = None
+
+    def _add_boroughs(self, boroughs):
+        new = pd.Index(boroughs).difference(self.boroughs)
+        if len(new):
+            self.boroughs = self.boroughs.append(new).rename('borough')
+            pad = ((0, 0), (0, len(new)))
+            self.cum_sum = np.pad(self.cum_sum, pad)
+            self.cum_count = np.pad(self.cum_count, pad)
+
+    def _slot(self, step):
+        return step % self.size
+
+    def push(self, hour, values):
+        """Add one hour (a Series of pickups per borough); skipped hours count as missing."""
+        hour = pd.Timestamp(hour).floor('h')
+        values = values.dropna()
+        self._add_boroughs(values.index)
+        row = values.reindex(self.boroughs).to_numpy(dtype=np.float64)
+        present = ~np.isnan(row)
+        row = np.where(present, row, 0.0)
+
+        if self.last_hour is not None and hour < self.last_hour:
+            raise ValueError(f"Hour {hour} is before the last hour in the state ({self.last_hour})")
+        if self.last_hour is not None and hour == self.last_hour:
+            # More rows for the current hour (e.g. split across chunks)
+            slot = self._slot(self.steps)
+            self.cum_sum[slot] += row
+            self.cum_count[slot] += present & (self.cum_count[slot] == self.cum_count[self._slot(self.steps - 1)])
+            return self
+
+        gap = 1 if self.last_hour is None else int((hour - self.last_hour) / pd.Timedelta(hours=1))
+        for _ in range(gap - 1):
+            # Missing hours carry the cumulative totals forward unchanged
+            self.steps += 1
+            self.cum_sum[self._slot(self.steps)] = self.cum_sum[self._slot(self.steps - 1)]
+            self.cum_count[self._slot(self.steps)] = self.cum_count[self._slot(self.steps - 1)]
+        self.steps += 1
+        slot, previous = self._slot(self.steps), self._slot(self.steps - 1)
+        self.cum_sum[slot] = self.cum_sum[previous] + row
+        self.cum_count[slot] = self.cum_count[previous] + present
+        self.last_hour = hour
+        return self
+
+    def update(self, df):
+        """Fold new rows (in pickup_dt order, possibly repeating the last hour) into the state."""
+        if len(df) == 0:
+            return self
+        df = fill_missing_borough(df)
+        hourly = (df.assign(borough=df['borough'].astype(str), hour=df['pickup_dt'].dt.floor('h'))
+                  .groupby(['hour', 'borough'])['pickups'].sum().unstack())
+        for hour, values in hourly.iterrows():
+            self.push(hour, values)
+        return self
+
+    def _window(self, end, w):
+        # Slots older than the ring (or before the first hour) are not available
+        if end < w or self.steps - end + w >= self.size:
+            return np.full(len(self.boroughs), np.nan), np.zeros(len(self.boroughs))
+        sums = self.cum_sum[self._slot(end)] - self.cum_sum[self._slot(end - w)]
+        counts = self.cum_count[self._slot(end)] - self.cum_count[self._slot(end - w)]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(counts >= np.ceil(self.min_coverage * w), sums / counts, np.nan)
+        return mean, counts / w
+
+    def current(self):
+        """Mean, growth and coverage of every window ending at the last hour, per borough."""
+        columns = {}
+        for name, w in self.windows.items():
+            mean, coverage = self._window(self.steps, w)
+            previous, _ = self._window(self.steps - w, w)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                columns[('mean', name)] = mean
+                columns[('growth', name)] = mean / previous - 1
+            columns[('coverage', name)] = coverage
+        table = pd.DataFrame(columns, index=self.boroughs)
+        table.columns.names = ['metric', 'window']
+        return table
+
+
+def print_rolling(table, as_of):
+    """Latest window means and growth per borough."""
+    print(f"\n--- Rolling Demand per Borough (trailing windows ending {as_of}) ---")
+    shown = pd.DataFrame(index=table.index)
+    for name in WINDOWS:
+        shown[f"avg {name}"] = table[('mean', name)].round(1)
+        shown[f"growth {name}"] = (100 * table[('growth', name)]).round(1).astype(str) + '%'
+    print(shown.sort_values(f"avg {list(WINDOWS)[-1]}", ascending=False).to_string())
+
+
+def main():
+    from data_cache import load_cached_data
+
+    parser = argparse.ArgumentParser(description='Rolling-window pickup metrics per borough')
+    parser.add_argument('--data', default=DATA_FILE)
+    parser.add_argument('--at', default=None, help='report the windows ending at this hour (default: last)')
+    args = parser.parse_args()
+
+    df, _ = load_cached_data(args.data)
+    hours, boroughs, values = hourly_timeline(df)
+    metrics = rolling_metrics(values, hours, boroughs)
+    missing = np.isnan(values).sum(axis=0)
+    print(f"Hourly timeline: {len(hours):,} hours x {len(boroughs)} boroughs "
+          f"({hours[0]} to {hours[-1]})")
+    print("Missing hours per borough: " + ', '.join(f"{b} {m:,}" for b, m in zip(boroughs, missing)))
+
+    at = pd.Timestamp(args.at) if args.at else hours[-1]
+    latest = metrics.loc[at].unstack(['metric', 'window'])
+    print_rolling(latest, at)
+
+    print("\n--- Busiest 24h Window per Borough ---")
+    mean_24h = metrics['mean']['24h']
+    for borough in boroughs:
+        series = mean_24h[borough].dropna()
+        if len(series):
+            print(f"{borough:15s} {series.max():8.1f} avg pickups/h in the 24h to {series.idxmax()}")
+
+    print("\n--- Largest Week-over-Week Growth per Borough ---")
+    growth_7d = metrics['growth']['7d']
+    for borough in boroughs:
+        series = growth_7d[borough].replace(np.inf, np.nan).dropna()
+        if len(series):
+            print(f"{borough:15s} {100 * series.max():+7.1f}% for the week to {series.idxmax()}")
+
+
+if __name__ == '__main__':
+    main()
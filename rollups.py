@@ -0,0 +1,272 @@
+"""
+Uber Data Analysis - Multi-Resolution Rollups
+Materialized sum, count and sum of squares of pickups per borough at the
+hour, day, ISO week and month grains. Only the hour level is built from rows;
+each coarser level is rolled up from the level below it (days from hours,
+weeks and months from days, since weeks straddle month boundaries). A query
+reads the coarsest level that can answer it -- its keys derivable from that
+level's periods and its date range aligned to them -- so its cost follows the
+size of the answer, not of the data. Appending rows re-derives only the
+periods they touch.
+
+Usage:
+    python rollups.py                                # build, run sample queries, check an incremental append
+    python rollups.py --by borough month --start 2015-03-01 --end 2015-05-01
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from data_loader import DATA_FILE, fill_missing_borough
+from calendar_features import calendar_codes, with_day_labels
+
+GRAINS = ['hour', 'day', 'week', 'month']
+
+# Level each grain is rolled up from; weeks straddle months, so months come from days
+PARENT = {'day': 'hour', 'week': 'day', 'month': 'day'}
+
+STATS = ['sum', 'count', 'sumsq']
+
+# Query keys each grain's periods can answer
+DERIVABLE = {
+    'month': {'borough', 'month'},
+    'week': {'borough', 'week'},
+    'day': {'borough', 'month', 'week', 'date', 'day_of_week'},
+    'hour': {'borough', 'month', 'week', 'date', 'day_of_week', 'hour'},
+}
+
+QUERY_KEYS = ['borough', 'month', 'week', 'date', 'day_of_week', 'hour']
+
+
+def period_start(timestamps, grain):
+    """Start of the hour, day, ISO week (Monday) or month containing each timestamp."""
+    ts = np.asarray(timestamps, dtype='datetime64[us]')
+    if grain == 'hour':
+        start = ts.astype('datetime64[h]')
+    elif grain == 'day':
+        start = ts.astype('datetime64[D]')
+    elif grain == 'week':
+        days = ts.astype('datetime64[D]')
+        # 1970-01-01 was a Thursday; Monday = 0
+        start = days - ((days.astype(np.int64) + 3) % 7).astype('timedelta64[D]')
+    elif grain == 'month':
+        start = ts.astype('datetime64[M]')
+    else:
+        raise ValueError(f"Unknown grain {grain!r}; expected one of {GRAINS}")
+    return start.astype('datetime64[us]')
+
+
+def period_end(starts, grain):
+    """Start of the period following each period start."""
+    starts = np.asarray(starts, dtype='datetime64[us]')
+    if grain == 'month':
+        return (starts.astype('datetime64[M]') + 1).astype('datetime64[us]')
+    step = {'hour': np.timedelta64(1, 'h'), 'day': np.timedelta64(1, 'D'), 'week': np.timedelta64(7, 'D')}
+    return starts + step[grain]
+
+
+def _period_slice(level, first, end):
+    """Positions of the rows of a period-sorted level with first <= period < end."""
+    if len(level) == 0:
+        return 0, 0
+    # slice_locs searches the sorted period codes instead of materializing the level
+    last = np.datetime64(end, 'us') - np.timedelta64(1, 'us')
+    return level.index.slice_locs(np.datetime64(first, 'us'), last)
+
+
+def _empty_level():
+    index = pd.MultiIndex.from_arrays([np.array([], dtype='datetime64[us]'), np.array([], dtype=object)],
+                                      names=['period', 'borough'])
+    return pd.DataFrame({stat: np.array([], dtype=np.int64) for stat in STATS}, index=index)
+
+
+def _rollup(level, periods):
+    """Sum the stats of `level` rows per (period, borough) with the given new periods."""
+    boroughs = level.index.get_level_values('borough')
+    rolled = level.groupby([pd.Index(periods, name='period'), boroughs]).sum()
+    rolled.index.names = ['period', 'borough']
+    return rolled
+
+
+class RollupHierarchy:
+    """Hour, day, week and month rollups per borough, each derived from the level below."""
+
+    def __init__(self):
+        self.levels = {grain: _empty_level() for grain in GRAINS}
+        self.last_query = None
+
+    def n_cells(self, grain):
+        return len(self.levels[grain])
+
+    def _refresh(self, grain, parent_periods):
+        """Re-derive the periods of `grain` covering some periods of its parent level."""
+        periods = np.unique(period_start(parent_periods, grain))
+        end = period_end(periods[-1:], grain)[0]
+        # Levels are sorted by period, so the touched rows of the parent and of
+        # this level are one slice of each; only that slice is regrouped
+        parent = self.levels[PARENT[grain]]
+        lo, hi = _period_slice(parent, periods[0], end)
+        window = parent.iloc[lo:hi]
+        starts = period_start(window.index.get_level_values('period'), grain)
+        touched = np.isin(starts, periods)
+        fresh = _rollup(window[touched], starts[touched])
+
+        level = self.levels[grain]
+        lo, hi = _period_slice(level, periods[0], end)
+        middle = level.iloc[lo:hi]
+        middle = middle[~np.isin(middle.index.get_level_values('period'), periods)]
+        self.levels[grain] = pd.concat([level.iloc[:lo], pd.concat([middle, fresh]).sort_index(),
+                                        level.iloc[hi:]])
+        return periods
+
+    def update(self, df):
+        """Fold new rows into the hour level and re-derive the days, weeks and months they touch."""
+        if len(df) == 0:
+            return self
+        df = fill_missing_borough(df)
+        pickups = df['pickups'].to_numpy(dtype=np.int64)
+        hours = period_start(df['pickup_dt'], 'hour')
+        rows = pd.DataFrame({'sum': pickups, 'count': np.ones(len(df), dtype=np.int64),
+                             'sumsq': pickups * pickups},
+                            index=pd.MultiIndex.from_arrays([hours, df['borough'].astype(str).to_numpy()],
+                                                            names=['period', 'borough']))
+        # Rows may repeat an hour already in the level (e.g. a drop split mid-hour):
+        # only the hour cells within the new rows' span are merged, the rest is kept in order
+        level = self.levels['hour']
+        lo, hi = _period_slice(level, hours.min(), period_end([hours.max()], 'hour')[0])
+        merged = pd.concat([level.iloc[lo:hi], rows]).groupby(level=['period', 'borough']).sum()
+        self.levels['hour'] = pd.concat([level.iloc[:lo], merged, level.iloc[hi:]])
+
+        days = self._refresh('day', np.unique(hours))
+        self._refresh('week', days)
+        self._refresh('month', days)
+        return self
+
+    # ------------------------------------------------------------------
+    # queries
+    # ------------------------------------------------------------------
+    def level_for(self, by, start=None, end=None):
+        """
+        Coarsest grain whose periods give every key of `by` and align with
+        [start, end). Rows are hourly, so the hour level answers any bounds.
+        """
+        unknown = set(by) - DERIVABLE['hour']
+        if unknown:
+            raise ValueError(f"Cannot answer a query by {sorted(unknown)}; keys must be in {QUERY_KEYS}")
+        bounds = [pd.Timestamp(b).to_datetime64() for b in (start, end) if b is not None]
+        for grain in reversed(GRAINS[1:]):
+            if set(by) <= DERIVABLE[grain] and all(period_start([b], grain)[0] == b for b in bounds):
+                return grain
+        return 'hour'
+
+    def _keys(self, level, key):
+        periods = level.index.get_level_values('period').to_numpy()
+        if key == 'borough':
+            return level.index.get_level_values('borough')
+        if key in ('month', 'week'):
+            return period_start(periods, key)
+        if key == 'date':
+            return period_start(periods, 'day')
+        return calendar_codes(periods)[key]
+
+    def query(self, by, start=None, end=None, boroughs=None):
+        """
+        mean, std, sum and count of pickups per group of `by` over [start, end)
+        and the boroughs, read from the coarsest level that answers it; the
+        level and the cells read are kept in last_query.
+        """
+        by = [by] if isinstance(by, str) else list(by)
+        grain = self.level_for(by, start, end)
+        level = self.levels[grain]
+        periods = level.index.get_level_values('period')
+        lo = 0 if start is None else periods.searchsorted(pd.Timestamp(start), side='left')
+        hi = len(level) if end is None else periods.searchsorted(pd.Timestamp(end), side='left')
+        level = level.iloc[lo:hi]
+        if boroughs:
+            level = level[level.index.get_level_values('borough').isin(list(boroughs))]
+        self.last_query = {'grain': grain, 'cells': len(level)}
+
+        if by:
+            table = level.groupby([pd.Index(self._keys(level, key), name=key) for key in by]).sum()
+        else:
+            table = pd.DataFrame([level.sum()], index=pd.Index(['all']))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = table['sum'] / table['count']
+            var = (table['sumsq'] - table['sum'] * mean) / (table['count'] - 1)
+        table.insert(0, 'mean', mean)
+        table.insert(1, 'std', np.sqrt(var.clip(lower=0).where(table['count'] > 1)))
+        return table[['mean', 'std', 'sum', 'count']]
+
+
+def build_rollups(df):
+    return RollupHierarchy().update(df)
+
+
+def print_level_sizes(hierarchy):
+    print("Rollup levels: " + ', '.join(f"{grain} {hierarchy.n_cells(grain):,}" for grain in GRAINS)
+          + " (period x borough cells)")
+
+
+def _timed_query(hierarchy, by, start=None, end=None, boroughs=None):
+    begin = time.perf_counter()
+    table = hierarchy.query(by, start, end, boroughs)
+    elapsed = time.perf_counter() - begin
+    plan = hierarchy.last_query
+    print(f"\n--- by {', '.join(by) or '(total)'}"
+          f"{'' if start is None and end is None else f' from {start} to {end}'}: "
+          f"{plan['grain']} level, {plan['cells']:,} cells read, {1000 * elapsed:.2f} ms ---")
+    return table
+
+
+def main():
+    from data_cache import load_cached_data
+
+    parser = argparse.ArgumentParser(description='Hour/day/week/month rollups per borough')
+    parser.add_argument('--data', default=DATA_FILE)
+    parser.add_argument('--by', nargs='*', default=None, choices=QUERY_KEYS,
+                        help='run one query grouped by these keys instead of the samples')
+    parser.add_argument('--start', default=None, help='first pickup_dt to include')
+    parser.add_argument('--end', default=None, help='pickup_dt to stop before (exclusive)')
+    parser.add_argument('--borough', action='append', default=None, help='borough to include')
+    args = parser.parse_args()
+
+    df, _ = load_cached_data(args.data)
+    df = fill_missing_borough(df)
+    start = time.perf_counter()
+    hierarchy = build_rollups(df)
+    print(f"Built rollups from {len(df):,} rows in {time.perf_counter() - start:.3f}s")
+    print_level_sizes(hierarchy)
+
+    if args.by is not None:
+        try:
+            table = _timed_query(hierarchy, args.by, args.start, args.end, args.borough)
+        except ValueError as e:
+            parser.error(str(e))
+        print(table.round(1).to_string())
+        return
+
+    print(_timed_query(hierarchy, ['borough']).sort_values('sum', ascending=False).round(1).to_string())
+    print(_timed_query(hierarchy, ['month', 'borough'])['sum'].unstack().to_string())
+    weekly = _timed_query(hierarchy, ['week'], '2015-03-02', '2015-04-06')
+    print(weekly.round(1).to_string())
+    daily = _timed_query(hierarchy, ['day_of_week'])
+    print(with_day_labels(daily).round(1).to_string())
+    hourly = _timed_query(hierarchy, ['hour'], '2015-06-01', '2015-06-08', ['Manhattan'])
+    print(hourly['mean'].round(0).to_frame().T.to_string())
+
+    # An append of the last day re-derives one day, week and month
+    last_day = df['pickup_dt'].dt.normalize().max()
+    incremental = build_rollups(df[df['pickup_dt'] < last_day])
+    start = time.perf_counter()
+    incremental.update(df[df['pickup_dt'] >= last_day])
+    elapsed = time.perf_counter() - start
+    same = all(incremental.levels[g].equals(hierarchy.levels[g]) for g in GRAINS)
+    print(f"\nAppending {last_day.date()} ({(df['pickup_dt'] >= last_day).sum():,} rows) took "
+          f"{1000 * elapsed:.1f} ms; matches the full build: {same}")
+
+
+if __name__ == '__main__':
+    main()
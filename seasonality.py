@@ -0,0 +1,235 @@
+"""
+Uber Data Analysis - Spectral Seasonality
+Finds the dominant cycles of every borough's hourly pickup series at once:
+the series are stacked as columns of one [hour x borough] matrix (the dense
+timeline of rolling_windows.hourly_timeline) and transformed with a single
+batched real FFT. The periodogram gives the top periods and the share of the
+series' variance each explains; autocorrelations for every lag come from the
+same FFT (Wiener-Khinchin), with missing hours excluded from both the
+products and the pair counts rather than treated as zero demand. Series are
+linearly detrended first so growth over the period does not show up as a
+spurious multi-month cycle. Holiday shifts are measured by recomputing the
+24h and 168h strengths with holiday days masked out.
+
+Usage:
+    python seasonality.py                            # top periods, 24h/168h strength and holiday shift
+    python seasonality.py --benchmark --zones 5000 --years 3
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from data_loader import DATA_FILE, fill_missing_borough
+from rolling_windows import hourly_timeline
+
+# Cycles reported for every borough
+CYCLES = {'24h': 24, '168h': 168}
+
+# Peaks shorter than this (hours) are noise at hourly resolution
+MIN_PERIOD = 3
+
+# A period must repeat at least this many times within the series to be reported
+MIN_CYCLES = 3
+
+TOP_PERIODS = 5
+
+
+def _fft_length(n):
+    """Smallest 2**a * 3**b * 5**c at or above n (fast FFT sizes)."""
+    best = 1 << int(np.ceil(np.log2(max(n, 1))))
+    p5 = 1
+    while p5 < best:
+        p35 = p5
+        while p35 < best:
+            size = p35
+            while size < n:
+                size *= 2
+            best = min(best, size)
+            p35 *= 3
+        p5 *= 5
+    return best
+
+
+def _centered(values):
+    """
+    Per-column residuals from a least-squares line through the present hours,
+    with missing hours as 0, and the mask of present hours.
+    """
+    present = ~np.isnan(values)
+    mask = present.astype(np.float64)
+    y = np.where(present, values, 0.0)
+    t = np.arange(len(values), dtype=np.float64)[:, None] - (len(values) - 1) / 2
+    n, st, stt = mask.sum(axis=0), (mask * t).sum(axis=0), (mask * t * t).sum(axis=0)
+    sy, sty = y.sum(axis=0), (y * t).sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        det = n * stt - st * st
+        slope = np.where(det > 0, (n * sty - st * sy) / det, 0.0)
+        intercept = np.where(n > 0, (sy - slope * st) / n, 0.0)
+    return np.where(present, y - intercept - slope * t, 0.0), present
+
+
+def periodogram(values):
+    """
+    Frequencies (cycles per hour) and power of every column of an [hour x series]
+    matrix in one batched rfft; missing hours contribute nothing.
+    """
+    centered, _ = _centered(values)
+    spectrum = np.fft.rfft(centered, axis=0)
+    power = spectrum.real ** 2 + spectrum.imag ** 2
+    return np.fft.rfftfreq(len(values)), power
+
+
+def autocorrelation(values, max_lag):
+    """
+    Autocorrelation of every column at lags 0..max_lag, from one zero-padded
+    batched FFT. Each lag is normalized by the number of hour pairs where both
+    values are present, so gaps do not pull the correlation towards zero.
+    """
+    centered, present = _centered(values)
+    size = _fft_length(2 * len(values))
+    products = np.fft.irfft(np.abs(np.fft.rfft(centered, size, axis=0)) ** 2, size, axis=0)[:max_lag + 1]
+    if present.all():
+        pairs = (len(values) - np.arange(max_lag + 1, dtype=np.float64))[:, None]
+    else:
+        mask = present.astype(np.float64)
+        pairs = np.fft.irfft(np.abs(np.fft.rfft(mask, size, axis=0)) ** 2, size, axis=0)[:max_lag + 1]
+        pairs = np.rint(pairs)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        covariance = np.where(pairs > 0, products / pairs, np.nan)
+        return covariance / covariance[0]
+
+
+def top_periods(freqs, power, columns, top=TOP_PERIODS, min_period=MIN_PERIOD, min_cycles=MIN_CYCLES):
+    """
+    The `top` strongest spectral peaks of every column: period in hours
+    (refined by parabolic interpolation of the log power) and strength, the
+    share of the column's variance in the peak's bin and its two neighbours.
+    """
+    total = power[1:].sum(axis=0)
+    inner = power[1:-1]
+    peaks = (inner > power[:-2]) & (inner >= power[2:])
+    n_hours = 1.0 / freqs[1]
+    band = freqs[1:-1, None]
+    peaks &= (band <= 1.0 / min_period) & (band >= min_cycles / n_hours)
+    ranked = np.where(peaks, power[:-2] + inner + power[2:], -np.inf)
+    order = np.argsort(-ranked, axis=0, kind='stable')[:top] + 1
+
+    rows = []
+    log_power = np.log(np.maximum(power, np.finfo(float).tiny))
+    for col, name in enumerate(columns):
+        for rank, k in enumerate(order[:, col], 1):
+            if not np.isfinite(ranked[k - 1, col]) or total[col] == 0:
+                break
+            a, b, c = log_power[k - 1, col], log_power[k, col], log_power[k + 1, col]
+            denom = a - 2 * b + c
+            offset = 0.5 * (a - c) / denom if denom != 0 else 0.0
+            rows.append({'borough': name, 'rank': rank, 'period_h': n_hours / (k + offset),
+                         'strength': ranked[k - 1, col] / total[col]})
+    return pd.DataFrame(rows, columns=['borough', 'rank', 'period_h', 'strength'])
+
+
+def cycle_strength(freqs, power, period):
+    """Share of each column's variance within one bin of the frequency 1/period."""
+    k = int(round(1.0 / period / freqs[1]))
+    return power[max(k - 1, 1):k + 2].sum(axis=0) / power[1:].sum(axis=0)
+
+
+def holiday_hours(df, hours):
+    """Boolean mask over `hours` of the hours on holiday dates."""
+    days = pd.DatetimeIndex(df.loc[df['hday'] == 'Y', 'pickup_dt']).normalize().unique()
+    return np.asarray(hours.normalize().isin(days))
+
+
+def seasonality_table(values, boroughs, holiday=None):
+    """Per-borough 24h/168h spectral strength and autocorrelation, with and without holiday days."""
+    freqs, power = periodogram(values)
+    acf = autocorrelation(values, max(CYCLES.values()))
+    table = pd.DataFrame(index=boroughs)
+    for name, period in CYCLES.items():
+        table[f"strength {name}"] = cycle_strength(freqs, power, period)
+        table[f"acf {name}"] = acf[period]
+    if holiday is not None and holiday.any():
+        masked = np.where(holiday[:, None], np.nan, values)
+        freqs, power = periodogram(masked)
+        for name, period in CYCLES.items():
+            table[f"shift {name}"] = cycle_strength(freqs, power, period) - table[f"strength {name}"]
+    return table
+
+
+def print_seasonality(periods, table, hours):
+    print(f"\n--- Dominant Periods per Borough ({len(hours):,} hours, {hours[0]} to {hours[-1]}) ---")
+    shown = periods.assign(period_h=periods['period_h'].round(1),
+                           strength=(100 * periods['strength']).round(1).astype(str) + '%')
+    print(shown.pivot(index='borough', columns='rank', values='period_h').to_string())
+    print("\nShare of variance (strength) of each period:")
+    print(shown.pivot(index='borough', columns='rank', values='strength').to_string())
+
+    print("\n--- Daily and Weekly Cycles ---")
+    print("strength = share of variance at the period; acf = autocorrelation at that lag; "
+          "shift = change in strength with holiday days masked out (positive: holidays weaken the cycle)")
+    formatted = table.copy()
+    for col in formatted.columns:
+        if col.startswith('acf'):
+            formatted[col] = formatted[col].round(3)
+        else:
+            formatted[col] = (100 * formatted[col]).round(1).map(lambda v: f"{v:+.1f}%" if col.startswith('shift')
+                                                                  else f"{v:.1f}%")
+    print(formatted.to_string())
+
+
+def benchmark(zones=1000, years=3, seed=0):
+    """Time the batched periodogram and autocorrelation on synthetic zones x hourly series."""
+    rng = np.random.default_rng(seed)
+    n = int(years * 365.25 * 24)
+    t = np.arange(n)[:, None]
+    scale = rng.gamma(2.0, 50.0, size=zones)
+    values = scale * (1 + 0.5 * np.sin(2 * np.pi * t / 24) + 0.2 * np.sin(2 * np.pi * t / 168))
+    values = rng.poisson(values).astype(np.float64)
+    values[rng.random(values.shape) < 0.02] = np.nan
+    print(f"{zones:,} zones x {n:,} hours ({values.nbytes / 1024 ** 2:.0f} MB)")
+
+    start = time.perf_counter()
+    freqs, power = periodogram(values)
+    spectrum = time.perf_counter() - start
+    start = time.perf_counter()
+    autocorrelation(values, 168)
+    acf = time.perf_counter() - start
+    start = time.perf_counter()
+    periods = top_periods(freqs, power, np.arange(zones))
+    peaks = time.perf_counter() - start
+    found = periods[periods['rank'] == 1]['period_h'].round().value_counts().head(3)
+    print(f"periodogram {spectrum:.3f}s, autocorrelation (all lags) {acf:.3f}s, top periods {peaks:.3f}s")
+    print("Most common strongest period (h): " + ', '.join(f"{p:g} ({c:,} zones)" for p, c in found.items()))
+
+
+def main():
+    from data_loader import read_uber_csv
+
+    parser = argparse.ArgumentParser(description='Dominant cycles of hourly pickups per borough (FFT)')
+    parser.add_argument('--data', default=DATA_FILE)
+    parser.add_argument('--top', type=int, default=TOP_PERIODS, help='periods reported per borough')
+    parser.add_argument('--benchmark', action='store_true', help='time the batched transforms on synthetic zones')
+    parser.add_argument('--zones', type=int, default=1000, help='series in --benchmark')
+    parser.add_argument('--years', type=float, default=3, help='series length in --benchmark')
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.zones, args.years)
+        return
+
+    df = fill_missing_borough(read_uber_csv(args.data))
+    start = time.perf_counter()
+    hours, boroughs, values = hourly_timeline(df)
+    freqs, power = periodogram(values)
+    periods = top_periods(freqs, power, boroughs, args.top)
+    table = seasonality_table(values, boroughs, holiday_hours(df, hours))
+    print(f"Analysed {len(boroughs)} hourly series of {len(hours):,} hours in "
+          f"{time.perf_counter() - start:.3f}s")
+    print_seasonality(periods, table, hours)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,425 @@
+"""
+Uber Data Analysis - Embedded SQL Backend
+Loads the CSV once into a SQLite database file (.uber_cache/uber.sqlite)
+with the calendar codes as integer columns and indexes on pickup_dt and
+borough. The report aggregates -- temporal, borough, holiday, fixed-edge
+weather bins, pickup quartiles and the correlation moments -- run as GROUP BY
+queries, so only the small result sets reach Python. SQLGroupByEngine has the
+GroupByEngine interface, so the figure script can push its group-bys down too
+
+Usage:
+    python sql_backend.py                       # build (or reuse) the database, print its queries' timings
+    python sql_backend.py --benchmark           # pandas vs SQL report aggregates at 1x, 10x, 100x
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import time
+
+import numpy as np
+import pandas as pd
+
+from data_loader import (DATA_FILE, COLUMNS, WEATHER_COLUMNS, NUMERIC_COLUMNS, read_uber_csv,
+                         fill_missing_borough)
+from data_cache import CACHE_DIR, file_fingerprint
+from calendar_features import calendar_codes, with_day_labels, with_month_labels
+from covariance_engine import CovarianceAccumulator, GroupedCovariance
+from quantile_sketch import counted_quantile_table
+from binning import Binner
+
+SQL_DB = os.path.join(CACHE_DIR, 'uber.sqlite')
+
+# Bump when the table layout changes
+SQL_VERSION = 1
+
+TABLE = 'uber'
+
+# Rows per INSERT batch while loading the CSV
+LOAD_CHUNKSIZE = 100_000
+
+# Group-by keys the engine understands, as SQL expressions over the table;
+# '<column>_bin' keys come from the binner's fixed edges
+KEY_EXPRESSIONS = {
+    'borough': 'borough',
+    'hour': 'hour',
+    'day_of_week': 'day_of_week',
+    'month': 'month',
+    'is_weekend': 'day_of_week >= 5',
+    'is_holiday': 'is_holiday',
+    'rain': 'pcp01 > 0',
+    'snow': 'sd > 0',
+}
+
+BOOLEAN_KEYS = ['is_weekend', 'is_holiday', 'rain', 'snow']
+
+SCHEMA = (f"CREATE TABLE {TABLE} (pickup_dt TEXT NOT NULL, borough TEXT NOT NULL, pickups INTEGER NOT NULL, "
+          + ', '.join(f"{col} REAL" for col in WEATHER_COLUMNS)
+          + ", hday TEXT, hour INTEGER, day_of_week INTEGER, month INTEGER, is_holiday INTEGER)")
+
+
+def _bin_expression(binner, col):
+    """SQL CASE giving Binner.codes() of a column (right-closed bins, open outer bins)."""
+    cases = ' '.join(f"WHEN {col} <= {edge!r} THEN {code}"
+                     for code, edge in enumerate(binner.edges[col].tolist()))
+    return f"CASE {cases} ELSE {binner.n_bins(col) - 1} END"
+
+
+def build_database(path=DATA_FILE, db_path=SQL_DB, chunksize=LOAD_CHUNKSIZE, source=None):
+    """Load the CSV into a fresh SQLite file in chunks, then index pickup_dt and borough."""
+    tmp_path = db_path + '.tmp'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.execute(SCHEMA)
+        rows = 0
+        insert = f"INSERT INTO {TABLE} VALUES ({', '.join('?' * (len(COLUMNS) + 4))})"
+        for chunk in read_uber_csv(path, chunksize=chunksize):
+            chunk = fill_missing_borough(chunk)
+            calendar = calendar_codes(chunk['pickup_dt'])
+            frame = pd.DataFrame({
+                'pickup_dt': chunk['pickup_dt'].dt.strftime('%Y-%m-%d %H:%M:%S'),
+                'borough': chunk['borough'].astype(str),
+                'pickups': chunk['pickups'].astype(np.int64),
+            })
+            for col in WEATHER_COLUMNS:
+                frame[col] = chunk[col].astype(np.float64)
+            frame['hday'] = chunk['hday'].astype(str)
+            frame['hour'] = calendar['hour'].astype(np.int64)
+            frame['day_of_week'] = calendar['day_of_week'].astype(np.int64)
+            frame['month'] = calendar['month'].astype(np.int64)
+            frame['is_holiday'] = (chunk['hday'] == 'Y').to_numpy().astype(np.int64)
+            conn.executemany(insert, frame.itertuples(index=False, name=None))
+            rows += len(frame)
+        conn.execute(f"CREATE INDEX idx_{TABLE}_pickup_dt ON {TABLE} (pickup_dt)")
+        conn.execute(f"CREATE INDEX idx_{TABLE}_borough ON {TABLE} (borough)")
+        conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+        conn.execute("INSERT INTO meta VALUES ('source', ?)", (json.dumps(source),))
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp_path, db_path)
+    return rows
+
+
+class SQLBackend:
+    """Report aggregates as GROUP BY queries over the SQLite copy of the data."""
+
+    def __init__(self, db_path=SQL_DB):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.queries = 0
+        self.query_seconds = 0.0
+
+    def query(self, sql, params=()):
+        """Result of one query as a DataFrame (only the result set crosses into Python)."""
+        start = time.perf_counter()
+        result = pd.read_sql_query(sql, self.conn, params=params)
+        self.queries += 1
+        self.query_seconds += time.perf_counter() - start
+        return result
+
+    def grouped(self, keys, binner=None):
+        """sum, count (and mean) of pickups per group of the key expressions (see KEY_EXPRESSIONS)."""
+        exprs = [self.key_expression(key, binner) for key in keys]
+        select = ''.join(f"{expr} AS {key}, " for key, expr in zip(keys, exprs))
+        group = f" GROUP BY {', '.join(keys)} ORDER BY {', '.join(keys)}" if keys else ''
+        table = self.query(f"SELECT {select}SUM(pickups) AS sum, COUNT(*) AS count FROM {TABLE}{group}")
+        for key in keys:
+            if key in BOOLEAN_KEYS:
+                table[key] = table[key].astype(bool)
+        table = table.set_index(keys) if keys else table
+        table.insert(0, 'mean', table['sum'] / table['count'])
+        return table
+
+    def key_expression(self, key, binner=None):
+        if key.endswith('_bin'):
+            return _bin_expression(binner or Binner(), key[:-len('_bin')])
+        if key not in KEY_EXPRESSIONS:
+            raise KeyError(f"Unknown group-by key {key!r}")
+        return KEY_EXPRESSIONS[key]
+
+    def moments(self, keys=('borough', 'hour'), columns=NUMERIC_COLUMNS):
+        """
+        GroupedCovariance of `columns` per group of `keys` from per-group sums of
+        deviations and of their cross products (shifted by the overall means so
+        the co-moments do not lose precision).
+        """
+        keys = list(keys)
+        shift = self.query(f"SELECT {', '.join(f'AVG({col})' for col in columns)} FROM {TABLE}").iloc[0].to_numpy()
+        centered = [f"({col} - {float(c)!r})" for col, c in zip(columns, shift)]
+        width = len(columns)
+        pairs = [(i, j) for i in range(width) for j in range(i, width)]
+        select = (''.join(f"{KEY_EXPRESSIONS[key]} AS {key}, " for key in keys) + "COUNT(*) AS n, "
+                  + ', '.join(f"SUM({expr})" for expr in centered) + ', '
+                  + ', '.join(f"SUM({centered[i]} * {centered[j]})" for i, j in pairs))
+        group = f" GROUP BY {', '.join(keys)}" if keys else ''
+        table = self.query(f"SELECT {select} FROM {TABLE}{group}")
+
+        grouped = GroupedCovariance(columns, keys)
+        values = table.iloc[:, len(keys):].to_numpy(dtype=np.float64)
+        upper = np.triu_indices(width)
+        labels = table[keys].itertuples(index=False, name=None) if keys else [()] * len(table)
+        for label, row in zip(labels, values):
+            n, sums = row[0], row[1:1 + width]
+            cross = np.zeros((width, width))
+            cross[upper] = row[1 + width:]
+            cross = cross + np.triu(cross, 1).T
+            comoment = cross - np.outer(sums, sums) / n
+            grouped.cells[tuple(label)] = CovarianceAccumulator.from_moments(columns, int(n), shift + sums / n,
+                                                                             comoment)
+        return grouped
+
+    def value_counts(self, key):
+        """(key, pickups, count) histogram of pickup values per group, for exact quantiles."""
+        return self.query(f"SELECT {KEY_EXPRESSIONS[key]} AS label, pickups, COUNT(*) AS count "
+                          f"FROM {TABLE} GROUP BY label, pickups")
+
+    def _pickups_describe(self, total, by_borough):
+        std = total.std()['pickups']
+        stats = self.query(f"SELECT COUNT(*), AVG(pickups), MIN(pickups), MAX(pickups) FROM {TABLE}").iloc[0]
+        overall = by_borough.groupby('pickups', as_index=False)['count'].sum()
+        q = counted_quantile_table(overall['pickups'], overall['count'], np.zeros(len(overall)), 'all').iloc[0]
+        return pd.Series(
+            [stats.iloc[0], stats.iloc[1], std, stats.iloc[2], q['25%'], q['50%'], q['75%'], stats.iloc[3]],
+            index=['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max'],
+            name='pickups', dtype='float64'
+        )
+
+    def results(self, binner=None):
+        """Text report aggregates, in the same shape as the in-memory path."""
+        binner = binner or Binner()
+        bool_index = pd.Index([False, True])
+
+        weather = self.query(f"SELECT {', '.join(f'AVG({c}), MIN({c}), MAX({c}), SUM({c} > 0)' for c in WEATHER_COLUMNS)} "
+                             f"FROM {TABLE}").iloc[0].to_numpy().reshape(len(WEATHER_COLUMNS), 4)
+        weather_summary = pd.DataFrame(weather, index=WEATHER_COLUMNS, columns=['mean', 'min', 'max', 'non_zero'])
+        weather_summary['non_zero'] = weather_summary['non_zero'].astype(np.int64)
+
+        dates = self.query(f"SELECT MIN(pickup_dt), MAX(pickup_dt), COUNT(*) FROM {TABLE}").iloc[0]
+        n = int(dates.iloc[2])
+
+        borough_table = self.grouped(['borough'])
+        borough_counts = borough_table['count'].sort_values(ascending=False, kind='stable')
+        borough_stats = borough_table[['sum', 'mean', 'count']].sort_values('sum', ascending=False)
+
+        holiday_stats = self.grouped(['is_holiday']).reindex(bool_index.rename('is_holiday')).dropna()
+        holiday_counts = holiday_stats['count'].sort_values(ascending=False, kind='stable')
+
+        hourly = self.grouped(['hour'])[['mean', 'sum', 'count']]
+        daily = with_day_labels(self.grouped(['day_of_week'])[['mean', 'sum']])
+        monthly = with_month_labels(self.grouped(['month'])[['mean', 'sum']])
+        weekend = self.grouped(['is_weekend'])[['mean', 'sum']]
+
+        borough_hour = self.grouped(['borough', 'hour'])['mean']
+        top_borough_hourly = {b: borough_hour.loc[b] for b in borough_stats.head(3).index}
+        holiday_hour = self.grouped(['is_holiday', 'hour'])['mean']
+
+        # Fixed-edge weather bins computed in SQL, labelled by the binner
+        bins = self.grouped(['temp_bin', 'pcp01_bin'], binner).reset_index()
+        codes = [bins['temp_bin'].to_numpy(), bins['pcp01_bin'].to_numpy()]
+        temp_impact = binner.aggregate_codes(['temp'], codes[:1], bins['sum'], bins['count'])[['mean', 'count']]
+        temp_precip = binner.aggregate_codes(['temp', 'pcp01'], codes, bins['sum'], bins['count'])
+
+        precip_impact = self.grouped(['rain'])[['mean', 'count']].rename_axis('pcp01')
+        snow_impact = self.grouped(['snow'])[['mean', 'count']].rename_axis('sd')
+
+        moments = self.moments(['borough', 'hour'])
+        total = moments.total()
+        by_borough = self.value_counts('borough')
+        by_hour = self.value_counts('hour')
+
+        return {
+            'shape': (n, len(COLUMNS)),
+            'date_min': pd.Timestamp(dates.iloc[0]),
+            'date_max': pd.Timestamp(dates.iloc[1]),
+            'pickups_describe': self._pickups_describe(total, by_borough),
+            'weather_summary': weather_summary,
+            'borough_counts': borough_counts,
+            'holiday_counts': holiday_counts,
+            'hourly': hourly,
+            'daily': daily,
+            'monthly': monthly,
+            'weekend': weekend,
+            'borough_stats': borough_stats,
+            'top_borough_hourly': top_borough_hourly,
+            'corr_matrix': total.corr(),
+            'borough_corr': moments.corr_with('borough'),
+            'hour_corr': moments.corr_with('hour'),
+            'borough_quantiles': counted_quantile_table(by_borough['pickups'], by_borough['count'],
+                                                        by_borough['label'], 'borough'),
+            'hour_quantiles': counted_quantile_table(by_hour['pickups'], by_hour['count'], by_hour['label'], 'hour'),
+            'quantile_method': 'exact',
+            'temp_impact': temp_impact,
+            'temp_precip': temp_precip,
+            'precip_impact': precip_impact,
+            'snow_impact': snow_impact,
+            'holiday_stats': holiday_stats,
+            'holiday_hourly': holiday_hour.loc[True],
+            'nonholiday_hourly': holiday_hour.loc[False],
+        }
+
+    def engine(self, keys, binner=None):
+        return SQLGroupByEngine(self, keys, binner)
+
+
+class SQLGroupByEngine:
+    """GroupByEngine interface (aggregate/sum/count/mean, levels) answered by GROUP BY queries."""
+
+    def __init__(self, backend, keys, binner=None):
+        self.backend = backend
+        self.binner = binner or Binner()
+        self.keys = list(keys)
+        self.name = 'pickups'
+        self._cache = {}
+        self.levels = {}
+        for key in self.keys:
+            values = backend.query(f"SELECT DISTINCT {backend.key_expression(key, self.binner)} AS {key} "
+                                   f"FROM {TABLE} ORDER BY {key}")[key].to_numpy()
+            self.levels[key] = self._decode(key, values)
+        cube = backend.query(f"SELECT COUNT(*) FROM (SELECT 1 FROM {TABLE} GROUP BY "
+                             f"{', '.join(backend.key_expression(key, self.binner) for key in self.keys)})")
+        self.n_cells = int(cube.iloc[0, 0])
+
+    def _decode(self, key, values):
+        if key in BOOLEAN_KEYS:
+            return pd.Index(values.astype(bool), name=key)
+        if key.endswith('_bin'):
+            intervals = self.binner.intervals(key[:-len('_bin')])
+            return pd.CategoricalIndex(pd.Categorical.from_codes(values, categories=intervals, ordered=True),
+                                       name=key)
+        return pd.Index(values, name=key)
+
+    def _encode(self, key, value):
+        if key.endswith('_bin'):
+            return int(self.binner.intervals(key[:-len('_bin')]).get_loc(value))
+        if isinstance(value, (bool, np.bool_)):
+            return int(value)
+        return value.item() if hasattr(value, 'item') else value
+
+    def aggregate(self, by, where=None):
+        """DataFrame with mean, sum and count per observed group of `by` over the rows matching `where`."""
+        by = (by,) if isinstance(by, str) else tuple(by)
+        if not where and by in self._cache:
+            return self._cache[by]
+        exprs = {key: self.backend.key_expression(key, self.binner) for key in set(by) | set(where or ())}
+        clauses, params = [], []
+        for key, values in (where or {}).items():
+            if not isinstance(values, (list, tuple, set)):
+                values = [values]
+            clauses.append(f"({exprs[key]}) IN ({', '.join('?' * len(values))})")
+            params.extend(self._encode(key, value) for value in values)
+        select = ''.join(f"{exprs[key]} AS {key}, " for key in by)
+        sql = f"SELECT {select}SUM(pickups) AS sum, COUNT(*) AS count FROM {TABLE}"
+        if clauses:
+            sql += " WHERE " + ' AND '.join(clauses)
+        if by:
+            sql += f" GROUP BY {', '.join(by)} ORDER BY {', '.join(by)}"
+        table = self.backend.query(sql, params)
+
+        if len(by) == 0:
+            index = pd.Index(['all'])
+        elif len(by) == 1:
+            index = self._decode(by[0], table[by[0]].to_numpy())
+        else:
+            index = pd.MultiIndex.from_arrays([self._decode(key, table[key].to_numpy()) for key in by])
+        frame = pd.DataFrame({'sum': table['sum'].fillna(0).to_numpy(dtype=np.int64),
+                              'count': table['count'].to_numpy(dtype=np.int64)}, index=index)
+        frame = frame[frame['count'] > 0]
+        frame.insert(0, 'mean', frame['sum'] / frame['count'])
+        if not where:
+            self._cache[by] = frame
+        return frame
+
+    def sum(self, by):
+        return self.aggregate(by)['sum'].rename(self.name)
+
+    def count(self, by):
+        return self.aggregate(by)['count'].rename(self.name)
+
+    def mean(self, by):
+        return self.aggregate(by)['mean'].rename(self.name)
+
+
+def load_sql_backend(path=DATA_FILE, db_path=SQL_DB, verbose=True):
+    """Open the SQLite copy of `path`, (re)loading it when the source file changed."""
+    source = file_fingerprint(path)
+    source.update(version=SQL_VERSION, path=os.path.abspath(path))
+    fresh = False
+    if os.path.exists(db_path):
+        try:
+            conn = sqlite3.connect(db_path)
+            stored = conn.execute("SELECT value FROM meta WHERE key = 'source'").fetchone()
+            conn.close()
+            fresh = stored is not None and json.loads(stored[0]) == source
+        except sqlite3.Error:
+            fresh = False
+
+    start = time.perf_counter()
+    if not fresh:
+        rows = build_database(path, db_path, source=source)
+        if verbose:
+            print(f"Loaded {rows:,} rows into {db_path} in {time.perf_counter() - start:.3f}s "
+                  f"({os.path.getsize(db_path) / 1024 ** 2:.2f} MB with indexes)")
+    elif verbose:
+        print(f"Opened SQLite database {db_path} ({os.path.getsize(db_path) / 1024 ** 2:.2f} MB)")
+    return SQLBackend(db_path)
+
+
+def benchmark(scales=(1, 10, 100), repeat=3, source=DATA_FILE):
+    """Report aggregates with pandas (CSV load + compute) vs SQL (queries over the loaded file)."""
+    from benchmark import synthetic_dataset
+    from data_loader import load_uber_data
+    from analysis_text_only import compute_aggregates
+
+    print(f"{'scale':>6s} {'rows':>12s} {'pandas load':>12s} {'pandas agg':>11s} "
+          f"{'sql load':>10s} {'sql agg':>9s} {'queries':>8s}")
+    for scale in scales:
+        path = synthetic_dataset(scale, source)
+        db_path = os.path.join(CACHE_DIR, 'bench', f"uber_x{scale}.sqlite")
+        start = time.perf_counter()
+        backend = load_sql_backend(path, db_path, verbose=False)
+        sql_load = time.perf_counter() - start
+
+        def best(func):
+            times = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                result = func()
+                times.append(time.perf_counter() - start)
+            return result, min(times)
+
+        df, pandas_load = best(lambda: load_uber_data(path, verbose=False))
+        _, pandas_agg = best(lambda: compute_aggregates(df.copy()))
+        backend.queries = 0
+        _, sql_agg = best(backend.results)
+        print(f"{scale:5d}x {len(df):12,d} {pandas_load:11.3f}s {pandas_agg:10.3f}s "
+              f"{sql_load:9.3f}s {sql_agg:8.3f}s {backend.queries // repeat:8d}")
+    print("\nsql load is a one-off (reused while the CSV is unchanged); pandas pays its load on every run")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Report aggregates as SQL over an embedded SQLite file')
+    parser.add_argument('--data', default=DATA_FILE)
+    parser.add_argument('--db', default=SQL_DB, help='SQLite database file')
+    parser.add_argument('--benchmark', action='store_true', help='compare with pandas as the data grows')
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100])
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.scales)
+        return
+
+    backend = load_sql_backend(args.data, args.db)
+    start = time.perf_counter()
+    results = backend.results()
+    print(f"Computed the report aggregates with {backend.queries} queries in "
+          f"{time.perf_counter() - start:.3f}s ({backend.query_seconds:.3f}s in SQLite)")
+    print(results['borough_stats'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,253 @@
+"""
+Uber Data Analysis - Streaming Aggregation
+Builds the text report aggregates from fixed-size CSV chunks so that memory is
+bounded by the chunk size instead of the file size
+"""
+
+import copy
+import time
+import numpy as np
+import pandas as pd
+
+from data_loader import (DATA_FILE, COLUMNS, WEATHER_COLUMNS, NUMERIC_COLUMNS,
+                         read_uber_csv, fill_missing_borough)
+from calendar_features import calendar_codes, with_day_labels, with_month_labels
+from covariance_engine import GroupedCovariance
+from quantile_sketch import GroupedSketch, rank_error_bound
+from binning import Binner
+from histograms import empty_histograms, update_histograms, merge_histograms
+
+DEFAULT_CHUNKSIZE = 100_000
+
+# Keys of the demand cube; every temporal/borough/holiday/weather split in the
+# report is a rollup of these
+CUBE_KEYS = ['borough', 'hour', 'day_of_week', 'month', 'is_holiday', 'rain', 'snow',
+             'temp_bin', 'pcp01_bin']
+
+# Weather columns binned with the fixed edges of the binning engine
+BINNED_COLUMNS = ['temp', 'pcp01']
+
+
+def _merge_counts(a, b):
+    """Merge two keyed sum/count partials."""
+    if a is None:
+        return b
+    levels = list(range(b.index.nlevels))
+    return pd.concat([a, b]).groupby(level=levels).sum()
+
+
+def _with_mean(g):
+    g = g.copy()
+    g['mean'] = g['sum'] / g['count']
+    return g
+
+
+class StreamingAggregator:
+    """Mergeable partial aggregates over chunks of the Uber.csv schema."""
+
+    def __init__(self, binner=None):
+        self.binner = binner or Binner()
+        self.rows = 0
+        self.chunks = 0
+        self.date_min = None
+        self.date_max = None
+        # sum/count of pickups per CUBE_KEYS cell
+        self.cube = None
+        # pickups are counts, so a value histogram gives exact quantiles
+        self.pickup_counts = np.zeros(0, dtype=np.int64)
+        self.weather_min = np.full(len(WEATHER_COLUMNS), np.inf)
+        self.weather_max = np.full(len(WEATHER_COLUMNS), -np.inf)
+        self.weather_nonzero = np.zeros(len(WEATHER_COLUMNS), dtype=np.int64)
+        # Means and co-moments of NUMERIC_COLUMNS per borough x hour cell; the
+        # overall, per-borough and per-hour correlations are merges of the cells
+        self.moments = GroupedCovariance(NUMERIC_COLUMNS, ['borough', 'hour'])
+        # Pickup quantile sketches per borough x hour cell (per-group quantiles
+        # cannot come from the single histogram without a histogram per group)
+        self.sketches = GroupedSketch(['borough', 'hour'])
+        # Fixed-edge histograms of the univariate columns, one pass per chunk
+        self.histograms = empty_histograms()
+
+    def update(self, chunk):
+        """Fold one chunk of raw rows into the partial aggregates."""
+        if len(chunk) == 0:
+            return self
+        chunk = fill_missing_borough(chunk)
+        dt = chunk['pickup_dt']
+        self.rows += len(chunk)
+        self.chunks += 1
+        self.date_min = dt.min() if self.date_min is None else min(self.date_min, dt.min())
+        self.date_max = dt.max() if self.date_max is None else max(self.date_max, dt.max())
+
+        calendar = calendar_codes(dt)
+        keys = [
+            chunk['borough'].rename('borough'),
+            pd.Series(calendar['hour'], index=chunk.index, name='hour'),
+            pd.Series(calendar['day_of_week'], index=chunk.index, name='day_of_week'),
+            pd.Series(calendar['month'], index=chunk.index, name='month'),
+            (chunk['hday'] == 'Y').rename('is_holiday'),
+            (chunk['pcp01'] > 0).rename('rain'),
+            (chunk['sd'] > 0).rename('snow'),
+        ] + [pd.Series(self.binner.codes(col, chunk[col]), index=chunk.index, name=f"{col}_bin")
+             for col in BINNED_COLUMNS]
+        part = chunk['pickups'].groupby(keys, observed=True).agg(['sum', 'count'])
+        # Plain string labels so partials from chunks with different categories merge
+        part.index = part.index.set_levels(part.index.levels[0].astype(str), level='borough')
+        self.cube = _merge_counts(self.cube, part.astype('int64'))
+
+        counts = np.bincount(chunk['pickups'].to_numpy())
+        if len(counts) > len(self.pickup_counts):
+            counts[:len(self.pickup_counts)] += self.pickup_counts
+            self.pickup_counts = counts
+        else:
+            self.pickup_counts[:len(counts)] += counts
+
+        weather = chunk[WEATHER_COLUMNS].to_numpy(dtype=np.float64)
+        self.weather_min = np.minimum(self.weather_min, weather.min(axis=0))
+        self.weather_max = np.maximum(self.weather_max, weather.max(axis=0))
+        self.weather_nonzero += (weather > 0).sum(axis=0)
+
+        self.moments.update(chunk[NUMERIC_COLUMNS], [chunk['borough'].astype(str), calendar['hour']])
+        self.sketches.update(chunk['pickups'], [chunk['borough'].astype(str), calendar['hour']])
+        update_histograms(self.histograms, chunk)
+        return self
+
+    def merge(self, other):
+        """Combine the partials of another aggregator (e.g. another worker's)."""
+        if other.rows == 0:
+            return self
+        if self.rows == 0:
+            self.__dict__.update(copy.deepcopy(other.__dict__))
+            return self
+        self.moments.merge(other.moments)
+        self.sketches.merge(other.sketches)
+        merge_histograms(self.histograms, other.histograms)
+        self.rows += other.rows
+        self.chunks += other.chunks
+        self.date_min = min(self.date_min, other.date_min)
+        self.date_max = max(self.date_max, other.date_max)
+        self.cube = _merge_counts(self.cube, other.cube)
+        size = max(len(self.pickup_counts), len(other.pickup_counts))
+        counts = np.zeros(size, dtype=np.int64)
+        counts[:len(self.pickup_counts)] += self.pickup_counts
+        counts[:len(other.pickup_counts)] += other.pickup_counts
+        self.pickup_counts = counts
+        self.weather_min = np.minimum(self.weather_min, other.weather_min)
+        self.weather_max = np.maximum(self.weather_max, other.weather_max)
+        self.weather_nonzero += other.weather_nonzero
+        return self
+
+    def _rollup(self, level):
+        return _with_mean(self.cube.groupby(level=level).sum())
+
+    def binned(self, cols):
+        """Mean/sum/count of pickups per fixed-edge (joint) bin of weather columns."""
+        groups = self.cube.groupby(level=[f"{col}_bin" for col in cols]).sum()
+        codes = [groups.index.get_level_values(f"{col}_bin") for col in cols]
+        return self.binner.aggregate_codes(cols, codes, groups['sum'], groups['count'])
+
+    def _pickups_describe(self, mean, std):
+        counts = self.pickup_counts
+        n = counts.sum()
+        cumulative = np.cumsum(counts)
+        nonzero = np.flatnonzero(counts)
+
+        def quantile(q):
+            # Same linear interpolation as Series.quantile
+            h = (n - 1) * q
+            lo, hi = int(np.floor(h)), int(np.ceil(h))
+            v_lo = np.searchsorted(cumulative, lo, side='right')
+            v_hi = np.searchsorted(cumulative, hi, side='right')
+            return v_lo + (h - lo) * (v_hi - v_lo)
+
+        return pd.Series(
+            [n, mean, std, nonzero[0], quantile(0.25), quantile(0.5), quantile(0.75), nonzero[-1]],
+            index=['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max'],
+            name='pickups', dtype='float64'
+        )
+
+    def results(self):
+        """Final report aggregates, in the same shape as the in-memory path."""
+        n = self.rows
+        moments = self.moments.total()
+        means = moments.mean
+        std = moments.std().to_numpy()
+
+        weather_summary = pd.DataFrame({
+            'mean': means[1:],
+            'min': self.weather_min,
+            'max': self.weather_max,
+            'non_zero': self.weather_nonzero,
+        }, index=WEATHER_COLUMNS)
+
+        by_borough = self._rollup('borough')
+        borough_counts = by_borough['count'].sort_values(ascending=False, kind='stable')
+        borough_counts.name = 'count'
+
+        by_holiday = self._rollup('is_holiday')
+        holiday_counts = by_holiday['count'].sort_values(ascending=False, kind='stable')
+        holiday_counts.name = 'count'
+
+        hourly = self._rollup('hour')[['mean', 'sum', 'count']]
+
+        daily = with_day_labels(self._rollup('day_of_week')[['mean', 'sum']])
+        monthly = with_month_labels(self._rollup('month')[['mean', 'sum']])
+
+        weekend = _with_mean(self.cube.groupby(
+            self.cube.index.get_level_values('day_of_week').rename('is_weekend') >= 5).sum())
+        weekend.index.name = 'is_weekend'
+
+        borough_stats = by_borough[['sum', 'mean', 'count']].sort_values('sum', ascending=False)
+        borough_hour = self._rollup(['borough', 'hour'])['mean']
+        top_borough_hourly = {b: borough_hour.loc[b] for b in borough_stats.head(3).index}
+
+        temp_impact = self.binned(['temp'])[['mean', 'count']]
+
+        precip_impact = self._rollup('rain')[['mean', 'count']]
+        precip_impact.index.name = 'pcp01'
+        snow_impact = self._rollup('snow')[['mean', 'count']]
+        snow_impact.index.name = 'sd'
+
+        holiday_stats = by_holiday[['mean', 'sum', 'count']]
+        holiday_hour = self._rollup(['is_holiday', 'hour'])['mean']
+
+        return {
+            'shape': (n, len(COLUMNS)),
+            'date_min': self.date_min,
+            'date_max': self.date_max,
+            'pickups_describe': self._pickups_describe(means[0], std[0]),
+            'weather_summary': weather_summary,
+            'borough_counts': borough_counts,
+            'holiday_counts': holiday_counts,
+            'hourly': hourly,
+            'daily': daily,
+            'monthly': monthly,
+            'weekend': weekend,
+            'borough_stats': borough_stats,
+            'top_borough_hourly': top_borough_hourly,
+            'corr_matrix': moments.corr(),
+            'borough_corr': self.moments.corr_with('borough'),
+            'hour_corr': self.moments.corr_with('hour'),
+            'borough_quantiles': self.sketches.quantiles('borough'),
+            'hour_quantiles': self.sketches.quantiles('hour'),
+            'quantile_method': f"KLL sketch, rank error <= {100 * rank_error_bound(self.sketches.k):.1f}%",
+            'temp_impact': temp_impact,
+            'temp_precip': self.binned(['temp', 'pcp01']),
+            'precip_impact': precip_impact,
+            'snow_impact': snow_impact,
+            'holiday_stats': holiday_stats,
+            'holiday_hourly': holiday_hour.loc[True],
+            'nonholiday_hourly': holiday_hour.loc[False],
+        }
+
+
+def stream_aggregates(path=DATA_FILE, chunksize=DEFAULT_CHUNKSIZE, verbose=True):
+    """Stream a CSV in chunks and return the report aggregates."""
+    start = time.perf_counter()
+    aggregator = StreamingAggregator()
+    for chunk in read_uber_csv(path, chunksize=chunksize):
+        aggregator.update(chunk)
+    results = aggregator.results()
+    if verbose:
+        print(f"Streamed {aggregator.rows:,} rows from {path} in {aggregator.chunks} chunks "
+              f"of up to {chunksize:,} rows ({time.perf_counter() - start:.3f}s)")
+    return results
@@ -0,0 +1,29 @@
+"""Tests for the fixed-edge histogram accumulators (histograms.py)."""
+
+import os
+
+import numpy as np
+
+from data_loader import DATA_FILE, read_uber_csv
+from histograms import Histogram, univariate_histograms
+from streaming_analysis import StreamingAggregator
+
+SOURCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), DATA_FILE)
+
+
+def test_values_outside_the_edges_are_counted():
+    histogram = Histogram.uniform(0, 10, 10).update([5, 11, 20, -1])
+    assert histogram.total == 4
+    assert (histogram.underflow, histogram.overflow) == (1, 2)
+
+
+def test_chunked_build_matches_full_build():
+    full = univariate_histograms(read_uber_csv(SOURCE))
+    aggregator = StreamingAggregator()
+    for chunk in read_uber_csv(SOURCE, chunksize=3000):
+        aggregator.update(chunk)
+    for col, histogram in full.items():
+        chunked = aggregator.histograms[col]
+        assert np.array_equal(chunked.edges, histogram.edges)
+        assert np.array_equal(chunked.counts, histogram.counts), col
+        assert (chunked.underflow, chunked.overflow) == (histogram.underflow, histogram.overflow)
@@ -0,0 +1,43 @@
+"""Regression tests for reading a directory of CSV drops (multi_file.py)."""
+
+import os
+
+import pytest
+
+from analysis_text_only import load_results, print_report
+from data_loader import DATA_FILE, check_schema
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SOURCE = os.path.join(HERE, DATA_FILE)
+
+
+def _monthly_drops(directory):
+    """Split Uber.csv by month into files that keep its quoted header line."""
+    with open(SOURCE, newline='') as f:
+        header, *rows = f.readlines()
+    months = {}
+    for row in rows:
+        months.setdefault(row[:7], []).append(row)
+    for month, lines in months.items():
+        with open(os.path.join(directory, f"uber-{month}.csv"), 'w', newline='') as f:
+            f.writelines([header] + lines)
+    return len(months)
+
+
+def _report(capsys, results):
+    capsys.readouterr()
+    print_report(results)
+    return capsys.readouterr().out
+
+
+def test_check_schema_accepts_quoted_header():
+    header = check_schema(SOURCE)
+    assert header[:3] == ['pickup_dt', 'borough', 'pickups']
+
+
+@pytest.mark.parametrize('stream', [False, True])
+def test_directory_of_quoted_header_drops_matches_single_file(tmp_path, capsys, stream):
+    assert _monthly_drops(tmp_path) > 1
+    single = _report(capsys, load_results(SOURCE, stream=stream))
+    drops = _report(capsys, load_results(str(tmp_path), stream=stream))
+    assert drops == single
@@ -3,39 +3,53 @@ Comprehensive Uber Data Analysis
 Objective: Extract actionable insights around demand patterns
 """
 
-import pandas as pd
+import argparse
 import numpy as np
-import matplotlib
-matplotlib.use('Agg')  # Use non-interactive backend
-import matplotlib.pyplot as plt
-import seaborn as sns
 from datetime import datetime
 import warnings
 warnings.filterwarnings('ignore')
 
-# Set style for better visualizations
-sns.set_style("whitegrid")
-plt.rcParams['figure.figsize'] = (12, 6)
+from data_loader import COLUMNS, fill_missing_borough
+from data_cache import load_cached_data
+from groupby_engine import GroupByEngine, CubeFamilies
+from covariance_engine import CovarianceAccumulator
+from calendar_features import DAY_ORDER, with_day_labels, with_month_labels
+from histograms import load_histograms, print_outside
+from binning import Binner
+from sql_backend import load_sql_backend
+from figure_pipeline import render_figures
+from profiler import Profiler, add_profile_arguments
+
+# Figure specs collected by each section; rendered together in parallel at the end
+figures = []
+
+parser = argparse.ArgumentParser(description='Comprehensive Uber demand analysis with figures')
+parser.add_argument('--sql', action='store_true',
+                    help='run the group-bys and correlations as SQL over a SQLite copy of the data')
+add_profile_arguments(parser)
+args = parser.parse_args()
+profiler = Profiler.from_args(args)
 
 # Load the data
 print("="*80)
 print("UBER DATA ANALYSIS - COMPREHENSIVE INSIGHTS")
 print("="*80)
 print("\n1. LOADING DATA...")
-df = pd.read_csv('Uber.csv')
+profiler.section('1. LOADING DATA')
 
-# Convert pickup_dt to datetime
-df['pickup_dt'] = pd.to_datetime(df['pickup_dt'])
+# Typed load; repeat runs read the binary cache with temporal features already derived
+df, cache_hit = load_cached_data()
+raw = df[COLUMNS]
 
-print(f"Dataset shape: {df.shape}")
+print(f"Dataset shape: {raw.shape}")
 print(f"\nFirst few rows:")
-print(df.head())
+print(raw.head())
 print(f"\nData types:")
-print(df.dtypes)
+print(raw.dtypes)
 print(f"\nMissing values:")
-print(df.isnull().sum())
+print(raw.isnull().sum())
 print(f"\nBasic statistics:")
-print(df.describe())
+print(raw.describe())
 
 # ============================================================================
 # DATA PREPARATION
@@ -43,98 +57,111 @@ print(df.describe())
 print("\n" + "="*80)
 print("2. DATA PREPARATION")
 print("="*80)
+profiler.section('2. DATA PREPARATION')
 
-# Extract temporal features
-df['date'] = df['pickup_dt'].dt.date
-df['hour'] = df['pickup_dt'].dt.hour
-df['day_of_week'] = df['pickup_dt'].dt.day_name()
-df['month'] = df['pickup_dt'].dt.month
-df['month_name'] = df['pickup_dt'].dt.month_name()
-df['day_of_month'] = df['pickup_dt'].dt.day
-df['is_weekend'] = df['pickup_dt'].dt.dayofweek >= 5
-
-# Convert hday to boolean
-df['is_holiday'] = df['hday'] == 'Y'
+# Integer calendar codes (hour, day_of_week 0-6, month 1-12, days_since_epoch, ...)
+# and is_holiday are derived by the cache loader, so nothing to recompute here
+if cache_hit:
+    print("\nTemporal features loaded from cache")
 
 # Handle missing borough values
-df['borough'] = df['borough'].fillna('Unknown')
+df = fill_missing_borough(df)
 
 print(f"\nDate range: {df['pickup_dt'].min()} to {df['pickup_dt'].max()}")
-print(f"Total unique dates: {df['date'].nunique()}")
+print(f"Total unique dates: {df['days_since_epoch'].nunique()}")
 print(f"Boroughs: {df['borough'].unique()}")
 
+# Fixed-edge weather bins (bin_edges.json) used by the weather impact section;
+# compact integer codes, not Interval columns on the frame
+binner = Binner()
+
+# Factorize every grouping key once and build one small pickups sum/count cube
+# per family of keys that are grouped together; all the temporal, borough,
+# weather and holiday aggregates below are rollups of these cubes rather than
+# separate groupby scans
+KEY_FAMILIES = {
+    'temporal': ['hour', 'day_of_week', 'month', 'is_weekend', 'is_holiday'],
+    'borough': ['borough', 'hour', 'day_of_week'],
+    'weather': ['rain', 'snow', 'temp_bin', 'spd_bin', 'vsb_bin'],
+}
+with profiler.step('build aggregation cubes'):
+    if args.sql:
+        # Same keys; every rollup below becomes a GROUP BY query over the SQLite copy
+        sql_backend = load_sql_backend()
+        engine = CubeFamilies({family: sql_backend.engine(keys, binner) for family, keys in KEY_FAMILIES.items()})
+    else:
+        keys = {
+            'hour': df['hour'],
+            'day_of_week': df['day_of_week'],
+            'month': df['month'],
+            'is_weekend': df['is_weekend'],
+            'borough': df['borough'],
+            'is_holiday': df['is_holiday'],
+            'rain': df['pcp01'] > 0,
+            'snow': df['sd'] > 0,
+            'temp_bin': binner.categorical('temp', df['temp']),
+            'spd_bin': binner.categorical('spd', df['spd']),
+            'vsb_bin': binner.categorical('vsb', df['vsb']),
+        }
+        engine = CubeFamilies({family: GroupByEngine(df['pickups'], {key: keys[key] for key in family_keys})
+                               for family, family_keys in KEY_FAMILIES.items()})
+print(f"Aggregation cubes from {len(df):,} rows: " + ', '.join(
+    f"{family} ({' x '.join(cube.keys)}) {cube.n_cells:,} cells" for family, cube in engine.engines.items()))
+
 # ============================================================================
 # UNIVARIATE ANALYSIS
 # ============================================================================
 print("\n" + "="*80)
 print("3. UNIVARIATE ANALYSIS")
 print("="*80)
-
-# Create figure for univariate analysis
-fig, axes = plt.subplots(3, 3, figsize=(18, 15))
-fig.suptitle('Univariate Analysis - Distribution of Variables', fontsize=16, y=1.02)
-
-# 1. Pickups distribution
-axes[0, 0].hist(df['pickups'], bins=50, edgecolor='black', alpha=0.7)
-axes[0, 0].set_title('Distribution of Pickups')
-axes[0, 0].set_xlabel('Number of Pickups')
-axes[0, 0].set_ylabel('Frequency')
-axes[0, 0].axvline(df['pickups'].mean(), color='r', linestyle='--', label=f'Mean: {df["pickups"].mean():.0f}')
-axes[0, 0].legend()
-
-# 2. Wind Speed
-axes[0, 1].hist(df['spd'], bins=30, edgecolor='black', alpha=0.7, color='skyblue')
-axes[0, 1].set_title('Distribution of Wind Speed (mph)')
-axes[0, 1].set_xlabel('Wind Speed')
-axes[0, 1].set_ylabel('Frequency')
-
-# 3. Visibility
-axes[0, 2].hist(df['vsb'], bins=30, edgecolor='black', alpha=0.7, color='lightgreen')
-axes[0, 2].set_title('Distribution of Visibility (miles)')
-axes[0, 2].set_xlabel('Visibility')
-axes[0, 2].set_ylabel('Frequency')
-
-# 4. Temperature
-axes[1, 0].hist(df['temp'], bins=30, edgecolor='black', alpha=0.7, color='orange')
-axes[1, 0].set_title('Distribution of Temperature (°F)')
-axes[1, 0].set_xlabel('Temperature')
-axes[1, 0].set_ylabel('Frequency')
-
-# 5. Dew Point
-axes[1, 1].hist(df['dewp'], bins=30, edgecolor='black', alpha=0.7, color='pink')
-axes[1, 1].set_title('Distribution of Dew Point (°F)')
-axes[1, 1].set_xlabel('Dew Point')
-axes[1, 1].set_ylabel('Frequency')
-
-# 6. Sea Level Pressure
-axes[1, 2].hist(df['slp'], bins=30, edgecolor='black', alpha=0.7, color='purple')
-axes[1, 2].set_title('Distribution of Sea Level Pressure')
-axes[1, 2].set_xlabel('Sea Level Pressure')
-axes[1, 2].set_ylabel('Frequency')
-
-# 7. Precipitation (1-hour)
-axes[2, 0].hist(df[df['pcp01'] > 0]['pcp01'], bins=30, edgecolor='black', alpha=0.7, color='blue')
-axes[2, 0].set_title('Distribution of 1-hour Precipitation (non-zero)')
-axes[2, 0].set_xlabel('Precipitation')
-axes[2, 0].set_ylabel('Frequency')
-
-# 8. Snow Depth
-axes[2, 1].hist(df[df['sd'] > 0]['sd'], bins=30, edgecolor='black', alpha=0.7, color='cyan')
-axes[2, 1].set_title('Distribution of Snow Depth (non-zero)')
-axes[2, 1].set_xlabel('Snow Depth (inches)')
-axes[2, 1].set_ylabel('Frequency')
-
-# 9. Borough distribution
-borough_counts = df['borough'].value_counts()
-axes[2, 2].bar(borough_counts.index, borough_counts.values, color='coral')
-axes[2, 2].set_title('Distribution of Records by Borough')
-axes[2, 2].set_xlabel('Borough')
-axes[2, 2].set_ylabel('Count')
-axes[2, 2].tick_params(axis='x', rotation=45)
-
-plt.tight_layout()
-plt.savefig('univariate_analysis.png', dpi=300, bbox_inches='tight')
-print("\n✓ Univariate analysis plots saved as 'univariate_analysis.png'")
+profiler.section('3. UNIVARIATE ANALYSIS')
+
+# Univariate figure spec (rendered with the other figures at the end), drawn
+# from fixed-edge bin counts cached alongside the data instead of raw columns
+with profiler.step('univariate histograms'):
+    histograms, _ = load_histograms(df)
+print_outside(histograms)
+borough_counts = engine.count('borough').sort_values(ascending=False, kind='stable')
+figures.append({
+    'filename': 'univariate_analysis.png',
+    'description': 'Univariate analysis plots',
+    'figsize': (18, 15),
+    'grid': (3, 3),
+    'suptitle': 'Univariate Analysis - Distribution of Variables',
+    'panels': [
+        {'kind': 'histogram', 'edges': histograms['pickups'].edges, 'counts': histograms['pickups'].counts,
+         'style': {'edgecolor': 'black', 'alpha': 0.7},
+         'title': 'Distribution of Pickups', 'xlabel': 'Number of Pickups', 'ylabel': 'Frequency',
+         'axvlines': [{'x': df['pickups'].mean(), 'color': 'r', 'linestyle': '--',
+                       'label': f'Mean: {df["pickups"].mean():.0f}'}],
+         'legend': True},
+        {'kind': 'histogram', 'edges': histograms['spd'].edges, 'counts': histograms['spd'].counts,
+         'style': {'edgecolor': 'black', 'alpha': 0.7, 'color': 'skyblue'},
+         'title': 'Distribution of Wind Speed (mph)', 'xlabel': 'Wind Speed', 'ylabel': 'Frequency'},
+        {'kind': 'histogram', 'edges': histograms['vsb'].edges, 'counts': histograms['vsb'].counts,
+         'style': {'edgecolor': 'black', 'alpha': 0.7, 'color': 'lightgreen'},
+         'title': 'Distribution of Visibility (miles)', 'xlabel': 'Visibility', 'ylabel': 'Frequency'},
+        {'kind': 'histogram', 'edges': histograms['temp'].edges, 'counts': histograms['temp'].counts,
+         'style': {'edgecolor': 'black', 'alpha': 0.7, 'color': 'orange'},
+         'title': 'Distribution of Temperature (°F)', 'xlabel': 'Temperature', 'ylabel': 'Frequency'},
+        {'kind': 'histogram', 'edges': histograms['dewp'].edges, 'counts': histograms['dewp'].counts,
+         'style': {'edgecolor': 'black', 'alpha': 0.7, 'color': 'pink'},
+         'title': 'Distribution of Dew Point (°F)', 'xlabel': 'Dew Point', 'ylabel': 'Frequency'},
+        {'kind': 'histogram', 'edges': histograms['slp'].edges, 'counts': histograms['slp'].counts,
+         'style': {'edgecolor': 'black', 'alpha': 0.7, 'color': 'purple'},
+         'title': 'Distribution of Sea Level Pressure', 'xlabel': 'Sea Level Pressure', 'ylabel': 'Frequency'},
+        {'kind': 'histogram', 'edges': histograms['pcp01'].edges, 'counts': histograms['pcp01'].counts,
+         'style': {'edgecolor': 'black', 'alpha': 0.7, 'color': 'blue'},
+         'title': 'Distribution of 1-hour Precipitation (non-zero)', 'xlabel': 'Precipitation', 'ylabel': 'Frequency'},
+        {'kind': 'histogram', 'edges': histograms['sd'].edges, 'counts': histograms['sd'].counts,
+         'style': {'edgecolor': 'black', 'alpha': 0.7, 'color': 'cyan'},
+         'title': 'Distribution of Snow Depth (non-zero)', 'xlabel': 'Snow Depth (inches)', 'ylabel': 'Frequency'},
+        {'kind': 'bar', 'x': borough_counts.index.astype(str).tolist(), 'height': borough_counts.to_numpy(),
+         'style': {'color': 'coral'},
+         'title': 'Distribution of Records by Borough', 'xlabel': 'Borough', 'ylabel': 'Count',
+         'tick_params': {'axis': 'x', 'rotation': 45}},
+    ],
+})
 
 # Summary statistics
 print("\n--- Summary Statistics ---")
@@ -158,53 +185,48 @@ print(f"  Snow Depth - Non-zero: {(df['sd'] > 0).sum()} records ({100*(df['sd']
 print("\n" + "="*80)
 print("4. BIVARIATE ANALYSIS - TEMPORAL PATTERNS")
 print("="*80)
-
-# Temporal analysis
-fig, axes = plt.subplots(2, 2, figsize=(16, 12))
-fig.suptitle('Temporal Patterns in Pickups', fontsize=16, y=1.02)
+profiler.section('4. BIVARIATE ANALYSIS - TEMPORAL PATTERNS')
 
 # Hourly pattern
-hourly_pickups = df.groupby('hour')['pickups'].mean()
-axes[0, 0].plot(hourly_pickups.index, hourly_pickups.values, marker='o', linewidth=2, markersize=6)
-axes[0, 0].set_title('Average Pickups by Hour of Day')
-axes[0, 0].set_xlabel('Hour of Day')
-axes[0, 0].set_ylabel('Average Pickups')
-axes[0, 0].grid(True, alpha=0.3)
-axes[0, 0].set_xticks(range(0, 24, 2))
+hourly_pickups = engine.mean('hour')
 
 # Day of week pattern
-day_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-day_pickups = df.groupby('day_of_week')['pickups'].mean().reindex(day_order)
-axes[0, 1].bar(range(len(day_pickups)), day_pickups.values, color='steelblue')
-axes[0, 1].set_title('Average Pickups by Day of Week')
-axes[0, 1].set_xlabel('Day of Week')
-axes[0, 1].set_ylabel('Average Pickups')
-axes[0, 1].set_xticks(range(len(day_pickups)))
-axes[0, 1].set_xticklabels(day_pickups.index, rotation=45, ha='right')
-axes[0, 1].grid(True, alpha=0.3, axis='y')
+day_pickups = with_day_labels(engine.mean('day_of_week'))
 
 # Monthly pattern
-month_order = ['January', 'February', 'March', 'April', 'May', 'June', 
-               'July', 'August', 'September', 'October', 'November', 'December']
-month_pickups = df.groupby('month_name')['pickups'].mean().reindex(month_order)
-axes[1, 0].bar(range(len(month_pickups)), month_pickups.values, color='coral')
-axes[1, 0].set_title('Average Pickups by Month')
-axes[1, 0].set_xlabel('Month')
-axes[1, 0].set_ylabel('Average Pickups')
-axes[1, 0].set_xticks(range(len(month_pickups)))
-axes[1, 0].set_xticklabels(month_pickups.index, rotation=45, ha='right')
-axes[1, 0].grid(True, alpha=0.3, axis='y')
+month_pickups = with_month_labels(engine.mean('month'))
 
 # Weekend vs Weekday
-weekend_pickups = df.groupby('is_weekend')['pickups'].mean()
-axes[1, 1].bar(['Weekday', 'Weekend'], weekend_pickups.values, color=['skyblue', 'orange'])
-axes[1, 1].set_title('Average Pickups: Weekday vs Weekend')
-axes[1, 1].set_ylabel('Average Pickups')
-axes[1, 1].grid(True, alpha=0.3, axis='y')
-
-plt.tight_layout()
-plt.savefig('temporal_patterns.png', dpi=300, bbox_inches='tight')
-print("\n✓ Temporal patterns plot saved as 'temporal_patterns.png'")
+weekend_pickups = engine.mean('is_weekend')
+
+figures.append({
+    'filename': 'temporal_patterns.png',
+    'description': 'Temporal patterns plot',
+    'figsize': (16, 12),
+    'grid': (2, 2),
+    'suptitle': 'Temporal Patterns in Pickups',
+    'panels': [
+        {'kind': 'plot',
+         'series': [{'x': hourly_pickups.index.to_numpy(), 'y': hourly_pickups.to_numpy(),
+                     'marker': 'o', 'linewidth': 2, 'markersize': 6}],
+         'title': 'Average Pickups by Hour of Day', 'xlabel': 'Hour of Day', 'ylabel': 'Average Pickups',
+         'grid': {'alpha': 0.3}, 'xticks': range(0, 24, 2)},
+        {'kind': 'bar', 'x': range(len(day_pickups)), 'height': day_pickups.to_numpy(),
+         'style': {'color': 'steelblue'},
+         'title': 'Average Pickups by Day of Week', 'xlabel': 'Day of Week', 'ylabel': 'Average Pickups',
+         'xticks': range(len(day_pickups)), 'xticklabels': day_pickups.index.tolist(),
+         'grid': {'alpha': 0.3, 'axis': 'y'}},
+        {'kind': 'bar', 'x': range(len(month_pickups)), 'height': month_pickups.to_numpy(),
+         'style': {'color': 'coral'},
+         'title': 'Average Pickups by Month', 'xlabel': 'Month', 'ylabel': 'Average Pickups',
+         'xticks': range(len(month_pickups)), 'xticklabels': month_pickups.index.tolist(),
+         'grid': {'alpha': 0.3, 'axis': 'y'}},
+        {'kind': 'bar', 'x': ['Weekday', 'Weekend'], 'height': weekend_pickups.to_numpy(),
+         'style': {'color': ['skyblue', 'orange']},
+         'title': 'Average Pickups: Weekday vs Weekend', 'ylabel': 'Average Pickups',
+         'grid': {'alpha': 0.3, 'axis': 'y'}},
+    ],
+})
 
 # Print insights
 print(f"\n--- Temporal Insights ---")
@@ -222,55 +244,50 @@ print(f"Weekend/Weekday ratio: {weekend_pickups[True]/weekend_pickups[False]:.2f
 print("\n" + "="*80)
 print("5. BIVARIATE ANALYSIS - BOROUGH PATTERNS")
 print("="*80)
+profiler.section('5. BIVARIATE ANALYSIS - BOROUGH PATTERNS')
+
+# Total and average pickups by borough
+borough_total = engine.sum('borough').sort_values(ascending=False)
+borough_avg = engine.mean('borough').sort_values(ascending=False)
 
-fig, axes = plt.subplots(2, 2, figsize=(16, 12))
-fig.suptitle('Pickup Patterns by Borough', fontsize=16, y=1.02)
-
-# Total pickups by borough
-borough_total = df.groupby('borough')['pickups'].sum().sort_values(ascending=False)
-axes[0, 0].bar(borough_total.index, borough_total.values, color='steelblue')
-axes[0, 0].set_title('Total Pickups by Borough')
-axes[0, 0].set_xlabel('Borough')
-axes[0, 0].set_ylabel('Total Pickups')
-axes[0, 0].tick_params(axis='x', rotation=45)
-axes[0, 0].grid(True, alpha=0.3, axis='y')
-
-# Average pickups by borough
-borough_avg = df.groupby('borough')['pickups'].mean().sort_values(ascending=False)
-axes[0, 1].bar(borough_avg.index, borough_avg.values, color='coral')
-axes[0, 1].set_title('Average Pickups per Record by Borough')
-axes[0, 1].set_xlabel('Borough')
-axes[0, 1].set_ylabel('Average Pickups')
-axes[0, 1].tick_params(axis='x', rotation=45)
-axes[0, 1].grid(True, alpha=0.3, axis='y')
-
-# Hourly pattern by borough (top 3)
+# Per-borough profiles are rollups of the aggregation cube, not one mask per borough
 top_boroughs = borough_total.head(3).index
+borough_hour_means = engine.mean(['borough', 'hour'])
+borough_day_means = engine.mean(['borough', 'day_of_week'])
+top_hourly_series = []
+top_daily_series = []
 for borough in top_boroughs:
-    borough_hourly = df[df['borough'] == borough].groupby('hour')['pickups'].mean()
-    axes[1, 0].plot(borough_hourly.index, borough_hourly.values, marker='o', label=borough, linewidth=2)
-axes[1, 0].set_title('Hourly Pickup Pattern by Borough (Top 3)')
-axes[1, 0].set_xlabel('Hour of Day')
-axes[1, 0].set_ylabel('Average Pickups')
-axes[1, 0].legend()
-axes[1, 0].grid(True, alpha=0.3)
-axes[1, 0].set_xticks(range(0, 24, 2))
-
-# Day of week pattern by borough (top 3)
-for borough in top_boroughs:
-    borough_daily = df[df['borough'] == borough].groupby('day_of_week')['pickups'].mean().reindex(day_order)
-    axes[1, 1].plot(range(len(borough_daily)), borough_daily.values, marker='o', label=borough, linewidth=2)
-axes[1, 1].set_title('Day of Week Pattern by Borough (Top 3)')
-axes[1, 1].set_xlabel('Day of Week')
-axes[1, 1].set_ylabel('Average Pickups')
-axes[1, 1].set_xticks(range(len(day_order)))
-axes[1, 1].set_xticklabels(day_order, rotation=45, ha='right')
-axes[1, 1].legend()
-axes[1, 1].grid(True, alpha=0.3)
-
-plt.tight_layout()
-plt.savefig('borough_patterns.png', dpi=300, bbox_inches='tight')
-print("\n✓ Borough patterns plot saved as 'borough_patterns.png'")
+    borough_hourly = borough_hour_means.loc[borough]
+    top_hourly_series.append({'x': borough_hourly.index.to_numpy(), 'y': borough_hourly.to_numpy(),
+                              'marker': 'o', 'label': borough, 'linewidth': 2})
+    borough_daily = with_day_labels(borough_day_means.loc[borough])
+    top_daily_series.append({'x': range(len(borough_daily)), 'y': borough_daily.to_numpy(),
+                             'marker': 'o', 'label': borough, 'linewidth': 2})
+
+figures.append({
+    'filename': 'borough_patterns.png',
+    'description': 'Borough patterns plot',
+    'figsize': (16, 12),
+    'grid': (2, 2),
+    'suptitle': 'Pickup Patterns by Borough',
+    'panels': [
+        {'kind': 'bar', 'x': borough_total.index.astype(str).tolist(), 'height': borough_total.to_numpy(),
+         'style': {'color': 'steelblue'},
+         'title': 'Total Pickups by Borough', 'xlabel': 'Borough', 'ylabel': 'Total Pickups',
+         'tick_params': {'axis': 'x', 'rotation': 45}, 'grid': {'alpha': 0.3, 'axis': 'y'}},
+        {'kind': 'bar', 'x': borough_avg.index.astype(str).tolist(), 'height': borough_avg.to_numpy(),
+         'style': {'color': 'coral'},
+         'title': 'Average Pickups per Record by Borough', 'xlabel': 'Borough', 'ylabel': 'Average Pickups',
+         'tick_params': {'axis': 'x', 'rotation': 45}, 'grid': {'alpha': 0.3, 'axis': 'y'}},
+        {'kind': 'plot', 'series': top_hourly_series,
+         'title': 'Hourly Pickup Pattern by Borough (Top 3)', 'xlabel': 'Hour of Day', 'ylabel': 'Average Pickups',
+         'legend': True, 'grid': {'alpha': 0.3}, 'xticks': range(0, 24, 2)},
+        {'kind': 'plot', 'series': top_daily_series,
+         'title': 'Day of Week Pattern by Borough (Top 3)', 'xlabel': 'Day of Week', 'ylabel': 'Average Pickups',
+         'xticks': range(len(DAY_ORDER)), 'xticklabels': DAY_ORDER,
+         'legend': True, 'grid': {'alpha': 0.3}},
+    ],
+})
 
 print(f"\n--- Borough Insights ---")
 for borough in borough_total.index:
@@ -282,71 +299,65 @@ for borough in borough_total.index:
 print("\n" + "="*80)
 print("6. BIVARIATE ANALYSIS - WEATHER IMPACT ON PICKUPS")
 print("="*80)
+profiler.section('6. BIVARIATE ANALYSIS - WEATHER IMPACT ON PICKUPS')
 
 # Correlation analysis
 numeric_cols = ['pickups', 'spd', 'vsb', 'temp', 'dewp', 'slp', 'pcp01', 'pcp06', 'pcp24', 'sd']
-correlation_matrix = df[numeric_cols].corr()
-
-fig, axes = plt.subplots(2, 3, figsize=(18, 12))
-fig.suptitle('Weather Impact on Pickups', fontsize=16, y=1.02)
-
-# Correlation heatmap
-sns.heatmap(correlation_matrix, annot=True, fmt='.2f', cmap='coolwarm', center=0, 
-            square=True, ax=axes[0, 0], cbar_kws={'shrink': 0.8})
-axes[0, 0].set_title('Correlation Matrix: Pickups vs Weather Variables')
-
-# Temperature vs Pickups
-df['temp_bin'] = pd.cut(df['temp'], bins=10)
-temp_pickups = df.groupby('temp_bin')['pickups'].mean()
-axes[0, 1].plot(range(len(temp_pickups)), temp_pickups.values, marker='o', linewidth=2, markersize=8, color='orange')
-axes[0, 1].set_title('Average Pickups by Temperature')
-axes[0, 1].set_xlabel('Temperature Bin')
-axes[0, 1].set_ylabel('Average Pickups')
-axes[0, 1].set_xticks(range(len(temp_pickups)))
-axes[0, 1].set_xticklabels([f"{t.left:.0f}°F" for t in temp_pickups.index], rotation=45, ha='right')
-axes[0, 1].grid(True, alpha=0.3)
-
-# Wind Speed vs Pickups
-df['spd_bin'] = pd.cut(df['spd'], bins=10)
-spd_pickups = df.groupby('spd_bin')['pickups'].mean()
-axes[0, 2].plot(range(len(spd_pickups)), spd_pickups.values, marker='o', linewidth=2, markersize=8, color='skyblue')
-axes[0, 2].set_title('Average Pickups by Wind Speed')
-axes[0, 2].set_xlabel('Wind Speed Bin (mph)')
-axes[0, 2].set_ylabel('Average Pickups')
-axes[0, 2].set_xticks(range(len(spd_pickups)))
-axes[0, 2].set_xticklabels([f"{s.left:.0f}" for s in spd_pickups.index], rotation=45, ha='right')
-axes[0, 2].grid(True, alpha=0.3)
-
-# Visibility vs Pickups
-df['vsb_bin'] = pd.cut(df['vsb'], bins=10)
-vsb_pickups = df.groupby('vsb_bin')['pickups'].mean()
-axes[1, 0].plot(range(len(vsb_pickups)), vsb_pickups.values, marker='o', linewidth=2, markersize=8, color='lightgreen')
-axes[1, 0].set_title('Average Pickups by Visibility')
-axes[1, 0].set_xlabel('Visibility Bin (miles)')
-axes[1, 0].set_ylabel('Average Pickups')
-axes[1, 0].set_xticks(range(len(vsb_pickups)))
-axes[1, 0].set_xticklabels([f"{v.left:.1f}" for v in vsb_pickups.index], rotation=45, ha='right')
-axes[1, 0].grid(True, alpha=0.3)
-
-# Precipitation impact
-precip_comparison = df.groupby(df['pcp01'] > 0)['pickups'].mean()
-axes[1, 1].bar(['No Precipitation', 'With Precipitation'], precip_comparison.values, 
-               color=['lightblue', 'darkblue'])
-axes[1, 1].set_title('Average Pickups: With vs Without Precipitation')
-axes[1, 1].set_ylabel('Average Pickups')
-axes[1, 1].grid(True, alpha=0.3, axis='y')
-
-# Snow impact
-snow_comparison = df.groupby(df['sd'] > 0)['pickups'].mean()
-axes[1, 2].bar(['No Snow', 'With Snow'], snow_comparison.values, 
-               color=['lightgray', 'darkgray'])
-axes[1, 2].set_title('Average Pickups: With vs Without Snow')
-axes[1, 2].set_ylabel('Average Pickups')
-axes[1, 2].grid(True, alpha=0.3, axis='y')
-
-plt.tight_layout()
-plt.savefig('weather_impact.png', dpi=300, bbox_inches='tight')
-print("\n✓ Weather impact plots saved as 'weather_impact.png'")
+with profiler.step('correlation matrix'):
+    if args.sql:
+        correlation_matrix = sql_backend.moments([], numeric_cols).total().corr()
+    else:
+        correlation_matrix = CovarianceAccumulator(numeric_cols).update(df[numeric_cols]).corr()
+
+# Average pickups per weather bin and with/without precipitation or snow
+temp_pickups = engine.mean('temp_bin')
+spd_pickups = engine.mean('spd_bin')
+vsb_pickups = engine.mean('vsb_bin')
+precip_comparison = engine.mean('rain')
+snow_comparison = engine.mean('snow')
+
+figures.append({
+    'filename': 'weather_impact.png',
+    'description': 'Weather impact plots',
+    'figsize': (18, 12),
+    'grid': (2, 3),
+    'suptitle': 'Weather Impact on Pickups',
+    'panels': [
+        {'kind': 'heatmap', 'data': correlation_matrix,
+         'style': {'annot': True, 'fmt': '.2f', 'cmap': 'coolwarm', 'center': 0,
+                   'square': True, 'cbar_kws': {'shrink': 0.8}},
+         'title': 'Correlation Matrix: Pickups vs Weather Variables'},
+        {'kind': 'plot',
+         'series': [{'x': range(len(temp_pickups)), 'y': temp_pickups.to_numpy(),
+                     'marker': 'o', 'linewidth': 2, 'markersize': 8, 'color': 'orange'}],
+         'title': 'Average Pickups by Temperature', 'xlabel': 'Temperature Bin', 'ylabel': 'Average Pickups',
+         'xticks': range(len(temp_pickups)),
+         'xticklabels': [f"{binner.labels('temp')[i]}°F" for i in temp_pickups.index.codes],
+         'grid': {'alpha': 0.3}},
+        {'kind': 'plot',
+         'series': [{'x': range(len(spd_pickups)), 'y': spd_pickups.to_numpy(),
+                     'marker': 'o', 'linewidth': 2, 'markersize': 8, 'color': 'skyblue'}],
+         'title': 'Average Pickups by Wind Speed', 'xlabel': 'Wind Speed Bin (mph)', 'ylabel': 'Average Pickups',
+         'xticks': range(len(spd_pickups)),
+         'xticklabels': [binner.labels('spd')[i] for i in spd_pickups.index.codes],
+         'grid': {'alpha': 0.3}},
+        {'kind': 'plot',
+         'series': [{'x': range(len(vsb_pickups)), 'y': vsb_pickups.to_numpy(),
+                     'marker': 'o', 'linewidth': 2, 'markersize': 8, 'color': 'lightgreen'}],
+         'title': 'Average Pickups by Visibility', 'xlabel': 'Visibility Bin (miles)', 'ylabel': 'Average Pickups',
+         'xticks': range(len(vsb_pickups)),
+         'xticklabels': [binner.labels('vsb')[i] for i in vsb_pickups.index.codes],
+         'grid': {'alpha': 0.3}},
+        {'kind': 'bar', 'x': ['No Precipitation', 'With Precipitation'], 'height': precip_comparison.to_numpy(),
+         'style': {'color': ['lightblue', 'darkblue']},
+         'title': 'Average Pickups: With vs Without Precipitation', 'ylabel': 'Average Pickups',
+         'grid': {'alpha': 0.3, 'axis': 'y'}},
+        {'kind': 'bar', 'x': ['No Snow', 'With Snow'], 'height': snow_comparison.to_numpy(),
+         'style': {'color': ['lightgray', 'darkgray']},
+         'title': 'Average Pickups: With vs Without Snow', 'ylabel': 'Average Pickups',
+         'grid': {'alpha': 0.3, 'axis': 'y'}},
+    ],
+})
 
 # Print correlation insights
 print("\n--- Weather Correlation with Pickups ---")
@@ -361,32 +372,34 @@ for var, corr in pickup_corr.items():
 print("\n" + "="*80)
 print("7. BIVARIATE ANALYSIS - HOLIDAY IMPACT")
 print("="*80)
-
-fig, axes = plt.subplots(1, 2, figsize=(14, 5))
-fig.suptitle('Holiday Impact on Pickups', fontsize=16, y=1.02)
-
-# Holiday vs Non-holiday
-holiday_pickups = df.groupby('is_holiday')['pickups'].mean()
-axes[0].bar(['Non-Holiday', 'Holiday'], holiday_pickups.values, color=['steelblue', 'gold'])
-axes[0].set_title('Average Pickups: Holiday vs Non-Holiday')
-axes[0].set_ylabel('Average Pickups')
-axes[0].grid(True, alpha=0.3, axis='y')
-
-# Holiday hourly pattern
-holiday_hourly = df[df['is_holiday']].groupby('hour')['pickups'].mean()
-nonholiday_hourly = df[~df['is_holiday']].groupby('hour')['pickups'].mean()
-axes[1].plot(holiday_hourly.index, holiday_hourly.values, marker='o', label='Holiday', linewidth=2)
-axes[1].plot(nonholiday_hourly.index, nonholiday_hourly.values, marker='s', label='Non-Holiday', linewidth=2)
-axes[1].set_title('Hourly Pattern: Holiday vs Non-Holiday')
-axes[1].set_xlabel('Hour of Day')
-axes[1].set_ylabel('Average Pickups')
-axes[1].legend()
-axes[1].grid(True, alpha=0.3)
-axes[1].set_xticks(range(0, 24, 2))
-
-plt.tight_layout()
-plt.savefig('holiday_impact.png', dpi=300, bbox_inches='tight')
-print("\n✓ Holiday impact plots saved as 'holiday_impact.png'")
+profiler.section('7. BIVARIATE ANALYSIS - HOLIDAY IMPACT')
+
+# Holiday vs Non-holiday and the hourly pattern of each
+holiday_pickups = engine.mean('is_holiday')
+holiday_hour_means = engine.mean(['is_holiday', 'hour'])
+holiday_hourly = holiday_hour_means.loc[True]
+nonholiday_hourly = holiday_hour_means.loc[False]
+
+figures.append({
+    'filename': 'holiday_impact.png',
+    'description': 'Holiday impact plots',
+    'figsize': (14, 5),
+    'grid': (1, 2),
+    'suptitle': 'Holiday Impact on Pickups',
+    'panels': [
+        {'kind': 'bar', 'x': ['Non-Holiday', 'Holiday'], 'height': holiday_pickups.to_numpy(),
+         'style': {'color': ['steelblue', 'gold']},
+         'title': 'Average Pickups: Holiday vs Non-Holiday', 'ylabel': 'Average Pickups',
+         'grid': {'alpha': 0.3, 'axis': 'y'}},
+        {'kind': 'plot',
+         'series': [{'x': holiday_hourly.index.to_numpy(), 'y': holiday_hourly.to_numpy(),
+                     'marker': 'o', 'label': 'Holiday', 'linewidth': 2},
+                    {'x': nonholiday_hourly.index.to_numpy(), 'y': nonholiday_hourly.to_numpy(),
+                     'marker': 's', 'label': 'Non-Holiday', 'linewidth': 2}],
+         'title': 'Hourly Pattern: Holiday vs Non-Holiday', 'xlabel': 'Hour of Day', 'ylabel': 'Average Pickups',
+         'legend': True, 'grid': {'alpha': 0.3}, 'xticks': range(0, 24, 2)},
+    ],
+})
 
 print(f"\n--- Holiday Insights ---")
 print(f"Holiday average: {holiday_pickups[True]:.0f} pickups")
@@ -399,32 +412,39 @@ print(f"Difference: {holiday_pickups[True] - holiday_pickups[False]:.0f} pickups
 print("\n" + "="*80)
 print("8. ADVANCED ANALYSIS - INTERACTION EFFECTS")
 print("="*80)
+profiler.section('8. ADVANCED ANALYSIS - INTERACTION EFFECTS')
 
 # Weekend + Hour interaction
-weekend_hour = df.groupby(['is_weekend', 'hour'])['pickups'].mean().unstack(0)
-fig, ax = plt.subplots(figsize=(14, 6))
-ax.plot(weekend_hour.index, weekend_hour[False], marker='o', label='Weekday', linewidth=2)
-ax.plot(weekend_hour.index, weekend_hour[True], marker='s', label='Weekend', linewidth=2)
-ax.set_title('Hourly Pickup Pattern: Weekend vs Weekday', fontsize=14)
-ax.set_xlabel('Hour of Day')
-ax.set_ylabel('Average Pickups')
-ax.legend()
-ax.grid(True, alpha=0.3)
-ax.set_xticks(range(0, 24, 2))
-plt.tight_layout()
-plt.savefig('weekend_hour_interaction.png', dpi=300, bbox_inches='tight')
-print("\n✓ Weekend-hour interaction plot saved as 'weekend_hour_interaction.png'")
+weekend_hour = engine.mean(['is_weekend', 'hour']).unstack(0)
+figures.append({
+    'filename': 'weekend_hour_interaction.png',
+    'description': 'Weekend-hour interaction plot',
+    'figsize': (14, 6),
+    'panels': [
+        {'kind': 'plot',
+         'series': [{'x': weekend_hour.index.to_numpy(), 'y': weekend_hour[False].to_numpy(),
+                     'marker': 'o', 'label': 'Weekday', 'linewidth': 2},
+                    {'x': weekend_hour.index.to_numpy(), 'y': weekend_hour[True].to_numpy(),
+                     'marker': 's', 'label': 'Weekend', 'linewidth': 2}],
+         'title': 'Hourly Pickup Pattern: Weekend vs Weekday', 'title_style': {'fontsize': 14},
+         'xlabel': 'Hour of Day', 'ylabel': 'Average Pickups',
+         'legend': True, 'grid': {'alpha': 0.3}, 'xticks': range(0, 24, 2)},
+    ],
+})
 
 # Borough + Hour interaction (heatmap)
-borough_hour = df.groupby(['borough', 'hour'])['pickups'].mean().unstack(0)
-fig, ax = plt.subplots(figsize=(16, 8))
-sns.heatmap(borough_hour.T, annot=False, fmt='.0f', cmap='YlOrRd', ax=ax, cbar_kws={'label': 'Average Pickups'})
-ax.set_title('Heatmap: Average Pickups by Borough and Hour', fontsize=14)
-ax.set_xlabel('Hour of Day')
-ax.set_ylabel('Borough')
-plt.tight_layout()
-plt.savefig('borough_hour_heatmap.png', dpi=300, bbox_inches='tight')
-print("\n✓ Borough-hour heatmap saved as 'borough_hour_heatmap.png'")
+borough_hour = engine.mean(['borough', 'hour']).unstack(0)
+figures.append({
+    'filename': 'borough_hour_heatmap.png',
+    'description': 'Borough-hour heatmap',
+    'figsize': (16, 8),
+    'panels': [
+        {'kind': 'heatmap', 'data': borough_hour.T,
+         'style': {'annot': False, 'fmt': '.0f', 'cmap': 'YlOrRd', 'cbar_kws': {'label': 'Average Pickups'}},
+         'title': 'Heatmap: Average Pickups by Borough and Hour', 'title_style': {'fontsize': 14},
+         'xlabel': 'Hour of Day', 'ylabel': 'Borough'},
+    ],
+})
 
 # ============================================================================
 # STATISTICAL SUMMARY
@@ -432,6 +452,7 @@ print("\n✓ Borough-hour heatmap saved as 'borough_hour_heatmap.png'")
 print("\n" + "="*80)
 print("9. STATISTICAL SUMMARY & KEY INSIGHTS")
 print("="*80)
+profiler.section('9. STATISTICAL SUMMARY & KEY INSIGHTS')
 
 # Calculate feature importance (correlation with pickups)
 feature_importance = abs(correlation_matrix['pickups']).sort_values(ascending=False)
@@ -460,9 +481,20 @@ print(f"Temperature correlation: {correlation_matrix.loc['temp', 'pickups']:.3f}
 print(f"Precipitation impact: {precip_comparison[True] - precip_comparison[False]:.0f} pickups difference")
 print(f"Snow impact: {snow_comparison[True] - snow_comparison[False]:.0f} pickups difference")
 
+# ============================================================================
+# FIGURE RENDERING
+# ============================================================================
+print("\n" + "="*80)
+print("10. RENDERING FIGURES")
+print("="*80)
+profiler.section('10. RENDERING FIGURES')
+print()
+render_figures(figures, profiler=profiler)
+
 print("\n" + "="*80)
 print("ANALYSIS COMPLETE!")
 print("="*80)
 print("\nAll visualizations have been saved as PNG files.")
 print("Review the plots and statistical summaries above for actionable insights.")
 
+profiler.finish()
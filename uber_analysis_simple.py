@@ -3,6 +3,7 @@ Comprehensive Uber Data Analysis - Simplified Version
 Objective: Extract actionable insights around demand patterns
 """
 
+import argparse
 import pandas as pd
 import numpy as np
 import matplotlib
@@ -12,6 +13,17 @@ import seaborn as sns
 import warnings
 warnings.filterwarnings('ignore')
 
+from data_loader import NUMERIC_COLUMNS, load_uber_data, fill_missing_borough
+from partitioned_view import PartitionedFrame
+from calendar_features import add_calendar_features, with_day_labels, with_month_labels
+from covariance_engine import CovarianceAccumulator
+from binning import Binner
+from profiler import Profiler, add_profile_arguments
+
+parser = argparse.ArgumentParser(description='Simplified Uber demand analysis with figures')
+add_profile_arguments(parser)
+profiler = Profiler.from_args(parser.parse_args())
+
 # Set style
 sns.set_style("whitegrid")
 plt.rcParams['figure.figsize'] = (12, 6)
@@ -22,9 +34,9 @@ print("="*80)
 
 # Load data
 print("\n1. LOADING DATA...")
+profiler.section('1. LOADING DATA')
 try:
-    df = pd.read_csv('Uber.csv')
-    df['pickup_dt'] = pd.to_datetime(df['pickup_dt'])
+    df = load_uber_data()
     print(f"✓ Data loaded successfully: {df.shape[0]} rows, {df.shape[1]} columns")
 except Exception as e:
     print(f"Error loading data: {e}")
@@ -32,18 +44,17 @@ except Exception as e:
 
 # Data preparation
 print("\n2. DATA PREPARATION...")
-df['hour'] = df['pickup_dt'].dt.hour
-df['day_of_week'] = df['pickup_dt'].dt.day_name()
-df['month'] = df['pickup_dt'].dt.month
-df['month_name'] = df['pickup_dt'].dt.month_name()
-df['is_weekend'] = df['pickup_dt'].dt.dayofweek >= 5
-df['is_holiday'] = df['hday'] == 'Y'
-df['borough'] = df['borough'].fillna('Unknown')
+profiler.section('2. DATA PREPARATION')
+df = add_calendar_features(df)
+df = fill_missing_borough(df)
+# Pickups/weather correlations, computed once and shared by the plot and the summary
+correlation_matrix = CovarianceAccumulator(NUMERIC_COLUMNS).update(df[NUMERIC_COLUMNS]).corr()
 
 print(f"✓ Date range: {df['pickup_dt'].min()} to {df['pickup_dt'].max()}")
 
 # Basic statistics
 print("\n3. BASIC STATISTICS...")
+profiler.section('3. BASIC STATISTICS')
 print(f"\nPickups Statistics:")
 print(f"  Mean: {df['pickups'].mean():.2f}")
 print(f"  Median: {df['pickups'].median():.2f}")
@@ -53,6 +64,7 @@ print(f"  Max: {df['pickups'].max()}")
 
 # Univariate analysis - Pickups distribution
 print("\n4. CREATING VISUALIZATIONS...")
+profiler.section('4. CREATING VISUALIZATIONS')
 try:
     fig, ax = plt.subplots(figsize=(10, 6))
     ax.hist(df['pickups'], bins=50, edgecolor='black', alpha=0.7)
@@ -88,8 +100,7 @@ except Exception as e:
 
 # Day of week pattern
 try:
-    day_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-    day_pickups = df.groupby('day_of_week')['pickups'].mean().reindex(day_order)
+    day_pickups = with_day_labels(df.groupby('day_of_week')['pickups'].mean())
     fig, ax = plt.subplots(figsize=(10, 6))
     ax.bar(range(len(day_pickups)), day_pickups.values, color='steelblue')
     ax.set_title('Average Pickups by Day of Week')
@@ -108,9 +119,7 @@ except Exception as e:
 
 # Monthly pattern
 try:
-    month_order = ['January', 'February', 'March', 'April', 'May', 'June', 
-                   'July', 'August', 'September', 'October', 'November', 'December']
-    month_pickups = df.groupby('month_name')['pickups'].mean().reindex(month_order)
+    month_pickups = with_month_labels(df.groupby('month')['pickups'].mean())
     fig, ax = plt.subplots(figsize=(12, 6))
     ax.bar(range(len(month_pickups)), month_pickups.values, color='coral')
     ax.set_title('Average Pickups by Month')
@@ -145,9 +154,6 @@ except Exception as e:
 
 # Weather correlation
 try:
-    numeric_cols = ['pickups', 'spd', 'vsb', 'temp', 'dewp', 'slp', 'pcp01', 'pcp06', 'pcp24', 'sd']
-    correlation_matrix = df[numeric_cols].corr()
-    
     fig, ax = plt.subplots(figsize=(10, 8))
     sns.heatmap(correlation_matrix, annot=True, fmt='.2f', cmap='coolwarm', center=0, 
                 square=True, ax=ax, cbar_kws={'shrink': 0.8})
@@ -168,15 +174,16 @@ except Exception as e:
 
 # Temperature impact
 try:
-    df['temp_bin'] = pd.cut(df['temp'], bins=10)
-    temp_pickups = df.groupby('temp_bin')['pickups'].mean()
+    binner = Binner()
+    temp_pickups = binner.aggregate(df['pickups'], {'temp': df['temp']})['mean']
     fig, ax = plt.subplots(figsize=(10, 6))
     ax.plot(range(len(temp_pickups)), temp_pickups.values, marker='o', linewidth=2, markersize=8, color='orange')
     ax.set_title('Average Pickups by Temperature')
     ax.set_xlabel('Temperature Bin')
     ax.set_ylabel('Average Pickups')
     ax.set_xticks(range(len(temp_pickups)))
-    ax.set_xticklabels([f"{t.left:.0f}°F" for t in temp_pickups.index], rotation=45, ha='right')
+    ax.set_xticklabels([f"{binner.labels('temp')[i]}°F" for i in binner.intervals('temp').get_indexer(temp_pickups.index)],
+                       rotation=45, ha='right')
     ax.grid(True, alpha=0.3)
     plt.tight_layout()
     plt.savefig('7_temperature_impact.png', dpi=150, bbox_inches='tight')
@@ -237,9 +244,10 @@ except Exception as e:
 try:
     borough_total = df.groupby('borough')['pickups'].sum().sort_values(ascending=False)
     top_boroughs = borough_total.head(3).index
+    borough_hour_profile = PartitionedFrame(df, 'borough', columns=['hour', 'pickups']).profile('hour')
     fig, ax = plt.subplots(figsize=(12, 6))
     for borough in top_boroughs:
-        borough_hourly = df[df['borough'] == borough].groupby('hour')['pickups'].mean()
+        borough_hourly = borough_hour_profile.loc[borough]
         ax.plot(borough_hourly.index, borough_hourly.values, marker='o', label=borough, linewidth=2)
     ax.set_title('Hourly Pickup Pattern by Borough (Top 3)')
     ax.set_xlabel('Hour of Day')
@@ -258,14 +266,15 @@ except Exception as e:
 print("\n" + "="*80)
 print("SUMMARY REPORT")
 print("="*80)
+profiler.section('SUMMARY REPORT')
 
 # Key insights
 print("\n--- KEY INSIGHTS ---")
 
 # Temporal
 hourly_pickups = df.groupby('hour')['pickups'].mean()
-day_pickups = df.groupby('day_of_week')['pickups'].mean().reindex(day_order)
-month_pickups = df.groupby('month_name')['pickups'].mean().reindex(month_order)
+day_pickups = with_day_labels(df.groupby('day_of_week')['pickups'].mean())
+month_pickups = with_month_labels(df.groupby('month')['pickups'].mean())
 weekend_pickups = df.groupby('is_weekend')['pickups'].mean()
 
 print(f"\n1. TEMPORAL PATTERNS:")
@@ -282,8 +291,6 @@ for borough in borough_total.head(3).index:
     print(f"   - {borough}: {borough_total[borough]:,.0f} total, {borough_avg[borough]:.1f} avg per record")
 
 # Weather
-numeric_cols = ['pickups', 'spd', 'vsb', 'temp', 'dewp', 'slp', 'pcp01', 'pcp06', 'pcp24', 'sd']
-correlation_matrix = df[numeric_cols].corr()
 pickup_corr = abs(correlation_matrix['pickups']).sort_values(ascending=False)
 pickup_corr = pickup_corr[pickup_corr.index != 'pickups']
 
@@ -303,3 +310,4 @@ print("\n" + "="*80)
 print("ANALYSIS COMPLETE!")
 print("="*80)
 
+profiler.finish()
@@ -0,0 +1,163 @@
+"""
+Uber Data Analysis - Command Line Entry Point
+One CLI for the text report, the figures and individual report sections.
+Only argparse is imported up front; pandas, matplotlib and seaborn are loaded
+by the subcommands that need them, so `--help` and the text report never pay
+for the plotting stack
+
+Usage:
+    python uber_cli.py report                        # full text report (no plotting imports)
+    python uber_cli.py report --stream               # chunked; --workers N for shard-parallel
+    python uber_cli.py section temporal weather      # only some report sections
+    python uber_cli.py figures                       # uber_analysis.py with all figures
+    python uber_cli.py figures --simple              # uber_analysis_simple.py
+    python uber_cli.py startup                       # measure cold-start time per subcommand
+    python uber_cli.py --timing report               # also print this run's import time
+"""
+
+import time
+
+_START = time.perf_counter()
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Kept here (not imported from analysis_text_only) so parsing stays import-free
+SECTION_NAMES = ['overview', 'univariate', 'temporal', 'borough', 'weather', 'holiday', 'insights']
+
+# Modules whose presence the startup measurement reports
+HEAVY_MODULES = ['numpy', 'pandas', 'pyarrow', 'sqlite3', 'matplotlib', 'seaborn']
+
+
+def import_command(name):
+    """Import what a subcommand needs; returns the module it runs."""
+    if name in ('report', 'section'):
+        import analysis_text_only
+        return analysis_text_only
+    if name == 'figures':
+        # What uber_analysis.py imports up front; plotting happens in the render workers
+        import runpy
+        import data_cache, groupby_engine, covariance_engine, figure_pipeline  # noqa: F401
+        return runpy
+    if name == 'figures-simple':
+        import runpy
+        import matplotlib.pyplot, seaborn  # noqa: F401
+        return runpy
+    return None
+
+
+def _imports_done(args, name):
+    module = import_command(name)
+    if args.timing:
+        print(f"[startup] {name}: imports done {1000 * (time.perf_counter() - _START):.0f} ms "
+              f"after CLI start")
+    return module
+
+
+def cmd_report(args):
+    report = _imports_done(args, 'report')
+    print("="*80)
+    print("UBER DATA ANALYSIS - COMPREHENSIVE INSIGHTS")
+    print("="*80)
+    print("\n1. LOADING DATA...")
+    results = report.load_results(args.data, args.stream, args.workers, args.chunksize, grid=args.grid,
+                                  sql=args.sql)
+    report.print_report(results)
+
+
+def cmd_section(args):
+    report = _imports_done(args, 'section')
+    results = report.load_results(args.data, args.stream, args.workers, args.chunksize, grid=args.grid,
+                                  sql=args.sql)
+    for name in args.sections:
+        report.REPORT_SECTIONS[name](results)
+
+
+def cmd_figures(args):
+    runpy = _imports_done(args, 'figures-simple' if args.simple else 'figures')
+    script = 'uber_analysis_simple.py' if args.simple else 'uber_analysis.py'
+    # The analysis scripts parse their own options (e.g. --profile)
+    sys.argv = [script] + args.script_args
+    runpy.run_path(os.path.join(HERE, script), run_name='__main__')
+
+
+def measure_startup(name, repeat=5):
+    """Best-of-`repeat` wall time of a fresh interpreter importing one subcommand."""
+    code = ("import sys, json; sys.path.insert(0, sys.argv[1]); import uber_cli; "
+            "uber_cli.import_command(sys.argv[2]); "
+            "print(json.dumps([m for m in uber_cli.HEAVY_MODULES if m in sys.modules]))")
+    best, loaded = None, []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = subprocess.run([sys.executable, '-c', code, HERE, name],
+                             capture_output=True, text=True, check=True).stdout
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+        loaded = json.loads(out.strip().splitlines()[-1])
+    return best, loaded
+
+
+def cmd_startup(args):
+    print(f"Cold-start time per subcommand (best of {args.repeat} fresh interpreters)\n")
+    interpreter, _ = measure_startup('none', args.repeat)
+    print(f"{'command':15s} {'cold start':>11s} {'imports':>9s}  heavy modules loaded")
+    print(f"{'(python)':15s} {1000 * interpreter:9.0f}ms")
+    for name in ['report', 'section', 'figures', 'figures-simple']:
+        seconds, loaded = measure_startup(name, args.repeat)
+        print(f"{name:15s} {1000 * seconds:9.0f}ms {1000 * (seconds - interpreter):7.0f}ms  "
+              f"{', '.join(loaded) or '-'}")
+    print("\n'figures' loads matplotlib/seaborn only when rendering, inside the render workers")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Uber demand analysis')
+    parser.add_argument('--timing', action='store_true', help='print the import time of this run')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    def data_options(sub):
+        sub.add_argument('--data', default='Uber.csv', help='CSV file, directory or glob to analyse')
+        sub.add_argument('--stream', action='store_true', help='aggregate in fixed-size chunks')
+        sub.add_argument('--workers', type=int, default=0, help='aggregate shards in N processes')
+        sub.add_argument('--chunksize', type=int, default=100_000, help='rows per chunk')
+        sub.add_argument('--grid', action='store_true', help='reduce over the memory-mapped grid store')
+        sub.add_argument('--sql', action='store_true', help='run the aggregates as SQL over a SQLite copy')
+
+    report = commands.add_parser('report', help='full text report')
+    data_options(report)
+    report.set_defaults(func=cmd_report)
+
+    section = commands.add_parser('section', help='individual text report sections')
+    section.add_argument('sections', nargs='+', choices=SECTION_NAMES, metavar='SECTION',
+                         help=f"one or more of: {', '.join(SECTION_NAMES)}")
+    data_options(section)
+    section.set_defaults(func=cmd_section)
+
+    figures = commands.add_parser('figures', help='full analysis with figures; other options '
+                                  '(e.g. --profile) are passed to the analysis script')
+    figures.add_argument('--simple', action='store_true', help='run uber_analysis_simple.py instead')
+    figures.set_defaults(func=cmd_figures)
+
+    startup = commands.add_parser('startup', help='measure cold-start time of each subcommand')
+    startup.add_argument('--repeat', type=int, default=5, help='fresh interpreters per command')
+    startup.set_defaults(func=cmd_startup)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args, extra = parser.parse_known_args(argv)
+    if extra and args.command != 'figures':
+        parser.error(f"unrecognized arguments: {' '.join(extra)}")
+    args.script_args = extra
+    args.func(args)
+    if args.timing:
+        print(f"[startup] total {time.perf_counter() - _START:.2f}s")
+
+
+if __name__ == '__main__':
+    main()